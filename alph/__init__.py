@@ -1 +1,2 @@
-from .core import alph
+from .aio import alph_async
+from .core import alph, prepare
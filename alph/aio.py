@@ -0,0 +1,148 @@
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+from functools import partial, wraps
+
+from . import layout
+from .core import alph, default_layout_fns
+
+CANCEL_POLL_INTERVAL = 0.05  # seconds, while waiting on layouts
+
+
+def _layout_task(layout_fn, G, seed, kwargs, with_stats):
+    """Seeded layout - see layout.seeded_layout - and its stats, which when filled in a worker
+    process don't make it back on their own"""
+    stats = {} if with_stats else None
+    if with_stats:
+        kwargs = {**kwargs, "stats": stats}
+    return layout.seeded_layout(partial(layout_fn, **kwargs), G, seed), stats
+
+
+def _with_seed_arg(signature):
+    """signature, with a seed arg if it hasn't got one"""
+    if "seed" in signature.parameters:
+        return signature
+    params = list(signature.parameters.values())
+    var_kwargs = [p for p in params if p.kind == inspect.Parameter.VAR_KEYWORD]
+    seed = inspect.Parameter("seed", inspect.Parameter.KEYWORD_ONLY, default=None)
+    return signature.replace(
+        parameters=[p for p in params if p not in var_kwargs] + [seed] + var_kwargs
+    )
+
+
+def _in_executor(layout_fn, executor, cancelled, min_nodes):
+    """
+    layout_fn, run on executor - waiting for it in a way that can be cancelled, via the
+    cancelled event. Graphs with fewer than min_nodes are laid out right here, as they're
+    quicker to lay out than to ship to a worker.
+
+    Always takes a seed - so that seeded_layout passes it on, rather than seeding global RNGs
+    here, which wouldn't carry over to a worker - and seeds layout_fn with it where it runs.
+    """
+
+    @wraps(layout_fn)
+    def inner(G, seed=None, stats=None, **kwargs):
+        if cancelled.is_set():
+            raise concurrent.futures.CancelledError()
+        if G.number_of_nodes() < min_nodes:
+            pos, layout_stats = _layout_task(
+                layout_fn, G, seed, kwargs, stats is not None
+            )
+        else:
+            future = executor.submit(
+                _layout_task, layout_fn, G, seed, kwargs, stats is not None
+            )
+            while True:
+                try:
+                    pos, layout_stats = future.result(timeout=CANCEL_POLL_INTERVAL)
+                    break
+                except concurrent.futures.TimeoutError:
+                    if cancelled.is_set():
+                        future.cancel()
+                        raise concurrent.futures.CancelledError()
+
+        if stats is not None:
+            stats.update(layout_stats)
+        return pos
+
+    try:
+        # callers tell which args layout functions take from their signature
+        inner.__signature__ = _with_seed_arg(inspect.signature(layout_fn))
+    except (TypeError, ValueError):
+        pass
+    return inner
+
+
+async def alph_async(
+    G,
+    executor=None,
+    layout_executor=None,
+    layout_min_nodes=layout.PARALLEL_LAYOUT_MIN_NODES,
+    timeout=None,
+    **alph_kwargs,
+):
+    """
+    alph(), as a coroutine that doesn't block the event loop: it runs in executor, with layouts
+    submitted to layout_executor - typically a process pool, shared between requests, as layouts
+    are CPU bound. Intra-combo layouts are then submitted to it from threads,
+    intra_combo_layout_workers at a time - e.g. as many as it has workers.
+
+    On cancellation, or once timeout is up, the coroutine stops waiting for the chart. With a
+    layout_executor, layouts not yet started are cancelled too, and alph() stops at its next
+    layout. Work already running - e.g. a layout in a worker process - runs to completion in
+    the background, as Python can't interrupt it.
+
+    :param executor:            concurrent.futures.Executor to run alph() in - by default, the
+                                event loop's default thread pool
+    :param layout_executor:     optional concurrent.futures.Executor to run layouts in - e.g. a
+                                ProcessPoolExecutor, which needs picklable layout functions, so not
+                                lambdas. By default, layouts run in executor along with the rest
+    :param layout_min_nodes:    graphs with fewer nodes are laid out in executor rather than
+                                layout_executor, as they're quicker to lay out than to ship
+    :param timeout:             seconds to wait for the chart, before raising asyncio.TimeoutError
+    :param alph_kwargs:         args to alph() - with a layout_executor, intra_combo_layout_executor
+                                is "thread" by default, and can't be a process pool
+    :return:                    the chart, as returned by alph()
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+
+    if layout_executor is not None:
+        is_combo = bool(alph_kwargs.get("combo_group_by"))
+        default_layout_fn, default_combo_layout_fn = default_layout_fns(
+            is_combo, alph_kwargs.get("weight_attr")
+        )
+        in_executor = partial(
+            _in_executor,
+            executor=layout_executor,
+            cancelled=cancelled,
+            min_nodes=layout_min_nodes,
+        )
+        alph_kwargs["layout_fn"] = in_executor(
+            alph_kwargs.get("layout_fn") or default_layout_fn
+        )
+        if is_combo:
+            alph_kwargs["combo_layout_fn"] = in_executor(
+                alph_kwargs.get("combo_layout_fn") or default_combo_layout_fn
+            )
+            # intra-combo layout threads only wait on layout_executor - and the wrapped layouts
+            # wait on a cancelled event, which can't be shipped to a process
+            intra_executor = alph_kwargs.setdefault(
+                "intra_combo_layout_executor", "thread"
+            )
+            if intra_executor == "process" or isinstance(
+                intra_executor, concurrent.futures.ProcessPoolExecutor
+            ):
+                raise ValueError(
+                    "intra_combo_layout_executor can't be a process pool with a "
+                    "layout_executor - layouts already run in layout_executor"
+                )
+
+    future = loop.run_in_executor(executor, partial(alph, G, **alph_kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except BaseException:
+        # stop alph() at its next layout, and cancel layouts not yet started
+        cancelled.set()
+        raise
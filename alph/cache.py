@@ -0,0 +1,245 @@
+import hashlib
+import inspect
+import os
+import threading
+import types
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+
+from .layout import accepts_arg
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024**2
+
+
+def _code_fingerprint(code):
+    # nested code objects - e.g. lambdas, comprehensions - repr with memory addresses
+    consts = tuple(
+        _code_fingerprint(c) if hasattr(c, "co_code") else c for c in code.co_consts
+    )
+    return (code.co_code.hex(), consts, code.co_names)
+
+
+def _code_names(code):
+    """Global and attribute names code refers to, including from nested code objects"""
+    names = set(code.co_names)
+    for c in code.co_consts:
+        if hasattr(c, "co_code"):
+            names |= _code_names(c)
+    return names
+
+
+def _value_fingerprint(value, seen):
+    """Like repr, but without memory addresses for functions, including in containers"""
+    if isinstance(value, np.ndarray):
+        # reprs of large arrays are abbreviated
+        return (
+            value.dtype.str,
+            value.shape,
+            hashlib.blake2b(value.tobytes()).hexdigest(),
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_fingerprint(v, seen) for v in value)
+    if isinstance(value, dict):
+        return tuple((repr(k), _value_fingerprint(v, seen)) for k, v in value.items())
+    if isinstance(value, (type, types.BuiltinFunctionType)):
+        return f"{value.__module__}.{value.__qualname__}"
+    if callable(value):
+        return _fn_fingerprint(value, seen)
+    return repr(value)
+
+
+def _globals_fingerprint(fn, seen):
+    """
+    Values of the globals fn reads - so that e.g. a notebook lambda reading a global gets a
+    new key when the global changes. Modules are left out, and functions are identified by
+    their own fingerprint.
+    """
+    fn_globals = getattr(fn, "__globals__", {})
+    return tuple(
+        (name, _value_fingerprint(fn_globals[name], seen))
+        for name in sorted(_code_names(fn.__code__))
+        # others are attribute names, or builtins
+        if name in fn_globals and not isinstance(fn_globals[name], types.ModuleType)
+    )
+
+
+def _fn_fingerprint(fn, seen=None):
+    """Identify a layout function, including args bound via partial - and, for plain
+    functions, their code, defaults, closure and the globals they read, so that e.g. two
+    different lambdas don't collide, and a lambda reading a changed global doesn't hit.
+    Wrappers that only change where fn runs - e.g. alph.aio's - set __wrapped__, and are
+    identified by the function they wrap.
+    """
+    fn = inspect.unwrap(fn)
+    if isinstance(fn, partial):
+        return repr(
+            (
+                _fn_fingerprint(fn.func, seen),
+                _value_fingerprint(fn.args, seen),
+                _value_fingerprint(dict(sorted(fn.keywords.items())), seen),
+            )
+        )
+
+    name = f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        return name
+
+    # each function's globals are only walked once - which also stops recursion
+    seen = set() if seen is None else seen
+    if id(code) in seen:
+        return name
+    seen.add(id(code))
+
+    closure = tuple(cell.cell_contents for cell in (fn.__closure__ or ()))
+    return repr(
+        (
+            name,
+            _code_fingerprint(code),
+            _value_fingerprint(getattr(fn, "__defaults__", None), seen),
+            _value_fingerprint(getattr(fn, "__kwdefaults__", None), seen),
+            _value_fingerprint(closure, seen),
+            _globals_fingerprint(fn, seen),
+        )
+    )
+
+
+def graph_fingerprint(G, weight_attr=None):
+    """
+    Stable digest of graph type, nodes and edges - in iteration order, as that can affect
+    layouts - and weight_attr edge values if given.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{type(G).__name__}|{weight_attr!r}|".encode())
+    for n in G.nodes():
+        h.update(repr(n).encode())
+        h.update(b"\0")
+    h.update(b"\1")
+    edges = G.edges(data=weight_attr) if weight_attr else G.edges()
+    for e in edges:
+        h.update(repr(e).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class LayoutCache:
+    """
+    Content-addressed cache of layout results, keyed by graph structure, weights and
+    layout function / parameters. Holds an in-memory LRU tier, evicting once stored
+    positions exceed max_bytes, and optionally an on-disk tier of .npz files that
+    survives across processes.
+
+    Usage:
+        cache = LayoutCache(cache_dir="~/.cache/alph")
+        pos = cache.layout(layout_fn, G, weight_attr="weight")
+    or pass as `layout_cache` to `alph()`.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MAX_BYTES, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            disk_hits=self.disk_hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            nbytes=self._nbytes,
+        )
+
+    def key(self, layout_fn, G, weight_attr=None, **params):
+        """:param params: anything else that affects the layout - e.g. a seed, or kwargs to layout_fn"""
+        h = hashlib.blake2b(digest_size=20)
+        h.update(graph_fingerprint(G, weight_attr).encode())
+        h.update(_fn_fingerprint(layout_fn).encode())
+        h.update(repr(_value_fingerprint(dict(sorted(params.items())), None)).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _store(self, key, xy):
+        self._entries[key] = xy
+        self._entries.move_to_end(key)
+        self._nbytes += xy.nbytes
+        while self._nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+
+    def get(self, key, G):
+        """pos for G if cached, else None"""
+        with self._lock:
+            xy = self._entries.get(key)
+            if xy is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            elif self.cache_dir and os.path.exists(self._path(key)):
+                with np.load(self._path(key)) as f:
+                    xy = f["pos"]
+                self._store(key, xy)
+                self.hits += 1
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                return None
+
+        return dict(zip(G.nodes(), xy.copy()))
+
+    def put(self, key, G, pos):
+        # keys assume pos covers exactly G's nodes, in G's node order
+        if len(pos) != G.number_of_nodes() or not all(n in pos for n in G.nodes()):
+            return
+
+        xy = np.array([pos[n] for n in G.nodes()], dtype=float).reshape(-1, 2)
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key).nbytes
+            self._store(key, xy)
+
+        if self.cache_dir:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, pos=xy)
+            os.replace(tmp_path, self._path(key))
+
+    def layout(self, layout_fn, G, weight_attr=None, stats=None, **kwargs):
+        """
+        Return cached pos for layout_fn(G, **kwargs) - computing and caching it on a miss
+
+        :param stats:   optional dict, passed on to layout_fn on a miss if it takes stats, and
+                        with "cached" set to whether pos came from the cache - not part of the key
+        """
+        key = self.key(layout_fn, G, weight_attr=weight_attr, **kwargs)
+        pos = self.get(key, G)
+        if stats is not None:
+            stats["cached"] = pos is not None
+        if pos is None:
+            if stats is not None and accepts_arg(layout_fn, "stats"):
+                pos = layout_fn(G, stats=stats, **kwargs)
+            else:
+                pos = layout_fn(G, **kwargs)
+            self.put(key, G, pos)
+        return pos
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+        if disk and self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.cache_dir, name))
@@ -2,12 +2,134 @@ import networkx as nx
 import numpy as np
 import pandas as pd
 
-from .util import nx_graph_from_edges
+from .util import nx_edge_index_arrays, nx_graph_from_edges
 
 EMPTY_COMBO_VALUE_PLACEHOLDER = "__combo_empty"
 COMBO_PROMOTED_NODE_ATTR = "__combo_promoted"
 COMBO_GROUP_VALUE_ATTR = "__combo_group_value"
 NEW_COMBO_EDGE_WEIGHT_AGG_ATTR_NAME = "weight"
+SPARSE_COMBO_EDGE_AGG_FUNCS = ("sum", "count", "size", "mean")
+
+
+def _aggregate_combo_edges_pandas(G, combo_values_by_node, combo_edge_agg_attrs):
+    #  create a df of edges from original graph, to be aggregated to combo edges
+    df = nx.to_pandas_edgelist(G)
+    df["source"] = df["source"].map(combo_values_by_node)
+    df["target"] = df["target"].map(combo_values_by_node)
+
+    #  ensure we don't double count edges
+    df["source"], df["target"] = np.where(
+        df["source"] <= df["target"],
+        (df["source"], df["target"]),
+        (df["target"], df["source"]),
+    )
+
+    # aggreagate combo edges
+    combo_edge_selector = df["source"] != df["target"]
+    return (
+        df[combo_edge_selector]
+        .groupby(["source", "target"], dropna=False)
+        .agg(**combo_edge_agg_attrs)
+        .reset_index()
+    )
+
+
+def _aggregate_combo_edges_sparse(G, combo_values_by_node, combo_edge_agg_attrs):
+    """
+    Sparse matrix equivalent of _aggregate_combo_edges_pandas, for sum / count / size / mean
+    aggregations of numeric edge attributes: with A a node adjacency matrix of edge values,
+    and S a node to combo membership matrix, combo-level totals are S^T A S.
+
+    Returns None if aggregations can't be expressed this way, so the caller can fall back
+    to pandas.
+    """
+    from scipy import sparse
+
+    if not all(
+        isinstance(spec, tuple)
+        and len(spec) == 2
+        and spec[1] in SPARSE_COMBO_EDGE_AGG_FUNCS
+        for spec in combo_edge_agg_attrs.values()
+    ):
+        return None
+
+    try:
+        #  sorted, so that pairs come out in the same (source <= target) order as groupby
+        combo_values = sorted(set(combo_values_by_node.values()))
+    except TypeError:
+        return None
+
+    node_index = {n: i for i, n in enumerate(G.nodes())}
+    sources, targets, edge_data = nx_edge_index_arrays(G, node_index)
+    attrs = {k for d in edge_data for k in d}
+    for attr, func in combo_edge_agg_attrs.values():
+        if func != "size" and attr not in attrs | {"source", "target"}:
+            return None
+        if attr in ("source", "target") and func not in ("count", "size"):
+            return None
+
+    combo_index = {val: i for i, val in enumerate(combo_values)}
+    num_nodes, num_combos = len(node_index), len(combo_values)
+
+    S = sparse.csr_matrix(
+        (
+            np.ones(num_nodes, dtype=int),
+            (
+                np.arange(num_nodes),
+                [combo_index[combo_values_by_node[n]] for n in node_index],
+            ),
+        ),
+        shape=(num_nodes, num_combos),
+    )
+
+    def combo_totals(values):
+        A = sparse.csr_matrix((values, (sources, targets)), shape=(num_nodes,) * 2)
+        C = (S.T @ A @ S).tocsr()
+        return C + C.T  # combo edges are undirected; only i < j is used
+
+    edge_counts = combo_totals(np.ones(len(edge_data), dtype=int))
+    pairs = sparse.triu(edge_counts, k=1).tocoo()
+    order = np.lexsort((pairs.col, pairs.row))
+    rows, cols = pairs.row[order], pairs.col[order]
+
+    def at_pairs(C):
+        if not len(rows):
+            return np.array([], dtype=C.dtype)
+        return np.asarray(C[rows, cols]).ravel()
+
+    res = {
+        "source": [combo_values[i] for i in rows],
+        "target": [combo_values[j] for j in cols],
+    }
+    for name, (attr, func) in combo_edge_agg_attrs.items():
+        if func == "size" or attr in ("source", "target"):
+            res[name] = at_pairs(edge_counts)
+            continue
+
+        values = pd.Series([d.get(attr, np.nan) for d in edge_data])
+        if not (
+            pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)
+        ):
+            return None
+        not_null = values.notna().to_numpy().astype(int)
+
+        if func == "count":
+            res[name] = at_pairs(combo_totals(not_null))
+            continue
+
+        values = values.fillna(0).to_numpy()
+        sums = at_pairs(
+            combo_totals(values.astype(int) if values.dtype == bool else values)
+        )
+        if func == "sum":
+            res[name] = sums
+        else:
+            counts = at_pairs(combo_totals(not_null))
+            res[name] = np.divide(
+                sums, counts, out=np.full(len(sums), np.nan), where=counts > 0
+            )
+
+    return pd.DataFrame(res)
 
 
 def combo_graph_mapper(
@@ -90,26 +212,14 @@ def combo_graph_mapper(
     combo_values_by_node = {n: val for n, val in G.nodes(data=COMBO_GROUP_VALUE_ATTR)}
     combo_values_set = set(combo_values_by_node.values())
 
-    #  create a df of edges from original graph, to be aggregated to combo edges
-    df = nx.to_pandas_edgelist(G)
-    df["source"] = df["source"].map(combo_values_by_node)
-    df["target"] = df["target"].map(combo_values_by_node)
-
-    #  ensure we don't double count edges
-    df["source"], df["target"] = np.where(
-        df["source"] <= df["target"],
-        (df["source"], df["target"]),
-        (df["target"], df["source"]),
-    )
-
     # aggreagate combo edges
-    combo_edge_selector = df["source"] != df["target"]
-    combo_edges = (
-        df[combo_edge_selector]
-        .groupby(["source", "target"], dropna=False)
-        .agg(**combo_edge_agg_attrs)
-        .reset_index()
+    combo_edges = _aggregate_combo_edges_sparse(
+        G, combo_values_by_node, combo_edge_agg_attrs
     )
+    if combo_edges is None:
+        combo_edges = _aggregate_combo_edges_pandas(
+            G, combo_values_by_node, combo_edge_agg_attrs
+        )
 
     # create inter-combo graph
     inter_combo_G_nodes = (
@@ -132,22 +242,20 @@ def combo_graph_mapper(
         add_missing_node_attr_nodes=True,  # want combo nodes even if they don't have any edges
     )
 
-    # create intra-combo graphs
+    # create intra-combo graphs, bucketing nodes and edges by combo value in a single pass
     intra_combo_Gs = {}
-    for val in combo_values_set:
-        G_val = G.copy()
-        G_val.remove_nodes_from(
-            [n for n, v in combo_values_by_node.items() if v != val]
-        )
-        G_val.remove_edges_from(
-            [
-                (s, t)
-                for s, t in G_val.edges()
-                if combo_values_by_node.get(s) != val
-                or combo_values_by_node.get(t) != val
-            ]
-        )
+    for n, d in G.nodes(data=True):
+        val = combo_values_by_node[n]
+        if val not in intra_combo_Gs:
+            intra_combo_Gs[val] = G.__class__()
+            intra_combo_Gs[val].graph.update(G.graph)
+        intra_combo_Gs[val].add_node(n, **d)
 
-        intra_combo_Gs[val] = G_val
+    for s, t, *key, d in (
+        G.edges(keys=True, data=True) if G.is_multigraph() else G.edges(data=True)
+    ):
+        val = combo_values_by_node[s]
+        if combo_values_by_node[t] == val:
+            intra_combo_Gs[val].add_edge(s, t, *key, **d)
 
     return inter_combo_G, intra_combo_Gs
@@ -2,17 +2,12 @@ from functools import partial
 from typing import Callable, Union
 
 import altair as alt
-import pandas as pd
 
 from . import combo
 from . import layers as ll
 from . import layout
-from .preproc import (
-    PANDAS_DT_TYPES,
-    PYTHON_DT_TYPES,
-    get_non_serializable_datetime_type_columns,
-)
-from .util import normalise_pos
+from .preproc import sanitise_non_serializable_datetime_node_attrs
+from .util import NodePositions, normalise_pos, timed_stage
 
 DEFAULT_COMBO_SIZE_SCALE_DOMAIN = (0, 25)
 DEFAULT_COMBO_SIZE_SCALE_RANGE = ((2 * 3) ** 2, (2 * 90) ** 2)
@@ -21,6 +16,50 @@ DEFAULT_WIDTH = 800
 DEFAULT_HEIGHT = 600
 
 
+def _layer(args, layer_fn, compact_data=False, **kwargs):
+    """args itself if it's a layer already, else layer_fn(**args, **kwargs) - with args taking
+    precedence over compact_data"""
+    if callable(args):
+        return args
+    return layer_fn(**{**dict(compact_data=compact_data), **(args or {})}, **kwargs)
+
+
+def _nodes_layer(is_combo, node_args, compact_data=False, layer_params=None):
+    if is_combo:
+        return _layer(
+            {**dict(size=50, fill=alt.value("black")), **(node_args or {})},
+            ll.nodes_layer,
+            compact_data,
+            layer_params=layer_params,
+        )
+    return _layer(
+        node_args, ll.default_nodes_layer, compact_data, layer_params=layer_params
+    )
+
+
+def default_layout_fns(is_combo, weight_attr=None):
+    """(network or intra-combo layout, combo layout) functions alph() uses by default"""
+    return (
+        partial(
+            (
+                layout.default_intra_combo_layout
+                if is_combo
+                else layout.default_network_layout
+            ),
+            weight_attr=weight_attr,
+        ),
+        partial(layout.default_inter_combo_layout, weight_attr=weight_attr),
+    )
+
+
+def _run_layout(layout_cache, layout_fn, G, weight_attr, stats=None):
+    if layout_cache is not None:
+        return layout_cache.layout(layout_fn, G, weight_attr=weight_attr, stats=stats)
+    if stats is not None and layout.accepts_arg(layout_fn, "stats"):
+        return layout_fn(G, stats=stats)
+    return layout_fn(G)
+
+
 def alph(
     G,
     weight_attr=None,
@@ -41,14 +80,21 @@ def alph(
     combo_edge_agg_attrs=None,
     combo_edge_weight_threshold=None,
     include_edgeless_combo_nodes=True,
+    combo_consolidate_layers=False,
+    intra_combo_layout_seed=None,
+    intra_combo_layout_workers=None,
+    intra_combo_layout_executor="process",
     # data args
     non_serializable_datetime_format="%d %b %Y",
+    compact_data=False,
     # main viz args
     width=DEFAULT_WIDTH,
     height=DEFAULT_HEIGHT,
     prop_kwargs=None,
     padding=None,
     nodes_layer_params=None,
+    layout_cache=None,
+    stats=None,
 ):
     """Plot NetworkX Graph with altair
 
@@ -58,8 +104,9 @@ def alph(
                                             a networkx "pos"-style structure, structured as
                                             {"a_node_id": array([x,y]), ...} - where -1 <= x|y <= 1
                                             attribute for a weighted network
-    :param node_args:                       Args to pass to node layer
-    :param edge_args:                       Args to pass to edge layer
+    :param node_args:                       Args to pass to node layer - or a layer to use as is, e.g. one made
+                                            by layers.nodes_layer(), which can be shared between calls and threads
+    :param edge_args:                       Args to pass to edge layer - or a layer to use as is, as for node_args
     :param combo_group_by:                  Name of node attribute to use for combo grouping
     :param combo_empty_attr_action:         What to do with nodes that have an empty value for the combo_group_by
                                             attribute:
@@ -76,8 +123,20 @@ def alph(
                                             for example {"combo_edge_attr_name": ("edge_attr_name", "sum")}
     :param combo_edge_weight_threshold:     Drop edges below this weight
     :param include_edgeless_combo_nodes:    Whether or not to incorporate disconnected combo nodes
+    :param combo_consolidate_layers:        Render all combos from a single node and edge dataset, rather than
+                                            separate layers per combo - keeps spec size and render time in check
+                                            for many combos. Data-driven scales then span all combos.
+    :param intra_combo_layout_seed:         Seed intra-combo layouts repeatably, using a seed derived from this and
+                                            the combo value; results don't depend on intra_combo_layout_workers
+    :param intra_combo_layout_workers:      Lay out intra-combo graphs concurrently, with this many workers
+    :param intra_combo_layout_executor:     "process" (default) or "thread" pool to use for concurrent intra-combo
+                                            layouts, or a concurrent.futures.Executor. Process pools need a
+                                            picklable layout_fn, so not a lambda.
     :param non_serializable_datetime_format: Format string for datetime and other temporal types that may
                                             appear in the dataset and trip up Altair
+    :param compact_data:                    Shrink the chart spec: round pixel coordinates to this many decimal
+                                            places - 1 if True - and other numbers to float32-like precision, and
+                                            replace repeated strings by integer codes looked up in the chart
     :param width:                           Figure width (px)
     :param height:                          Figure height (px)
     :param prop_kwargs:                     Additional figure layer properties, for example title
@@ -85,20 +144,114 @@ def alph(
                                             this boundary. As well as aesthetically, this is useful for ensuring
                                             nodes / captions stay inside the figure frame.
     :param nodes_layer_params:              Altair params to be added to the nodes layer via .add_params() - typically a selection
+    :param layout_cache:                    Optional alph.cache.LayoutCache - layouts of graphs, weights and layout
+                                            functions seen before are looked up rather than recomputed
+    :param stats:                           Optional dict, filled in with graph sizes, wall time per stage under
+                                            "stages", layout stats - e.g. iterations, and with a layout_cache
+                                            whether the layout was cached - under "layout" (and for combos
+                                            "combo_layout" and "intra_combo_layouts"), and marks, node and
+                                            edge counts, and dataset rows and bytes per layer under "layers"
+    """
+
+    plan = prepare(
+        G,
+        weight_attr=weight_attr,
+        layout_fn=layout_fn,
+        combo_group_by=combo_group_by,
+        combo_node_additional_attrs=combo_node_additional_attrs,
+        combo_layout_fn=combo_layout_fn,
+        combo_empty_attr_action=combo_empty_attr_action,
+        combo_size_scale_domain=combo_size_scale_domain,
+        combo_size_scale_range=combo_size_scale_range,
+        combo_inner_graph_scale_factor=combo_inner_graph_scale_factor,
+        combo_edge_weight_agg_attr=combo_edge_weight_agg_attr,
+        combo_edge_agg_attrs=combo_edge_agg_attrs,
+        combo_edge_weight_threshold=combo_edge_weight_threshold,
+        include_edgeless_combo_nodes=include_edgeless_combo_nodes,
+        combo_consolidate_layers=combo_consolidate_layers,
+        intra_combo_layout_seed=intra_combo_layout_seed,
+        intra_combo_layout_workers=intra_combo_layout_workers,
+        intra_combo_layout_executor=intra_combo_layout_executor,
+        non_serializable_datetime_format=non_serializable_datetime_format,
+        #  only attributes that make it into layer data need sanitising - though for
+        #  combos, any may feed into combo node attributes
+        sanitise_attrs=(
+            None
+            if combo_group_by
+            else getattr(
+                _nodes_layer(False, node_args, compact_data, nodes_layer_params),
+                "data_attrs",
+                None,
+            )
+        ),
+        width=width,
+        height=height,
+        padding=padding,
+        layout_cache=layout_cache,
+        stats=stats,
+    )
+    return plan.render(
+        node_args=node_args,
+        edge_args=edge_args,
+        combo_node_args=combo_node_args,
+        combo_edge_args=combo_edge_args,
+        compact_data=compact_data,
+        prop_kwargs=prop_kwargs,
+        nodes_layer_params=nodes_layer_params,
+        stats=stats,
+    )
+
+
+def prepare(
+    G,
+    weight_attr=None,
+    layout_fn: Union[Callable, None] = None,
+    #  combo
+    combo_group_by: Union[str, list, tuple] = None,
+    combo_node_additional_attrs: Union[dict, None] = None,
+    combo_layout_fn: Union[dict, Callable] = None,
+    combo_empty_attr_action="drop",
+    combo_size_scale_domain=DEFAULT_COMBO_SIZE_SCALE_DOMAIN,
+    combo_size_scale_range=DEFAULT_COMBO_SIZE_SCALE_RANGE,
+    combo_inner_graph_scale_factor=DEFAULT_COMBO_INNER_GRAPH_SCALE_FACTOR,
+    combo_edge_weight_agg_attr=None,
+    combo_edge_agg_attrs=None,
+    combo_edge_weight_threshold=None,
+    include_edgeless_combo_nodes=True,
+    combo_consolidate_layers=False,
+    intra_combo_layout_seed=None,
+    intra_combo_layout_workers=None,
+    intra_combo_layout_executor="process",
+    # data args
+    non_serializable_datetime_format="%d %b %Y",
+    sanitise_attrs=None,
+    # main viz args
+    width=DEFAULT_WIDTH,
+    height=DEFAULT_HEIGHT,
+    padding=None,
+    layout_cache=None,
+    stats=None,
+):
     """
+    Do the style-independent work of alph() - copying and sanitising the graph, combo mapping
+    and layouts - once, returning a RenderPlan to render, and restyle, the chart from.
+
+    Takes alph()'s params, bar the styling ones - see alph(), and RenderPlan.render - plus:
 
+    :param sanitise_attrs:  node attributes to sanitise datetime values of - all of them by
+                            default, as a plan doesn't know which attributes its renders will use
+    """
     G = G.copy()
     is_combo = bool(combo_group_by)
-    # pos_args = pos_args or {}
-    # combo_pos_args = combo_pos_args or {}
     assert (layout_fn is None) or callable(layout_fn)
     assert (combo_layout_fn is None) or callable(combo_layout_fn)
-
-    node_args, edge_args = node_args or {}, edge_args or {}
-    combo_node_args, combo_edge_args = (
-        combo_node_args or {},
-        combo_edge_args or {},
+    default_layout_fn, default_combo_layout_fn = default_layout_fns(
+        is_combo, weight_attr
     )
+    layout_fn = layout_fn or default_layout_fn
+    combo_layout_fn = combo_layout_fn or default_combo_layout_fn
+    if stats is not None:
+        stats.update(nodes=G.number_of_nodes(), edges=G.number_of_edges())
 
     # Helper to bring pos co-ordinates to width / height canvas. altair can
     # do this for us anyway, however doing it ourselves, explicitly, means we don't
@@ -112,117 +265,177 @@ def alph(
         padding=padding,
     )
 
-    #  nx_altair is less tolerant of pandas date types than altair, and needs some help
-    # TODO: do this without converting to dataframe
-    #  TODO: tidy up nesting levels, generalise....
-    node_attrs_df = pd.DataFrame([node[1] for node in G.nodes(data=True)])
-    non_serializable_attrs = get_non_serializable_datetime_type_columns(
-        node_attrs_df,
-        types=PYTHON_DT_TYPES + PANDAS_DT_TYPES,
-        ignore_pandas_dt_cols=False,
-        ignore_na=False,
-    )
-    if non_serializable_attrs:
-        if non_serializable_datetime_format:
-            for _, d in G.nodes(data=True):
-                for attr in non_serializable_attrs:
-                    if pd.isnull(d.get(attr)):
-                        d[attr] = None  # NaT is still a dt type
-                    elif hasattr(d[attr], "strftime"):
-                        d[attr] = d[attr].strftime(non_serializable_datetime_format)
-                    else:
-                        # timedelta and pd.Timedelta don't have strftime
-                        d[attr] = str(d[attr])
+    #  nx_altair is less tolerant of pandas date types than altair, and needs some help
+    with timed_stage(stats, "preprocess"):
+        sanitise_non_serializable_datetime_node_attrs(
+            G, non_serializable_datetime_format, attrs=sanitise_attrs
+        )
 
-        else:
-            raise ValueError(
-                f"The following col(s) had non-serializable datetime types: {non_serializable_attrs}"
-            )
+    plan = RenderPlan(G, weight_attr=weight_attr, width=width, height=height)
 
     if is_combo:
-        layout_fn = layout_fn or partial(
-            layout.default_intra_combo_layout, weight_attr=weight_attr
-        )
-
-        inter_combo_G, intra_combo_Gs = combo.combo_graph_mapper(
-            G,
-            combo_group_by=combo_group_by,
-            weight_attr=weight_attr,
-            combo_edge_weight_agg_attr=combo_edge_weight_agg_attr,
-            combo_edge_weight_threshold=combo_edge_weight_threshold,
-            combo_node_additional_attrs=combo_node_additional_attrs,
-            combo_edge_agg_attrs=combo_edge_agg_attrs,
-            empty_combo_attr_action=combo_empty_attr_action,
-            include_edgeless_combo_nodes=include_edgeless_combo_nodes,
-            # empty_combo_attr_fill_source=combo_empty_attr_fill_source,
-        )
+        with timed_stage(stats, "combo"):
+            inter_combo_G, intra_combo_Gs = combo.combo_graph_mapper(
+                G,
+                combo_group_by=combo_group_by,
+                weight_attr=weight_attr,
+                combo_edge_weight_agg_attr=combo_edge_weight_agg_attr,
+                combo_edge_weight_threshold=combo_edge_weight_threshold,
+                combo_node_additional_attrs=combo_node_additional_attrs,
+                combo_edge_agg_attrs=combo_edge_agg_attrs,
+                empty_combo_attr_action=combo_empty_attr_action,
+                include_edgeless_combo_nodes=include_edgeless_combo_nodes,
+                # empty_combo_attr_fill_source=combo_empty_attr_fill_source,
+            )
 
-        combo_pos = (
-            combo_layout_fn(inter_combo_G)
-            if combo_layout_fn
-            else layout.default_inter_combo_layout(
-                inter_combo_G, weight_attr=weight_attr
+        with timed_stage(stats, "layout"):
+            combo_pos = _run_layout(
+                layout_cache,
+                combo_layout_fn,
+                inter_combo_G,
+                combo_edge_weight_agg_attr
+                or weight_attr
+                or combo.NEW_COMBO_EDGE_WEIGHT_AGG_ATTR_NAME,
+                stats=None if stats is None else stats.setdefault("combo_layout", {}),
             )
-        )
-        combo_pos = pos_to_altair_coords(combo_pos)
+        combo_pos = pos_to_altair_coords(NodePositions.from_pos(combo_pos))
 
-        final_layers = ll.generate_combo_layers(
-            inter_combo_G,
+        combo_sizes, intra_combo_pos = ll.place_combos(
             intra_combo_Gs,
+            combo_pos,
             intra_combo_layout_fn=layout_fn,
-            nodes_layer=ll.nodes_layer(
-                **{
-                    **dict(size=50, fill=alt.value("black")),
-                    **node_args,
-                },
-                layer_params=nodes_layer_params,
-            ),
-            edges_layer=ll.default_intra_combo_edges_layer(
-                weight_attr=weight_attr, **edge_args
-            ),
-            combo_pos=combo_pos,
-            combo_nodes_layer=ll.default_combo_nodes_layer(**combo_node_args),
-            combo_edges_layer=ll.default_combo_edges_layer(
-                weight_attr=weight_attr, **combo_edge_args
-            ),
             size_scale_domain=combo_size_scale_domain,
             size_scale_range=combo_size_scale_range,
             inner_graph_scale_factor=combo_inner_graph_scale_factor,
+            intra_combo_layout_seed=intra_combo_layout_seed,
+            intra_combo_layout_workers=intra_combo_layout_workers,
+            intra_combo_layout_executor=intra_combo_layout_executor,
+            layout_cache=layout_cache,
+            weight_attr=weight_attr,
+            stats=stats,
+        )
+        plan.combos = dict(
+            inter_combo_G=inter_combo_G,
+            intra_combo_Gs_by_cat=intra_combo_Gs,
+            combo_pos=combo_pos,
+            combo_sizes=combo_sizes,
+            intra_combo_pos=intra_combo_pos,
+            consolidate_layers=combo_consolidate_layers,
         )
 
     else:
-        if layout_fn:
-            pos = layout_fn(G)
-        else:
-            pos = layout.default_network_layout(G, weight_attr=weight_attr)
+        with timed_stage(stats, "layout"):
+            pos = _run_layout(
+                layout_cache,
+                layout_fn,
+                G,
+                weight_attr,
+                stats=None if stats is None else stats.setdefault("layout", {}),
+            )
 
-        pos = pos_to_altair_coords(pos)
+        plan.pos = pos_to_altair_coords(NodePositions.from_pos(pos))
 
-        final_layers = ll.apply_layers(
-            [
-                ll.edges_layer(weight_attr=weight_attr, **edge_args),
-                ll.default_nodes_layer(**node_args, layer_params=nodes_layer_params),
-            ],
-            G,
-            pos,
-        )
+    return plan
 
-    return (
-        alt.layer(*final_layers).properties(
-            width=width,
-            height=height,
-            **(prop_kwargs or {}),
+
+class RenderPlan:
+    """
+    A graph prepared for rendering by prepare() - sanitised, combo-mapped and laid out - along
+    with node and edge tables, built on first render. render() only rebuilds the chart layers,
+    so restyling the same graph many times is cheap.
+
+    Usage:
+        plan = prepare(G, weight_attr="weight")
+        plan.render(node_args=dict(fill="team"))
+        plan.render(node_args=dict(fill="score"), edge_args=dict(color="#ccc"))
+    """
+
+    def __init__(self, G, weight_attr=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+        self.G = G
+        self.weight_attr = weight_attr
+        self.width = width
+        self.height = height
+        self.pos = None  # NodePositions, in chart coordinates; for combos, see combos
+        self.combos = None  # place_combos results, and what they were derived from
+        self.tables = {}  # LayerTables, by graph rendered
+
+    def render(
+        self,
+        node_args=None,
+        edge_args=None,
+        combo_node_args=None,
+        combo_edge_args=None,
+        compact_data=False,
+        prop_kwargs=None,
+        nodes_layer_params=None,
+        stats=None,
+    ):
+        """
+        Chart of the prepared graph - see alph() for params
+
+        :param stats:   optional dict, filled in with per-layer stats, and time spent on layers
+        """
+        nodes_layer = _nodes_layer(
+            self.combos is not None, node_args, compact_data, nodes_layer_params
         )
-        # see https://altair-viz.github.io/user_guide/scale_resolve.html
-        .resolve_scale(
-            color="independent",
-            size="independent",
-            opacity="independent",
-            strokeWidth="independent",
-            fill="independent",
+
+        if self.combos is not None:
+            final_layers = ll.apply_combo_layers(
+                **self.combos,
+                nodes_layer=nodes_layer,
+                edges_layer=_layer(
+                    edge_args,
+                    ll.default_intra_combo_edges_layer,
+                    compact_data,
+                    weight_attr=self.weight_attr,
+                ),
+                combo_nodes_layer=_layer(
+                    combo_node_args, ll.default_combo_nodes_layer, compact_data
+                ),
+                combo_edges_layer=_layer(
+                    combo_edge_args,
+                    ll.default_combo_edges_layer,
+                    compact_data,
+                    weight_attr=self.weight_attr,
+                ),
+                stats=stats,
+                tables=self.tables,
+            )
+
+        else:
+            tables = self.tables.setdefault(None, ll.LayerTables(self.G, self.pos))
+            final_layers = ll.apply_layers(
+                [
+                    _layer(
+                        edge_args,
+                        ll.edges_layer,
+                        compact_data,
+                        weight_attr=self.weight_attr,
+                    ),
+                    nodes_layer,
+                ],
+                self.G,
+                self.pos,
+                stats=stats,
+                tables=tables,
+            )
+
+        return (
+            alt.layer(*final_layers).properties(
+                width=self.width,
+                height=self.height,
+                **(prop_kwargs or {}),
+            )
+            # see https://altair-viz.github.io/user_guide/scale_resolve.html
+            .resolve_scale(
+                color="independent",
+                size="independent",
+                opacity="independent",
+                strokeWidth="independent",
+                fill="independent",
+            )
+            # configure_* statements break ability to layer charts
+            # configure_axis not needed as we set this for every axis
+            #   .configure_axis(grid=True, title=None, ticks=False, domain=False, labels=False)
+            #   .configure_view(strokeWidth=0)  #  remove border
         )
-        # configure_* statements break ability to layer charts
-        # configure_axis not needed as we set this for every axis
-        #   .configure_axis(grid=True, title=None, ticks=False, domain=False, labels=False)
-        #   .configure_view(strokeWidth=0)  #  remove border
-    )
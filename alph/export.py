@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+
+import altair as alt
+
+from .core import alph
+from .layout import LAYOUT_EXECUTORS
+
+EXPORT_FORMATS = ("svg", "png", "pdf")
+DEFAULT_MAX_PENDING_PER_WORKER = 2
+
+
+def export_chart(G, path, format=None, save_kwargs=None, **alph_kwargs):
+    """
+    Render alph(G, **alph_kwargs) to a static image file, offline - via vl-convert, which
+    needs to be installed: `pip install "alph[export]"`.
+
+    The file is written under a temporary name, then moved into place, so a partially
+    written image never appears at path.
+
+    :param format:      "svg", "png" or "pdf" - by default taken from the path extension
+    :param save_kwargs: additional args to altair's Chart.save - e.g. scale_factor or ppi for png
+    :return:            path
+    """
+    format = format or os.path.splitext(path)[1].lstrip(".").lower()
+    if format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unsupported format {format!r} - must be one of {EXPORT_FORMATS}"
+        )
+
+    chart = alph(G, **alph_kwargs)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        chart.save(tmp_path, format=format, engine="vl-convert", **(save_kwargs or {}))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def _export_chart_task(parent_pid, G, path, format, save_kwargs, alph_kwargs):
+    if os.getpid() == parent_pid:
+        # serial or thread pool - max rows are already disabled by export_charts
+        return export_chart(G, path, format, save_kwargs, **alph_kwargs)
+
+    # a pool process runs one task at a time, so it's safe to toggle its global state
+    with alt.data_transformers.disable_max_rows():
+        return export_chart(G, path, format, save_kwargs, **alph_kwargs)
+
+
+def export_charts(
+    graphs,
+    out_dir,
+    format="png",
+    workers=None,
+    executor="process",
+    max_pending=None,
+    save_kwargs=None,
+    **alph_kwargs,
+):
+    """
+    Render many alph charts to static image files, laying out, building specs and converting
+    them concurrently, and writing each file as soon as it's done.
+
+    graphs are consumed lazily, and at most max_pending charts are in flight at once, so memory
+    stays bounded when graphs is a generator - e.g. one that builds each graph on demand.
+
+    :param graphs:          iterable of (name, G) or (name, G, alph_kwargs) - per-graph kwargs
+                            override the shared ones. Files are written to out_dir/{name}.{format}
+    :param out_dir:         output directory, created if it doesn't exist
+    :param format:          "svg", "png" or "pdf"
+    :param workers:         number of workers; None or 1 renders serially
+    :param executor:        "process" (default) or "thread", or a concurrent.futures.Executor to
+                            submit to - along with workers or max_pending. Process pools need
+                            picklable kwargs - e.g. no lambdas - and spawn their workers, so scripts
+                            need an `if __name__ == "__main__":` guard
+    :param max_pending:     max charts submitted but not yet written - by default twice the workers
+    :param save_kwargs:     additional args to altair's Chart.save - e.g. scale_factor for png
+    :param alph_kwargs:     args to alph() shared by all graphs
+    :return:                dict of {name: path}, in completion order
+    """
+    assert isinstance(executor, Executor) or executor in LAYOUT_EXECUTORS
+    if isinstance(executor, Executor) and not (workers or max_pending):
+        raise ValueError(
+            "Pass workers or max_pending along with an Executor, to bound pending charts"
+        )
+    if format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unsupported format {format!r} - must be one of {EXPORT_FORMATS}"
+        )
+    os.makedirs(out_dir, exist_ok=True)
+
+    def tasks():
+        for name, G, *graph_kwargs in graphs:
+            path = os.path.join(out_dir, f"{name}.{format}")
+            kwargs = {**alph_kwargs, **(graph_kwargs[0] if graph_kwargs else {})}
+            yield name, (os.getpid(), G, path, format, save_kwargs, kwargs)
+
+    res = {}
+    use_pool = isinstance(executor, Executor) or (workers or 1) > 1
+    with alt.data_transformers.disable_max_rows():
+        if not use_pool:
+            for name, args in tasks():
+                res[name] = _export_chart_task(*args)
+            return res
+
+        if isinstance(executor, Executor):
+            pool = executor
+        elif executor == "process":
+            # forked workers can inherit a renderer runtime mid-use and deadlock, so spawn them
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            pool = LAYOUT_EXECUTORS[executor](max_workers=workers)
+        max_pending = max_pending or DEFAULT_MAX_PENDING_PER_WORKER * workers
+        pending = {}
+        try:
+            for name, args in tasks():
+                pending[pool.submit(_export_chart_task, *args)] = name
+                # wait for a free slot before taking the next graph
+                while len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    res.update({pending.pop(f): f.result() for f in done})
+
+            for f in as_completed(pending):
+                res[pending[f]] = f.result()
+        finally:
+            if pool is not executor:
+                pool.shutdown(cancel_futures=True)
+
+    return res
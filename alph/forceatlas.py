@@ -0,0 +1,673 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from .util import nx_edge_index_arrays
+
+QUADTREE_MAX_DEPTH = 20  # cells this deep are leaves, even with several nodes
+EXACT_REPULSION_CHUNK_SIZE = 512  # rows of pairwise distances to compute at a time
+MIN_SPEED_EFFICIENCY = 0.05
+MAX_SPEED_RISE = 0.5
+MAX_JITTER_TOLERANCE = 10
+CONVERGENCE_WINDOW = 20  # iterations over which to measure net displacement
+CONVERGENCE_MIN_ITERATIONS = 60
+PARALLEL_MIN_NODES = 2000  # smaller graphs aren't worth the per-iteration sync overhead
+
+
+def graph_arrays(G, weight_attr=None):
+    """
+    Node list, edges as de-duplicated, undirected source / target index arrays with weights,
+    and ForceAtlas2 node masses (1 + degree). Parallel or reciprocal edges are merged,
+    summing their weights; edges without weight_attr weigh 1, and zero-weight edges are dropped.
+
+    :return: nodes, sources, targets, weights, mass
+    """
+    nodes = list(G.nodes())
+    num_nodes = len(nodes)
+    sources, targets, data = nx_edge_index_arrays(
+        G, {n: i for i, n in enumerate(nodes)}
+    )
+    weights = (
+        np.array([d.get(weight_attr, 1) for d in data], dtype=float)
+        if weight_attr
+        else np.ones(len(sources))
+    )
+
+    pair_ids, inverse = np.unique(
+        np.minimum(sources, targets) * num_nodes + np.maximum(sources, targets),
+        return_inverse=True,
+    )
+    weights = np.bincount(inverse.ravel(), weights=weights, minlength=len(pair_ids))
+    keep = weights != 0
+    sources, targets = np.divmod(pair_ids[keep], max(num_nodes, 1))
+
+    # self loops count once towards degree
+    degree = np.bincount(sources, minlength=num_nodes) + np.bincount(
+        targets[targets != sources], minlength=num_nodes
+    )
+
+    return nodes, sources, targets, weights[keep], 1.0 + degree
+
+
+def initial_positions(nodes, pos=None, seed=None):
+    """
+    (n, 2) starting coordinates: from pos where given, uniformly random in the unit square
+    otherwise - repeatably if seeded, else from the global numpy RNG
+    """
+    rng = np.random.default_rng(seed) if seed is not None else np.random
+    xy = rng.random((len(nodes), 2))
+    if pos:
+        for i, n in enumerate(nodes):
+            if n in pos:
+                xy[i] = pos[n]
+    return xy
+
+
+def _scatter_add(index, values, num_nodes):
+    """Sum (k, 2) values into (num_nodes, 2) rows given by index, with a single bincount"""
+    flat_index = (index[:, None] * 2 + (0, 1)).ravel()
+    return np.bincount(
+        flat_index, weights=values.ravel(), minlength=num_nodes * 2
+    ).reshape(num_nodes, 2)
+
+
+def _norm(v):
+    return np.sqrt(np.einsum("ij,ij->i", v, v))
+
+
+########
+# Barnes-Hut
+########
+
+
+class QuadTree(NamedTuple):
+    """Array-backed quadtree: cell i's children are child_start[i] ... + child_count[i]"""
+
+    size: np.ndarray  # cell widths
+    mass: np.ndarray
+    com: np.ndarray  # (cells, 2) centres of mass
+    depth: np.ndarray
+    child_start: np.ndarray
+    child_count: np.ndarray  # 0 for leaves
+    body_path: (
+        np.ndarray
+    )  # (max depth + 1, nodes) cell holding each node at each depth, or -1
+
+
+def build_quadtree(xy, mass, max_depth=QUADTREE_MAX_DEPTH):
+    """
+    Build a quadtree over node positions, a level at a time - splitting all cells that hold
+    more than one node into their non-empty quadrants in one go.
+    """
+    num_nodes = len(xy)
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    total_mass = mass.sum()
+
+    centres, sizes = [((lo + hi) / 2)[None]], [np.array([max((hi - lo).max(), 1e-12)])]
+    masses, coms = [np.array([total_mass])], [(mass @ xy / total_mass)[None]]
+    counts, depths = [np.array([num_nodes])], [np.array([0])]
+    links = []  # (parent cells, their first child, number of children) per level
+
+    body_path = np.full((max_depth + 1, num_nodes), -1, dtype=np.intp)
+    body_path[0] = 0
+
+    bodies = np.arange(num_nodes)
+    body_cell = np.zeros(num_nodes, dtype=np.intp)  # index within the latest level
+    offset = 0  # index of the latest level's first cell
+    for depth in range(1, max_depth + 1):
+        in_split = counts[-1][body_cell] > 1
+        if not in_split.any():
+            break
+        bodies, body_cell = bodies[in_split], body_cell[in_split]
+
+        body_xy, parent_centre = xy[bodies], centres[-1][body_cell]
+        quadrant = (body_xy[:, 0] >= parent_centre[:, 0]) + 2 * (
+            body_xy[:, 1] >= parent_centre[:, 1]
+        )
+        keys, body_cell = np.unique(body_cell * 4 + quadrant, return_inverse=True)
+        body_cell = body_cell.ravel()
+        parent, quadrant = np.divmod(keys, 4)
+
+        child_size = sizes[-1][parent] / 2
+        offsets = np.stack([quadrant % 2, quadrant // 2], axis=1) - 0.5
+        centres.append(centres[-1][parent] + offsets * child_size[:, None])
+        sizes.append(child_size)
+
+        body_mass = mass[bodies]
+        cell_mass = np.bincount(body_cell, weights=body_mass)
+        masses.append(cell_mass)
+        coms.append(_scatter_add(body_cell, body_xy * body_mass[:, None], len(keys)))
+        coms[-1] /= cell_mass[:, None]
+        counts.append(np.bincount(body_cell))
+        depths.append(np.full(len(keys), depth))
+
+        next_offset = offset + len(counts[-2])
+        parents, first_child, num_children = np.unique(
+            parent, return_index=True, return_counts=True
+        )
+        links.append((offset + parents, next_offset + first_child, num_children))
+        body_path[depth, bodies] = next_offset + body_cell
+        offset = next_offset
+
+    num_cells = offset + len(counts[-1])
+    child_start = np.zeros(num_cells, dtype=np.intp)
+    child_count = np.zeros(num_cells, dtype=np.intp)
+    for parents, first_child, num_children in links:
+        child_start[parents] = first_child
+        child_count[parents] = num_children
+
+    return QuadTree(
+        size=np.concatenate(sizes),
+        mass=np.concatenate(masses),
+        com=np.concatenate(coms),
+        depth=np.concatenate(depths),
+        child_start=child_start,
+        child_count=child_count,
+        body_path=body_path,
+    )
+
+
+def barnes_hut_repulsion(xy, mass, coefficient, theta, tree=None, nodes=None):
+    """
+    Approximate repulsion forces: all nodes walk the quadtree together, as an array of
+    (node, cell) pairs. A cell that is a leaf, or small relative to its distance from the
+    node (size / distance < theta), repels the node as a single body at its centre of mass;
+    other cells are opened up into their children for the next round.
+
+    :param nodes:   slice of nodes to compute forces on - all by default
+    """
+    tree = tree if tree is not None else build_quadtree(xy, mass)
+    theta_sq = theta**2
+    acted_on, contributions = [], []
+
+    node = np.arange(len(xy))[nodes if nodes is not None else slice(None)]
+    first_node, num_nodes = (node[0] if len(node) else 0), len(node)
+    cell = np.zeros(num_nodes, dtype=np.intp)
+    while len(node):
+        delta = xy[node] - tree.com[cell]
+        dist_sq = np.einsum("ij,ij->i", delta, delta)
+        accept = (tree.child_count[cell] == 0) | (
+            tree.size[cell] ** 2 < theta_sq * dist_sq
+        )
+
+        a_node, a_cell = node[accept], cell[accept]
+        a_delta, a_dist_sq = delta[accept], dist_sq[accept]
+        a_mass = tree.mass[a_cell]
+
+        # take nodes' own mass out of the cells that hold them: the rest of the cell's
+        # mass sits at com + (com - xy) * m / (M - m)
+        own = tree.body_path[tree.depth[a_cell], a_node] == a_cell
+        if own.any():
+            o_node, o_cell = a_node[own], a_cell[own]
+            rest_mass = a_mass[own] - mass[o_node]
+            a_delta[own] *= np.divide(
+                a_mass[own],
+                rest_mass,
+                out=np.zeros_like(rest_mass),
+                where=rest_mass > 0,
+            )[:, None]
+            a_mass[own] = rest_mass
+            a_dist_sq[own] = np.einsum("ij,ij->i", a_delta[own], a_delta[own])
+            # nodes sharing a max depth leaf are all but coincident - soften their repulsion
+            leaf = tree.child_count[o_cell] == 0
+            a_dist_sq[own] = np.where(
+                leaf,
+                np.maximum(a_dist_sq[own], tree.size[o_cell] ** 2),
+                a_dist_sq[own],
+            )
+
+        factor = np.divide(
+            coefficient * mass[a_node] * a_mass,
+            a_dist_sq,
+            out=np.zeros(len(a_node)),
+            where=a_dist_sq > 0,
+        )
+        acted_on.append(a_node)
+        contributions.append(a_delta * factor[:, None])
+
+        node, cell = node[~accept], cell[~accept]
+        num_children = tree.child_count[cell]
+        node = np.repeat(node, num_children)
+        first = np.repeat(tree.child_start[cell], num_children)
+        cell = first + (
+            np.arange(len(node))
+            - np.repeat(np.cumsum(num_children) - num_children, num_children)
+        )
+
+    if not acted_on:
+        return np.zeros((0, 2))
+    return _scatter_add(
+        np.concatenate(acted_on) - first_node,
+        np.concatenate(contributions),
+        num_nodes,
+    )
+
+
+########
+# forces
+########
+
+
+def exact_repulsion(
+    xy, mass, coefficient, nodes=None, chunk_size=EXACT_REPULSION_CHUNK_SIZE
+):
+    """
+    Repulsion between all node pairs, k * m1 * m2 / distance
+
+    :param nodes:   slice of nodes to compute forces on - all by default
+    """
+    rows = np.arange(len(xy))[nodes if nodes is not None else slice(None)]
+    forces = np.empty((len(rows), 2))
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+        delta = xy[chunk, None, :] - xy[None, :, :]
+        dist_sq = np.einsum("ijk,ijk->ij", delta, delta)
+        factor = np.divide(
+            coefficient * mass[chunk, None] * mass[None, :],
+            dist_sq,
+            out=np.zeros_like(dist_sq),
+            where=dist_sq > 0,
+        )
+        forces[start : start + chunk_size] = np.einsum("ij,ijk->ik", factor, delta)
+    return forces
+
+
+def gravity_forces(xy, mass, gravity, strong=False, scaling_ratio=1.0):
+    """
+    Pull towards the origin: k * m regardless of distance, or in strong gravity mode,
+    proportional to distance too
+    """
+    if strong:
+        return -xy * (scaling_ratio * gravity * mass)[:, None]
+
+    dist = _norm(xy)
+    factor = np.divide(gravity * mass, dist, out=np.zeros_like(dist), where=dist > 0)
+    return -xy * factor[:, None]
+
+
+def attraction_forces(
+    xy, mass, sources, targets, weights, coefficient, distributed=False, lin_log=False
+):
+    """
+    Pull between linked nodes, proportional to distance - or log(1 + distance) in lin-log
+    mode - and edge weight; divided by source mass when distributing attraction
+    """
+    delta = xy[sources] - xy[targets]
+    factor = -coefficient * weights
+    if lin_log:
+        dist = _norm(delta)
+        factor = factor * np.divide(
+            np.log1p(dist), dist, out=np.zeros_like(dist), where=dist > 0
+        )
+    if distributed:
+        factor = factor / mass[sources]
+
+    edge_forces = delta * factor[:, None]
+    return _scatter_add(
+        np.concatenate([sources, targets]),
+        np.concatenate([edge_forces, -edge_forces]),
+        len(xy),
+    )
+
+
+def adjust_speed(forces, prev_forces, mass, speed, speed_efficiency, jitter_tolerance):
+    """
+    Adapt global speed to how much nodes oscillate ("swing") versus move consistently
+    ("traction") between iterations.
+
+    :return: speed, speed_efficiency, per-node swinging
+    """
+    swinging = mass * _norm(prev_forces - forces)
+    total_swinging = swinging.sum()
+    total_traction = 0.5 * mass @ _norm(prev_forces + forces)
+
+    num_nodes = len(forces)
+    estimated_jitter = 0.05 * np.sqrt(num_nodes)
+    jitter = jitter_tolerance * max(
+        np.sqrt(estimated_jitter),
+        min(MAX_JITTER_TOLERANCE, estimated_jitter * total_traction / num_nodes**2),
+    )
+
+    if total_traction and total_swinging / total_traction > 2.0:
+        if speed_efficiency > MIN_SPEED_EFFICIENCY:
+            speed_efficiency *= 0.5
+        jitter = max(jitter, jitter_tolerance)
+
+    target_speed = (
+        jitter * speed_efficiency * total_traction / total_swinging
+        if total_swinging
+        else np.inf
+    )
+
+    if total_swinging > jitter * total_traction:
+        if speed_efficiency > MIN_SPEED_EFFICIENCY:
+            speed_efficiency *= 0.7
+    elif speed < 1000:
+        speed_efficiency *= 1.3
+
+    speed = speed + min(target_speed - speed, MAX_SPEED_RISE * speed)
+    return speed, speed_efficiency, swinging
+
+
+def repulsion_forces(xy, mass, scaling_ratio, barnes_hut_theta=None, nodes=None):
+    """Barnes-Hut approximated repulsion if a theta is given, exact otherwise"""
+    if barnes_hut_theta:
+        return barnes_hut_repulsion(
+            xy, mass, scaling_ratio, barnes_hut_theta, nodes=nodes
+        )
+    return exact_repulsion(xy, mass, scaling_ratio, nodes=nodes)
+
+
+########
+# parallel forces
+########
+
+_worker = {}  # per worker process: shared memory handles, array views, force args
+
+
+def _block(length, num_blocks, i):
+    bounds = np.linspace(0, length, num_blocks + 1).astype(int)
+    return slice(bounds[i], bounds[i + 1])
+
+
+def _init_force_worker(spec, args):
+    _worker["handles"], _worker["arrays"] = [], {}
+    for key, (name, shape, dtype) in spec.items():
+        handle = shared_memory.SharedMemory(name=name)
+        _worker["handles"].append(handle)
+        _worker["arrays"][key] = np.ndarray(shape, dtype=dtype, buffer=handle.buf)
+    _worker["args"] = args
+
+
+def _compute_block_forces(i):
+    """Repulsion on the i-th block of nodes, and attraction along the i-th chunk of edges"""
+    arrays, args = _worker["arrays"], _worker["args"]
+    xy, mass = arrays["xy"], arrays["mass"]
+    nodes = _block(len(xy), args["num_blocks"], i)
+    edges = _block(len(arrays["sources"]), args["num_blocks"], i)
+
+    arrays["repulsion"][nodes] = repulsion_forces(
+        xy, mass, **args["repulsion"], nodes=nodes
+    )
+    arrays["attraction"][i] = attraction_forces(
+        xy,
+        mass,
+        arrays["sources"][edges],
+        arrays["targets"][edges],
+        arrays["weights"][edges],
+        **args["attraction"],
+    )
+
+
+class SharedForcePool:
+    """
+    Worker processes that compute forces in parallel, reading positions from and writing
+    forces to shared memory, so nothing is copied between iterations. Worker i computes
+    repulsion on the i-th block of nodes, and attraction along the i-th chunk of edges into
+    its own buffer; buffers are summed in worker order, so results are deterministic for
+    a given number of workers.
+
+    Use as a context manager, updating `xy` - the shared positions - in place.
+    """
+
+    def __init__(
+        self,
+        xy,
+        mass,
+        sources,
+        targets,
+        weights,
+        workers,
+        repulsion_args,
+        attraction_args,
+    ):
+        self.workers = workers
+        self._handles, self._arrays, self._pool = [], {}, None
+        arrays = dict(
+            xy=xy,
+            mass=mass,
+            sources=sources,
+            targets=targets,
+            weights=weights,
+            repulsion=np.zeros_like(xy),
+            attraction=np.zeros((workers, *xy.shape)),
+        )
+        spec = {}
+        try:
+            for key, arr in arrays.items():
+                handle = shared_memory.SharedMemory(
+                    create=True, size=max(arr.nbytes, 1)
+                )
+                self._handles.append(handle)
+                self._arrays[key] = np.ndarray(
+                    arr.shape, dtype=arr.dtype, buffer=handle.buf
+                )
+                self._arrays[key][...] = arr
+                spec[key] = (handle.name, arr.shape, arr.dtype.str)
+
+            args = dict(
+                num_blocks=workers, repulsion=repulsion_args, attraction=attraction_args
+            )
+            self._pool = ProcessPoolExecutor(
+                workers, initializer=_init_force_worker, initargs=(spec, args)
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def xy(self):
+        return self._arrays["xy"]
+
+    def forces(self):
+        """Repulsion and attraction forces at the current shared positions"""
+        list(self._pool.map(_compute_block_forces, range(self.workers)))
+        return self._arrays["repulsion"] + self._arrays["attraction"].sum(axis=0)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._arrays.clear()  # views must go before their memory can be closed
+        for handle in self._handles:
+            handle.close()
+            handle.unlink()
+        self._handles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+########
+# layout
+########
+
+
+def window_displacement(xy, window_xy, window_path):
+    """
+    Nodes' mean net displacement since window_xy, relative to the layout's RMS radius, and
+    swing: the fraction of the mean distance travelled, window_path, that cancelled out
+
+    :return: displacement, swing
+    """
+    centred = xy - xy.mean(axis=0)
+    radius = np.sqrt(np.einsum("ij,ij->", centred, centred) / len(xy))
+    net = _norm(xy - window_xy).mean()
+    swing = 1 - net / window_path if window_path else 0.0
+    return (net / radius if radius else 0.0), swing
+
+
+def forceatlas2(
+    xy,
+    mass,
+    sources,
+    targets,
+    weights,
+    iterations=100,
+    outboundAttractionDistribution=False,
+    linLogMode=False,
+    adjustSizes=False,
+    edgeWeightInfluence=1.0,
+    jitterTolerance=1.0,
+    barnesHutOptimize=True,
+    barnesHutTheta=1.2,
+    multiThreaded=False,
+    scalingRatio=2.0,
+    strongGravityMode=False,
+    gravity=1.0,
+    verbose=False,
+    convergence_tolerance=None,
+    stats=None,
+    workers=None,
+    parallel_min_nodes=PARALLEL_MIN_NODES,
+):
+    """
+    Run ForceAtlas2 on array inputs - see graph_arrays and initial_positions - taking the
+    same, Gephi-named parameters as the fa2 library.
+
+    :param iterations:              iterations to run - or, with convergence_tolerance, the most
+                                    to run
+    :param convergence_tolerance:   if given, stop early once nodes' mean net displacement per
+                                    iteration, over a window of CONVERGENCE_WINDOW iterations and
+                                    relative to the layout's RMS radius, falls below this
+    :param stats:                   optional dict, filled in with iterations run, whether the
+                                    layout converged, and the last window's displacement per
+                                    iteration and swing - the fraction of movement that
+                                    cancelled out
+    :param multiThreaded:           compute forces with a worker process per CPU, unless
+                                    workers is given
+    :param workers:                 number of worker processes to compute forces with - see
+                                    SharedForcePool. Results are deterministic for a given seed
+                                    and number of workers
+    :param parallel_min_nodes:      graphs with fewer nodes are laid out serially regardless
+    :return:                        (n, 2) array of final positions
+    """
+    if adjustSizes:
+        raise NotImplementedError("adjustSizes is not supported")
+
+    xy = np.array(xy, dtype=float)
+    num_nodes = len(xy)
+    if not num_nodes:
+        if stats is not None:
+            stats.update(
+                iterations=0, converged=False, displacement=np.nan, swing=np.nan
+            )
+        return xy
+
+    if edgeWeightInfluence == 0:
+        weights = np.ones_like(weights)
+    elif edgeWeightInfluence != 1:
+        weights = np.power(weights, edgeWeightInfluence)
+    attraction_coefficient = mass.mean() if outboundAttractionDistribution else 1.0
+
+    repulsion_args = dict(
+        scaling_ratio=scalingRatio,
+        barnes_hut_theta=barnesHutTheta if barnesHutOptimize else None,
+    )
+    attraction_args = dict(
+        coefficient=attraction_coefficient,
+        distributed=outboundAttractionDistribution,
+        lin_log=linLogMode,
+    )
+    iterate_args = dict(
+        mass=mass,
+        iterations=iterations,
+        jitter_tolerance=jitterTolerance,
+        gravity_args=dict(
+            gravity=gravity, strong=strongGravityMode, scaling_ratio=scalingRatio
+        ),
+        convergence_tolerance=convergence_tolerance,
+    )
+    workers = workers or (os.cpu_count() if multiThreaded else 1)
+
+    start = time.perf_counter()
+    if workers > 1 and num_nodes >= parallel_min_nodes:
+        with SharedForcePool(
+            xy,
+            mass,
+            sources,
+            targets,
+            weights,
+            workers,
+            repulsion_args,
+            attraction_args,
+        ) as pool:
+            run_stats = _iterate(pool.xy, pool.forces, **iterate_args)
+            xy = pool.xy.copy()
+    else:
+
+        def forces():
+            return repulsion_forces(xy, mass, **repulsion_args) + attraction_forces(
+                xy, mass, sources, targets, weights, **attraction_args
+            )
+
+        run_stats = _iterate(xy, forces, **iterate_args)
+
+    if stats is not None:
+        stats.update(run_stats)
+    if verbose:
+        print(
+            f"ForceAtlas2: {run_stats['iterations']} iterations over {num_nodes} nodes "
+            f"in {time.perf_counter() - start:.2f}s"
+            f"{' - converged' if run_stats['converged'] else ''}"
+        )
+
+    return xy
+
+
+def _iterate(
+    xy,
+    forces_fn,
+    mass,
+    iterations,
+    jitter_tolerance,
+    gravity_args,
+    convergence_tolerance=None,
+):
+    """
+    Move nodes, in place, by forces_fn() plus gravity forces at each iteration, with
+    adaptive speed, until the iteration limit - or convergence, if there's a tolerance
+
+    :return: run stats - see forceatlas2
+    """
+    speed, speed_efficiency = 1.0, 1.0
+    forces = np.zeros_like(xy)
+    num_iterations, converged = 0, False
+    window_xy, window_path, displacement, swing = xy.copy(), 0.0, np.nan, np.nan
+    while num_iterations < iterations:
+        prev_forces = forces
+        forces = forces_fn() + gravity_forces(xy, mass, **gravity_args)
+
+        speed, speed_efficiency, swinging = adjust_speed(
+            forces, prev_forces, mass, speed, speed_efficiency, jitter_tolerance
+        )
+        step = forces * (speed / (1.0 + np.sqrt(speed * swinging)))[:, None]
+        xy += step
+        num_iterations += 1
+
+        if convergence_tolerance is None:
+            continue
+        window_path += _norm(step).mean()
+        if num_iterations % CONVERGENCE_WINDOW == 0:
+            displacement, swing = window_displacement(xy, window_xy, window_path)
+            displacement /= CONVERGENCE_WINDOW
+            converged = (
+                displacement < convergence_tolerance
+                and num_iterations >= CONVERGENCE_MIN_ITERATIONS
+            )
+            if converged:
+                break
+            window_xy, window_path = xy.copy(), 0.0
+
+    return dict(
+        iterations=num_iterations,
+        converged=converged,
+        displacement=displacement,
+        swing=swing,
+    )
@@ -1,13 +1,41 @@
+import re
+import threading
+
 import altair as alt
 import networkx as nx
 import numpy as np
 import pandas as pd
+from altair.expr.core import Expression
+from altair.utils import parse_shorthand
+from altair.utils.schemapi import SchemaBase
 
-from . import combo
-from .util import normalise_pos
+from . import combo, layout
+from .util import NodePositions, normalise_pos, nx_edge_index_arrays, timed_stage
 
 DEFAULT_NODE_SIZE = (2 * 10) ** 2
 COMBO_SIZE_ATTR_NAME = "__combo_size"
+# shipped with layer data whether encoded or not, to tell combos apart in consolidated layers
+ALWAYS_KEPT_ATTRS = (combo.COMBO_GROUP_VALUE_ATTR,)
+# compact layer data - see _compact_data
+COMPACT_COORD_DECIMALS = 1
+COMPACT_SIGNIFICANT_DIGITS = 7  # about float32 precision
+COMPACT_LOOKUP_OVERHEAD = 100  # approx. serialised lookup transform size, in chars
+COMPACT_MAX_INT = (
+    2**53
+)  # whole floats beyond this may not be exact ints - kept as floats
+PIXEL_COLUMNS = (
+    "x",
+    "y",
+    "x2",
+    "y2",
+    "__node_size",
+    "__node_r",
+    "__node_halo_size",
+    "__y_label",
+)
+DATUM_FIELD_PATTERN = re.compile(
+    r"datum\.([A-Za-z_$][\w$]*)|datum\[\s*(['\"])(.*?)\2\s*\]"
+)
 
 
 def _interpolate_node_size_from_num_nodes(G, num_nodes_range, size_range):
@@ -45,56 +73,251 @@ def _wrap_altair_str_value(val):
     return val
 
 
-def _nx_nodes_to_pandas(G, pos):
-    attributes = list(
-        set(["x", "y"] + [k for n in G.nodes() for k in G.nodes[n].keys()])
-    )
+def _field_names(field):
+    """Column names a Vega-Lite field may refer to: the field itself, with escapes removed,
+    and the top-level attribute of a nested field path like `a.b` or `a[0]`"""
+    root = re.split(r"(?<!\\)[.\[]", field, maxsplit=1)[0]
+    return {re.sub(r"\\(.)", r"\1", field), re.sub(r"\\(.)", r"\1", root)}
+
+
+def _encoding_fields(*encodings):
+    """
+    Names of data fields referenced by layer encodings and params - Altair channel objects,
+    alt.condition dicts, selection params, or field name strings, like tooltip_attrs.
+    Includes fields referenced by condition test expressions, like `datum.name == 'x'`.
+    """
+    fields = set()
+
+    def walk(obj, key=None):
+        # test expressions - strings or alt.datum expressions - before other schema objects,
+        # as expressions are schema objects too
+        if key == "test" and isinstance(obj, (str, Expression)):
+            for match in DATUM_FIELD_PATTERN.finditer(str(obj)):
+                fields.add(match.group(1) or match.group(3))
+        elif isinstance(obj, alt.Parameter):
+            walk(obj.param)
+        elif isinstance(obj, SchemaBase):
+            walk(obj._kwds)
+        elif isinstance(obj, dict):
+            for k, v in obj.items():
+                walk(v, k)
+        elif isinstance(obj, (list, tuple)):
+            for v in obj:
+                walk(v, key)
+        elif isinstance(obj, str):
+            if key in (None, "shorthand"):
+                obj = parse_shorthand(obj).get("field")
+            if obj and key in (None, "shorthand", "field", "fields"):
+                fields.update(_field_names(obj))
+
+    for encoding in encodings:
+        walk(encoding)
+    return fields
+
+
+def _prune_columns(data, fields, keep_attrs=None):
+    """
+    Only the columns of data that are in fields or keep_attrs, plus ALWAYS_KEPT_ATTRS - or all
+    of them if keep_attrs is True
+    """
+    if keep_attrs is True:
+        return data
+    keep = {*fields, *_optional_str_or_seq_arg(keep_attrs), *ALWAYS_KEPT_ATTRS}
+    return data[[c for c in data.columns if c in keep]]
+
+
+def _round_significant(values, digits):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decimals = digits - 1 - np.floor(np.log10(np.abs(values)))
+    decimals = np.clip(np.where(np.isfinite(decimals), decimals, 0), -300, 300)
+    scale = 10.0**decimals
+    return np.round(values * scale) / scale
+
+
+def _compact_data(data, compact_data):
+    """
+    Shrink layer data as serialised: round pixel coordinate columns to a number of decimal
+    places - compact_data, or COMPACT_COORD_DECIMALS if True - and other float columns to
+    COMPACT_SIGNIFICANT_DIGITS, storing whole numbers as ints; and replace string columns with
+    repeated values by short codes, where that saves space.
+
+    :return:    compacted data, and {column: {code: value}} for coded columns - see
+                _with_lookups
+    """
+    if compact_data is None or compact_data is False:
+        return data, {}
+    decimals = COMPACT_COORD_DECIMALS if compact_data is True else compact_data
+
+    columns, lookups = {}, {}
+    for col in data.columns:
+        values = data[col]
+        if pd.api.types.is_float_dtype(values):
+            values = values.to_numpy(dtype=float)
+            values = (
+                np.round(values, decimals)
+                if col in PIXEL_COLUMNS
+                else _round_significant(values, COMPACT_SIGNIFICANT_DIGITS)
+            )
+            if (
+                len(values)
+                and np.all(np.isfinite(values) & (values == np.round(values)))
+                and np.abs(values).max() < COMPACT_MAX_INT
+            ):
+                values = values.astype(np.int64)
+        elif values.dtype == object or pd.api.types.is_string_dtype(values):
+            codes, uniques = pd.factorize(values)
+            if len(uniques) and all(isinstance(v, str) for v in uniques):
+                # short string codes, so Altair still infers the column as nominal
+                code_strs = np.array(
+                    [np.base_repr(i, 36) for i in range(len(uniques))] + [None],
+                    dtype=object,
+                )
+                if _coding_saves_space(col, codes, uniques, code_strs):
+                    values = code_strs[codes]
+                    lookups[col] = dict(zip(code_strs, uniques))
+        columns[col] = values
+
+    return pd.DataFrame(columns, index=data.index), lookups
+
+
+def _coding_saves_space(col, codes, uniques, code_strs):
+    """Whether serialised values shrink by more than a lookup table for them takes up"""
+    value_len = np.array([len(v) for v in uniques])
+    code_len = np.array([len(c) for c in code_strs[:-1]])
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    saved = (counts * (value_len - code_len)).sum()
+    # each lookup row is like {"__code":"0","col":"value"},
+    cost = (value_len + code_len + len(col) + 20).sum() + COMPACT_LOOKUP_OVERHEAD
+    return saved > cost
+
+
+def _with_lookups(chart, lookups):
+    """Chart with lookup transforms restoring values of coded columns, per _compact_data"""
+    for col, values in lookups.items():
+        chart = chart.transform_lookup(
+            lookup=col,
+            from_=alt.LookupData(
+                data=alt.InlineData(
+                    values=[{"__code": code, col: v} for code, v in values.items()]
+                ),
+                key="__code",
+                fields=[col],
+            ),
+        )
+    return chart
 
-    df = pd.DataFrame(index=G.nodes(), columns=attributes)
 
-    for n in G.nodes:
-        data = dict(x=pos[n][0], y=pos[n][1], **G.nodes[n])
-        df.loc[n] = data
+def _columns_from_records(records, length):
+    """Gather attribute dicts into per-attribute value lists in a single pass,
+    with None where a record lacks an attribute - so pandas can infer proper
+    column dtypes rather than falling back to object"""
+    columns = {}
+    for i, record in enumerate(records):
+        for k, v in record.items():
+            if k not in columns:
+                columns[k] = [None] * length
+            columns[k][i] = v
+    return columns
 
-    return df
 
+def _pos_to_array(pos, nodes):
+    """(n, 2) float array of pos coords, in given node order"""
+    if isinstance(pos, NodePositions):
+        return pos.take(nodes)
+    return np.array([pos[n] for n in nodes], dtype=float).reshape(-1, 2)
 
-def _nx_edges_to_pandas(G, pos, **kwargs):
-    attributes = set(
-        ["source", "target", "x", "y", "edge", "pair"]
-        + [k for e in G.edges() for k in G.edges[e].keys()]
-    )
-    attributes = list(set(attributes))
 
-    df = pd.DataFrame(index=range(G.size() * 2), columns=attributes)
+def _nx_nodes_to_pandas(G, pos):
+    nodes = list(G.nodes())
+    columns = _columns_from_records((d for _, d in G.nodes(data=True)), len(nodes))
+    xy = _pos_to_array(pos, nodes)
 
-    for i, e in enumerate(G.edges):
-        idx = i * 2
+    return pd.DataFrame(
+        {**columns, "x": xy[:, 0], "y": xy[:, 1]},
+        index=pd.Index(nodes, tupleize_cols=False),
+    )
 
-        d1 = dict(
-            edge=i,
-            source=e[0],
-            target=e[1],
-            pair=e,
-            x=pos[e[0]][0],
-            y=pos[e[0]][1],
-            **G.edges[e],
-        )
 
-        d2 = dict(
-            edge=i,
-            source=e[0],
-            target=e[1],
-            pair=e,
-            x=pos[e[1]][0],
-            y=pos[e[1]][1],
-            **G.edges[e],
+def _nx_edges_to_pandas(G, pos, one_row_per_edge=False, **kwargs):
+    """Two rows per edge - source then target end - sharing an `edge` id, as
+    required to draw edges as lines with `detail="edge"`; or with one_row_per_edge,
+    a single row per edge with the source end at x, y and the target end at x2, y2,
+    as for rules"""
+    nodes = list(G.nodes())
+    node_index = {n: i for i, n in enumerate(nodes)}
+    xy = _pos_to_array(pos, nodes)
+
+    source_idx, target_idx, edge_data = nx_edge_index_arrays(G, node_index)
+    num_edges = len(edge_data)
+
+    node_ids = pd.Series(nodes, dtype=object)
+    columns = _columns_from_records(edge_data, num_edges)
+    sources = node_ids.take(source_idx).infer_objects().values
+    targets = node_ids.take(target_idx).infer_objects().values
+
+    if one_row_per_edge:
+        return pd.DataFrame(
+            {
+                **{
+                    k: pd.Series(v, dtype=None if len(v) else object).values
+                    for k, v in columns.items()
+                },
+                "source": sources,
+                "target": targets,
+                "x": xy[source_idx, 0],
+                "y": xy[source_idx, 1],
+                "x2": xy[target_idx, 0],
+                "y2": xy[target_idx, 1],
+            }
         )
 
-        df.loc[idx] = d1
-        df.loc[idx + 1] = d2
+    # interleave source and target ends
+    ends_idx = np.empty(num_edges * 2, dtype=int)
+    ends_idx[0::2], ends_idx[1::2] = source_idx, target_idx
+
+    def per_edge(values):
+        return pd.Series(values, dtype=None if len(values) else object).repeat(2).values
+
+    return pd.DataFrame(
+        {
+            **{k: per_edge(v) for k, v in columns.items()},
+            "edge": np.repeat(np.arange(num_edges), 2),
+            "source": per_edge(sources),
+            "target": per_edge(targets),
+            "x": xy[ends_idx, 0],
+            "y": xy[ends_idx, 1],
+        }
+    )
+
 
-    return df
+class LayerTables:
+    """
+    Node and edge tables of a graph at given positions, built on first use and then shared by
+    every layer applied to them - so restyling a graph doesn't rebuild its tables. Layers get
+    shallow copies, so columns they add don't leak into the shared tables. Safe to share between
+    threads.
+    """
+
+    def __init__(self, G, pos):
+        self.G = G
+        self.pos = pos
+        self._nodes = None
+        self._edges = {}
+        self._lock = threading.Lock()
+
+    def nodes(self):
+        with self._lock:
+            if self._nodes is None:
+                self._nodes = _nx_nodes_to_pandas(self.G, self.pos)
+            return self._nodes.copy(deep=False)
+
+    def edges(self, one_row_per_edge=False):
+        with self._lock:
+            if one_row_per_edge not in self._edges:
+                self._edges[one_row_per_edge] = _nx_edges_to_pandas(
+                    self.G, self.pos, one_row_per_edge=one_row_per_edge
+                )
+            return self._edges[one_row_per_edge].copy(deep=False)
 
 
 def nodes_layer(
@@ -114,8 +337,19 @@ def nodes_layer(
     label_color="black",
     label_text_align="center",
     layer_params=None,
+    keep_attrs=None,
+    compact_data=False,
 ):
-    """Note the use of r rather than size - more in comment below"""
+    """
+    Note the use of r rather than size - more in comment below.
+
+    Layer data only carries the node attributes referenced by encodings and layer_params.
+
+    :param keep_attrs:      further node attributes to keep in the layer data - e.g. for use
+                            in transforms added to the chart - or True to keep them all
+    :param compact_data:    shrink layer data - True, or the number of decimal places to round
+                            pixel coordinates to; see _compact_data
+    """
     size = _wrap_altair_numeric_value(size)
     fill = _wrap_altair_str_value(fill)
     opacity = _wrap_altair_numeric_value(opacity)
@@ -127,8 +361,24 @@ def nodes_layer(
 
     tooltip_attrs = _optional_str_or_seq_arg(tooltip_attrs)
 
-    def inner(G, pos):
-        data = _nx_nodes_to_pandas(G, pos)
+    fields = _encoding_fields(
+        size,
+        fill,
+        opacity,
+        stroke,
+        strokeWidth,
+        tooltip_attrs,
+        label_attr,
+        layer_params,
+        *(
+            (halo_opacity, halo_strokeWidth, halo_stroke)
+            if halo_offset is not None
+            else ()
+        ),
+    )
+
+    def inner(G, pos, tables=None):
+        data = _nx_nodes_to_pandas(G, pos) if tables is None else tables.nodes()
 
         if isinstance(size, dict):  #  alt.value
             data["__node_size"] = size["value"]
@@ -176,6 +426,12 @@ def nodes_layer(
                 - (0 if halo_offset is None else halo_offset)
             )
 
+        data = _prune_columns(
+            data,
+            {"x", "y", "__node_halo_size", "__y_label", *fields},
+            keep_attrs,
+        )
+        data, lookups = _compact_data(data, compact_data)
         chart = alt.Chart(data)
         res = None
 
@@ -216,11 +472,20 @@ def nodes_layer(
             )
             res += labels
 
+        # once for all sub-layers, which share the data
+        res = _with_lookups(res, lookups)
+
         if layer_params is not None:
             res = res.add_params(layer_params)
 
         return res
 
+    # node attributes the layer data carries - None for all of them
+    inner.data_attrs = (
+        None
+        if keep_attrs is True
+        else fields | set(_optional_str_or_seq_arg(keep_attrs))
+    )
     return inner
 
 
@@ -229,43 +494,79 @@ def edges_layer(
     color="#606060",
     opacity=None,
     strokeWidth=None,
+    mark="rule",
+    keep_attrs=None,
+    compact_data=False,
 ):
+    """
+    Layer data only carries the edge attributes referenced by encodings, plus edge source
+    and target.
+
+    :param mark:            "rule" draws each edge from a single data row, with its ends at
+                            x, y and x2, y2; "line" from two rows - one per end - grouped by
+                            edge. Rules halve the edge data, and the number of items Vega
+                            renders.
+    :param keep_attrs:      further edge attributes to keep in the layer data - e.g. for use
+                            in transforms added to the chart - or True to keep them all
+    :param compact_data:    shrink layer data - True, or the number of decimal places to round
+                            pixel coordinates to; see _compact_data
+    """
+    assert mark in ("rule", "line"), f"Unsupported edge mark: {mark}"
     color = _wrap_altair_str_value(color)
     strokeWidth = _wrap_altair_numeric_value(strokeWidth)
     opacity = _wrap_altair_numeric_value(opacity)
 
-    def inner(G, pos):
-        nonlocal opacity, strokeWidth
+    # defaults only depend on args, so are resolved here, once - inner doesn't rebind
+    # anything, so one layer can be applied to many graphs, concurrently
+    if opacity is None:
+        opacity = (
+            alt.Size(weight_attr, scale=alt.Scale(range=[0.3, 1]), legend=None)
+            if weight_attr
+            else alt.value(1.0)
+        )
+    if strokeWidth is None:
+        strokeWidth = (
+            alt.Size(weight_attr, scale=alt.Scale(range=[0.1, 5]), legend=None)
+            if weight_attr
+            else alt.value(2.0)
+        )
+    fields = _encoding_fields(opacity, strokeWidth, color)
+    one_row_per_edge = mark == "rule"
 
+    def inner(G, pos, tables=None):
         if G.number_of_edges() == 0:
             return None
 
-        if opacity is None:
-            opacity = (
-                alt.Size(weight_attr, scale=alt.Scale(range=[0.3, 1]), legend=None)
-                if weight_attr
-                else alt.value(1.0)
-            )
-        if strokeWidth is None:
-            strokeWidth = (
-                alt.Size(weight_attr, scale=alt.Scale(range=[0.1, 5]), legend=None)
-                if weight_attr
-                else alt.value(2.0)
-            )
-
-        data = _nx_edges_to_pandas(G, pos)
-        res = (
-            alt.Chart(data)
-            .mark_line()
-            .encode(
-                **dict(
-                    x=alt.X("x", axis=_invisible_axis()),
-                    y=alt.Y("y", axis=_invisible_axis()),
-                    detail="edge",
-                    opacity=opacity,
-                    strokeWidth=strokeWidth,
-                    color=color,
-                )
+        data = (
+            _nx_edges_to_pandas(G, pos, one_row_per_edge=one_row_per_edge)
+            if tables is None
+            else tables.edges(one_row_per_edge)
+        )
+        data = _prune_columns(
+            data,
+            {
+                "x",
+                "y",
+                "x2",
+                "y2",
+                "edge",
+                "source",
+                "target",
+                *fields,
+            },
+            keep_attrs,
+        )
+        data, lookups = _compact_data(data, compact_data)
+        chart = _with_lookups(alt.Chart(data), lookups)
+        chart = chart.mark_rule() if one_row_per_edge else chart.mark_line()
+        res = chart.encode(
+            **dict(
+                x=alt.X("x", axis=_invisible_axis()),
+                y=alt.Y("y", axis=_invisible_axis()),
+                **(dict(x2="x2", y2="y2") if one_row_per_edge else dict(detail="edge")),
+                opacity=opacity,
+                strokeWidth=strokeWidth,
+                color=color,
             )
         )
         return res
@@ -278,18 +579,61 @@ def edges_layer(
 ########
 
 
-def apply_layers(layers, G, pos):
+def _chart_datasets(chart):
+    """DataFrames a chart or layer chart carries, at any level"""
+    if isinstance(chart.data, pd.DataFrame):
+        return [chart.data]
+    return [d for sub in getattr(chart, "layer", []) for d in _chart_datasets(sub)]
+
+
+def _chart_marks(chart):
+    if isinstance(chart, alt.LayerChart):
+        return [m for sub in chart.layer for m in _chart_marks(sub)]
+    mark = chart.mark
+    return [mark if isinstance(mark, str) else mark.type]
+
+
+def layer_stats(chart, G):
+    """Marks, graph node and edge counts, and dataset rows and approx. serialised bytes"""
+    datasets = _chart_datasets(chart)
+    return dict(
+        marks=_chart_marks(chart),
+        nodes=G.number_of_nodes(),
+        edges=G.number_of_edges(),
+        rows=sum(len(d) for d in datasets),
+        bytes=sum(
+            len(d.to_json(orient="records", default_handler=str)) for d in datasets
+        ),
+    )
+
+
+def apply_layers(layers, G, pos, stats=None, tables=None):
+    """
+    :param stats:   optional dict, to add the time taken to stats["stages"]["layers"], and
+                    layer_stats for each layer to stats["layers"]
+    :param tables:  optional LayerTables for G and pos, passed to layers that take them
+    """
     res = []
     layers = [layers] if callable(layers) else layers
 
-    for layer in filter(None, layers):
-        if callable(layer):
-            layer = layer(G, pos)
-        elif not isinstance(layer, alt.Chart):
-            raise ValueError(f"Layer must be a function or a Chart - was {type(layer)}")
+    with timed_stage(stats, "layers"):
+        for layer in filter(None, layers):
+            if callable(layer):
+                layer = (
+                    layer(G, pos, tables=tables)
+                    if tables is not None and layout.accepts_arg(layer, "tables")
+                    else layer(G, pos)
+                )
+            elif not isinstance(layer, alt.Chart):
+                raise ValueError(
+                    f"Layer must be a function or a Chart - was {type(layer)}"
+                )
+
+            if layer is not None:
+                res.append(layer)
 
-        if layer is not None:
-            res.append(layer)
+    if stats is not None:
+        stats.setdefault("layers", []).extend(layer_stats(layer, G) for layer in res)
 
     return res
 
@@ -299,27 +643,48 @@ def apply_layers(layers, G, pos):
 ########
 
 
-def generate_combo_layers(
-    inter_combo_G,
+def _merge_intra_combo_graphs(intra_combo_Gs_by_cat):
+    """Union of all intra-combo graphs in a single graph, with edges tagged
+    with their combo value like nodes are. Node ids are unique across combos,
+    as every node belongs to exactly one combo."""
+    G_merged = nx.Graph()
+    for combo_val, G_intra_combo in intra_combo_Gs_by_cat.items():
+        G_merged.add_nodes_from(G_intra_combo.nodes(data=True))
+        G_merged.add_edges_from(
+            (u, v, {**d, combo.COMBO_GROUP_VALUE_ATTR: combo_val})
+            for u, v, d in G_intra_combo.edges(data=True)
+        )
+    return G_merged
+
+
+def place_combos(
     intra_combo_Gs_by_cat,
     combo_pos,
-    combo_nodes_layer,
-    combo_edges_layer,
     intra_combo_layout_fn,
-    nodes_layer,
-    edges_layer,
     size_scale_domain,
     size_scale_range,
     inner_graph_scale_factor,
+    intra_combo_layout_seed=None,
+    intra_combo_layout_workers=None,
+    intra_combo_layout_executor="process",
+    parallel_layout_min_nodes=layout.PARALLEL_LAYOUT_MIN_NODES,
+    layout_cache=None,
+    weight_attr=None,
+    stats=None,
 ):
-    res = []
-
-    # add combo edges layer
-    res.extend(apply_layers(combo_edges_layer, G=inter_combo_G, pos=combo_pos))
+    """
+    Size combo nodes, and lay out intra-combo graphs inside them - see generate_combo_layers for
+    params.
 
+    :return:    {combo_val: combo node size}, and {combo_val: NodePositions} of intra-combo graph
+                nodes, in combo order
+    """
     # for each combo caegory
-    # - render combo node
-    # - render intra-combo graph
+    # - size combo node
+    # - lay out intra-combo graph
+    combo_sizes = {}
+    intra_combo_pos = {}
+    Gs_to_layout = {}
 
     for combo_val, G_intra_combo in intra_combo_Gs_by_cat.items():
         if G_intra_combo.number_of_nodes() == 0:
@@ -330,56 +695,234 @@ def generate_combo_layers(
             combo_val in combo_pos
         ), f"Expected combo cat {combo_val} to be in combo pos {combo_pos}"
 
-        x_combo, y_combo = tuple(combo_pos[combo_val])
-
         if G_intra_combo.number_of_nodes() == 1 and (
             not combo_val or combo_val.startswith(combo.EMPTY_COMBO_VALUE_PLACEHOLDER)
         ):
-            res.extend(
-                apply_layers(
-                    [edges_layer, nodes_layer],
-                    G=G_intra_combo,
-                    pos={[n for n in G_intra_combo.nodes()][0]: (x_combo, y_combo)},
-                )
+            intra_combo_pos[combo_val] = NodePositions(
+                G_intra_combo.nodes(), [combo_pos[combo_val]]
             )
-
         else:
-            G_combo = nx.Graph()
-            G_combo.add_node(combo_val, **inter_combo_G.nodes[combo_val])
-            combo_size = _interpolate_node_size_from_num_nodes(
-                G_intra_combo,
-                num_nodes_range=size_scale_domain,
-                size_range=size_scale_range,
+            intra_combo_pos[combo_val] = None  # keep combo order; filled in below
+            Gs_to_layout[combo_val] = G_intra_combo
+
+    with timed_stage(stats, "layout"):
+        layouts = layout.layout_graphs(
+            intra_combo_layout_fn,
+            Gs_to_layout,
+            seed=intra_combo_layout_seed,
+            workers=intra_combo_layout_workers,
+            executor=intra_combo_layout_executor,
+            min_nodes=parallel_layout_min_nodes,
+            cache=layout_cache,
+            weight_attr=weight_attr,
+            stats=(
+                None if stats is None else stats.setdefault("intra_combo_layouts", {})
+            ),
+        )
+
+    for combo_val, pos in layouts.items():
+        combo_size = _interpolate_node_size_from_num_nodes(
+            Gs_to_layout[combo_val],
+            num_nodes_range=size_scale_domain,
+            size_range=size_scale_range,
+        )
+        combo_sizes[combo_val] = combo_size
+
+        # We now need to fit the intra-combo graph inside the combo;
+        #  to do this, we need to
+        # - figure out the combo size, and hence radius
+        # - normalise the intra-combo graph pos to -1, 1
+        # - scale pos by a fraction of the combo radius, to fit inside the combo node
+        combo_r = _size_to_r(combo_size)
+
+        pos = normalise_pos(NodePositions.from_pos(pos), range=[-1, 1])
+        intra_combo_pos[combo_val] = NodePositions(
+            pos.nodes,
+            combo_pos[combo_val] + pos.xy * combo_r * inner_graph_scale_factor,
+        )
+
+    return combo_sizes, intra_combo_pos
+
+
+def _tables_for(tables, key, G_fn, pos):
+    """(G, pos, LayerTables) for key - building G and its tables only the first time key is seen,
+    if tables is a dict to keep them in; else (G_fn(), pos, None)"""
+    if tables is None:
+        return G_fn(), pos, None
+    if key not in tables:
+        # concurrent renders may both get here - setdefault keeps them on the same tables
+        tables.setdefault(key, LayerTables(G_fn(), pos))
+    return tables[key].G, tables[key].pos, tables[key]
+
+
+def apply_combo_layers(
+    inter_combo_G,
+    intra_combo_Gs_by_cat,
+    combo_pos,
+    combo_sizes,
+    intra_combo_pos,
+    combo_nodes_layer,
+    combo_edges_layer,
+    nodes_layer,
+    edges_layer,
+    consolidate_layers=False,
+    stats=None,
+    tables=None,
+):
+    """
+    Render combos placed by place_combos - see generate_combo_layers for params.
+
+    :param tables:  optional dict, to keep LayerTables of the graphs rendered in, so that
+                    applying layers to the same combos again reuses them
+    """
+    res = []
+
+    def apply(layers, key, G_fn, pos):
+        G, pos, layer_tables = _tables_for(tables, key, G_fn, pos)
+        return apply_layers(layers, G, pos, stats=stats, tables=layer_tables)
+
+    # add combo edges layer
+    res.extend(
+        apply(combo_edges_layer, "combo_edges", lambda: inter_combo_G, combo_pos)
+    )
+
+    # render combo nodes and intra-combo graphs
+    def combo_nodes_graph(combo_vals):
+        G_combo = nx.Graph()
+        G_combo.add_nodes_from(
+            (
+                combo_val,
+                {
+                    **inter_combo_G.nodes[combo_val],
+                    COMBO_SIZE_ATTR_NAME: combo_sizes[combo_val],
+                },
             )
-            nx.set_node_attributes(G_combo, combo_size, COMBO_SIZE_ATTR_NAME)
+            for combo_val in combo_vals
+        )
+        return G_combo
+
+    if consolidate_layers:
+        res.extend(
+            apply(
+                combo_nodes_layer,
+                "combo_nodes",
+                lambda: combo_nodes_graph(combo_sizes),
+                NodePositions(
+                    combo_sizes, [combo_pos[combo_val] for combo_val in combo_sizes]
+                ),
+            )
+        )
+        res.extend(
+            apply(
+                [edges_layer, nodes_layer],
+                "intra_combo",
+                lambda: _merge_intra_combo_graphs(
+                    {
+                        combo_val: intra_combo_Gs_by_cat[combo_val]
+                        for combo_val in intra_combo_pos
+                    }
+                ),
+                NodePositions.concat(intra_combo_pos.values()),
+            )
+        )
+
+    else:
+        for combo_val, pos in intra_combo_pos.items():
+            if combo_val in combo_sizes:
+                res.extend(
+                    apply(
+                        combo_nodes_layer,
+                        ("combo_nodes", combo_val),
+                        lambda: combo_nodes_graph([combo_val]),
+                        {combo_val: combo_pos[combo_val]},
+                    )
+                )
 
             res.extend(
-                apply_layers(
-                    combo_nodes_layer, G=G_combo, pos={combo_val: (x_combo, y_combo)}
+                apply(
+                    [edges_layer, nodes_layer],
+                    ("intra_combo", combo_val),
+                    lambda: intra_combo_Gs_by_cat[combo_val],
+                    pos,
                 )
             )
 
-            # We now need to lay out the intra-combo graph, and fit it inside the combo;
-            #  to do this, we need to
-            # - figure out the combo size, and hence radius
-            #  - invoke the intra-combo graph layout function to get the pos
-            # - normalise the pos to -1, 1
-            # - scale pos by a fraction of the combo radius, to fit inside the combo node
-            combo_r = _size_to_r(combo_size)
-
-            pos = intra_combo_layout_fn(G_intra_combo)
-            pos = normalise_pos(pos, range=[-1, 1])
-            pos = {
-                id: (
-                    x_combo + xy[0] * combo_r * inner_graph_scale_factor,
-                    y_combo + xy[1] * combo_r * inner_graph_scale_factor,
-                )
-                for id, xy in pos.items()
-            }
+    return res
 
-            res.extend(apply_layers([edges_layer, nodes_layer], G_intra_combo, pos))
 
-    return res
+def generate_combo_layers(
+    inter_combo_G,
+    intra_combo_Gs_by_cat,
+    combo_pos,
+    combo_nodes_layer,
+    combo_edges_layer,
+    intra_combo_layout_fn,
+    nodes_layer,
+    edges_layer,
+    size_scale_domain,
+    size_scale_range,
+    inner_graph_scale_factor,
+    consolidate_layers=False,
+    intra_combo_layout_seed=None,
+    intra_combo_layout_workers=None,
+    intra_combo_layout_executor="process",
+    parallel_layout_min_nodes=layout.PARALLEL_LAYOUT_MIN_NODES,
+    layout_cache=None,
+    weight_attr=None,
+    stats=None,
+):
+    """
+    Place combos - see place_combos - and render them - see apply_combo_layers.
+
+    :param consolidate_layers:          if true, render all combo nodes, and all intra-combo nodes and edges,
+                                        as one dataset each - rather than a dataset and set of layers per combo.
+                                        Keeps the number of layers fixed regardless of the number of combos;
+                                        note that data-driven scales then span all combos, rather than being
+                                        fit to each combo separately.
+    :param intra_combo_layout_seed:     if given, each intra-combo layout is seeded with a value derived from
+                                        this and its combo value - so layouts are repeatable, and independent
+                                        of how they are scheduled
+    :param intra_combo_layout_workers:  number of workers to lay out intra-combo graphs concurrently with;
+                                        None or 1 lays them out serially
+    :param intra_combo_layout_executor: "process" (default) or "thread" pool, or an existing
+                                        concurrent.futures.Executor. Process pools need a picklable layout
+                                        function - so not a lambda.
+    :param parallel_layout_min_nodes:   intra-combo graphs smaller than this are laid out in-process, as
+                                        they're quicker to lay out than to ship to a worker
+    :param layout_cache:                optional alph.cache.LayoutCache to look up / store intra-combo layouts
+    :param weight_attr:                 edge weight attribute, whose values form part of layout cache keys
+    :param stats:                       optional dict, filled in with time spent on intra-combo layouts and
+                                        layers, intra-combo layout counts - see layout.layout_graphs - and
+                                        per-layer stats - see apply_layers
+    """
+    combo_sizes, intra_combo_pos = place_combos(
+        intra_combo_Gs_by_cat,
+        combo_pos,
+        intra_combo_layout_fn,
+        size_scale_domain=size_scale_domain,
+        size_scale_range=size_scale_range,
+        inner_graph_scale_factor=inner_graph_scale_factor,
+        intra_combo_layout_seed=intra_combo_layout_seed,
+        intra_combo_layout_workers=intra_combo_layout_workers,
+        intra_combo_layout_executor=intra_combo_layout_executor,
+        parallel_layout_min_nodes=parallel_layout_min_nodes,
+        layout_cache=layout_cache,
+        weight_attr=weight_attr,
+        stats=stats,
+    )
+    return apply_combo_layers(
+        inter_combo_G,
+        intra_combo_Gs_by_cat,
+        combo_pos,
+        combo_sizes,
+        intra_combo_pos,
+        combo_nodes_layer=combo_nodes_layer,
+        combo_edges_layer=combo_edges_layer,
+        nodes_layer=nodes_layer,
+        edges_layer=edges_layer,
+        consolidate_layers=consolidate_layers,
+        stats=stats,
+    )
 
 
 ########
@@ -1,18 +1,120 @@
+import inspect
+import random
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
 import networkx as nx
 import numpy as np
-import pandas as pd
+
+from . import forceatlas
+from .util import nx_edge_index_arrays
 
 BARNES_HUT_ON_THRESHOLD = 500
+DEFAULT_CONVERGENCE_TOLERANCE = 1e-3  # net movement per iteration, vs layout radius
+PARALLEL_LAYOUT_MIN_NODES = 50
+LAYOUT_EXECUTORS = {"process": ProcessPoolExecutor, "thread": ThreadPoolExecutor}
+INCREMENTAL_FULL_ITERATIONS = 5000
+INCREMENTAL_MIN_ITERATIONS = 100
+INCREMENTAL_ITERATIONS_PER_CHANGE = (
+    10  # e.g. 1% of nodes changed -> 10% of full iterations
+)
+INCREMENTAL_NEW_NODE_JITTER = 0.1  # as a fraction of median edge length
+MULTILEVEL_COARSEST_NODES = 100
+MULTILEVEL_MIN_REDUCTION = 0.2  # stop coarsening once a level removes fewer nodes
+MULTILEVEL_COARSEST_ITERATIONS = 1000
+MULTILEVEL_LEVEL_ITERATIONS = 30
+MULTILEVEL_JITTER = 0.1  # as a fraction of mean edge length at the coarser level
+PIVOT_MDS_NUM_PIVOTS = 50
+
+
+########
+# sparse graphs
+########
+
+
+class SparseGraph:
+    """
+    Graph as a scipy CSR adjacency matrix, plus its node list and node to row index
+    mapping - for layouts built on sparse matrix routines. Built in one pass over the edge
+    list, rather than via nx.to_scipy_sparse_array and a further conversion. Undirected
+    edges are stored in both directions, self loops once; parallel edges sum their weights.
+
+    Build once and pass in place of G to layouts that take one - force_atlas_sknet,
+    pivot_mds_layout, random_initial_layout - to share the adjacency matrix and node index.
+    """
+
+    def __init__(self, G, weight_attr=None):
+        from scipy.sparse import csr_matrix
+
+        self.nodes = list(G.nodes())
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        self.weight_attr = weight_attr
+
+        sources, targets, data = nx_edge_index_arrays(G, self.index)
+        weights = (
+            np.array([d.get(weight_attr, 1) for d in data], dtype=float)
+            if weight_attr
+            else np.ones(len(sources))
+        )
+        if not G.is_directed():
+            mirror = sources != targets
+            sources, targets = (
+                np.concatenate([sources, targets[mirror]]),
+                np.concatenate([targets, sources[mirror]]),
+            )
+            weights = np.concatenate([weights, weights[mirror]])
+
+        num_nodes = len(self.nodes)
+        self.adjacency = csr_matrix(
+            (weights, (sources, targets)), shape=(num_nodes, num_nodes)
+        )
+
+    @classmethod
+    def from_graph(cls, G, weight_attr=None):
+        """G as a SparseGraph - as is, if it already is one"""
+        if not isinstance(G, SparseGraph):
+            return cls(G, weight_attr)
+        if G.weight_attr != weight_attr:
+            raise ValueError(
+                f"SparseGraph built with weight_attr {G.weight_attr!r}, not {weight_attr!r}"
+            )
+        return G
+
+    def take(self, pos):
+        """(n, 2) coordinate array from a pos dict, in node order"""
+        return np.array([pos[n] for n in self.nodes], dtype=float)
+
+    def pos(self, xy):
+        """pos dict from coordinates in node order"""
+        return dict(zip(self.nodes, xy))
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+########
+# force layouts
+########
 
 
-def force_atlas_sknet(G, n_components=2, init_seed=None, **fa2_args):
+def force_atlas_sknet(
+    G, n_components=2, init_seed=None, init=None, weight_attr="weight", **fa2_args
+):
     """
     Wrapper for sckikit-network's implementation of Force Atlas 2, to accept nx Graphs and return a `pos`-like structure.
 
     Parameters
     ----------
-    G : nx.Graph
+    G : nx.Graph or SparseGraph
         Graph to display
+    weight_attr : str = "weight"
+        Edge weight attribute - edges without it weigh 1; None for unweighted.
+        scikit-network's ForceAtlas uses weights for node masses - weighted degree - while
+        attraction along edges is unweighted.
     n_components : int = 2
         Dimension of the graph layout.
     n_iter : int = 50
@@ -35,55 +137,47 @@ def force_atlas_sknet(G, n_components=2, init_seed=None, **fa2_args):
         Constant used to impose constrain on speed.
     init_seed : int = None
         Set initial positions repeatably - or randomly if no seed given
+    init : str, function or dict = None
+        Initial positions - see `initial_layout` - rather than standard normal random ones.
+        Only used for 2 components. "spectral" needs G as an nx.Graph
 
     For full up-to-date parameterisation,
     see https://github.com/sknetwork-team/scikit-network/blob/master/sknetwork/embedding/force_atlas.py
     """
 
-    from scipy.sparse import csr_matrix
     from sknetwork.embedding.force_atlas import ForceAtlas
 
-    # randomise initial positions
+    sparse_graph = SparseGraph.from_graph(G, weight_attr)
+
+    # initial positions - from init if given, else randomised
     pos_init = None
-    if init_seed is not None:
-        num_nodes = len(G.nodes)
+    if init is not None and n_components == 2:
+        pos_init = sparse_graph.take(
+            initial_layout(G, init, weight_attr=weight_attr, seed=init_seed)
+        )
+    elif init_seed is not None:
+        num_nodes = len(sparse_graph)
         pos_init_rng = np.random.default_rng(init_seed)
         pos_init = pos_init_rng.standard_normal(
             (num_nodes, n_components)
         )  # standard_normal used w/ default_rng instead of randn
 
-    csr_graph = csr_matrix(
-        nx.to_scipy_sparse_array(G)
-    )  # to_scipy_sparse_matrix generates a pre-nx3.0 warning
     fa = ForceAtlas(n_components=n_components, **fa2_args)
-    embedding = fa.fit_transform(csr_graph, pos_init=pos_init)
+    embedding = fa.fit_transform(sparse_graph.adjacency, pos_init=pos_init)
 
     # normalise
     embedding = embedding / np.max(np.abs(embedding))
 
-    return dict(zip(G.nodes(), embedding))
+    return sparse_graph.pos(embedding)
 
 
 def default_force_atlas_nan_coord_bug_alt_layout(G, weight_attr):
     return nx.spring_layout(G, weight=weight_attr)
 
 
-def force_atlas(
-    G,
-    pos=None,
-    weight_attr=None,
-    iterations=5000,
-    nan_coord_bug_alt_layout=default_force_atlas_nan_coord_bug_alt_layout,
-    **kwargs
-):
-    """
-    See https://journals.plos.org/plosone/article?id=10.1371/journal.pone.0098679 for detail on params
-    """
-
-    # fa2 is optional
-    from fa2 import ForceAtlas2
-
-    fa2_kwargs = {
+def force_atlas_args(num_nodes, **kwargs):
+    """Default ForceAtlas2 parameters for a graph of num_nodes nodes, overridden by kwargs"""
+    return {
         **dict(
             # Behavior alternatives
             # ForceAtlas2 has a “Dissuade Hubs” mode that, once activated, affects the shape
@@ -94,7 +188,9 @@ def force_atlas(
             # are sometimes considered more important than hubs. “Dissuade Hubs” tends to push
             # hubs to the periphery while keeping authorities in the center.
             outboundAttractionDistribution=True,  # Dissuade hubs
-            linLogMode=False,  # NOT IMPLEMENTED
+            # Attraction proportional to log(1 + distance) rather than distance, for
+            # tighter clusters
+            linLogMode=False,
             adjustSizes=False,  # Prevent overlap (NOT IMPLEMENTED)
             # If the edges are weighted, this weight will be taken into consideration in the
             # computation of the attraction force. This can have a dramatic impact on the result.
@@ -106,9 +202,12 @@ def force_atlas(
             # BarnesHut improves spatialization performances on big graphs Relying on an
             # approximate computation of repulsion forces, such optimization generates
             # approximation and may be counter-productive on small networks
-            barnesHutOptimize=G.number_of_nodes() > BARNES_HUT_ON_THRESHOLD,
+            barnesHutOptimize=num_nodes > BARNES_HUT_ON_THRESHOLD,
             barnesHutTheta=1.2,  # default: 1.2 "This is useful for large graph but harmful to small ones."
-            multiThreaded=False,  # NOT IMPLEMENTED
+            # Compute forces with a worker process per CPU - or pass `workers` to set the
+            # number of processes. Only used for graphs of at least `parallel_min_nodes`
+            # nodes, by default forceatlas.PARALLEL_MIN_NODES
+            multiThreaded=False,
             # Tuning
             scalingRatio=2.0,  # default: 2.0 - how much repulsion you want. More makes a more sparse graph.
             # The “Strong gravity” option sets a force that attracts the nodes that are distant
@@ -124,35 +223,609 @@ def force_atlas(
         **kwargs,
     }
 
-    fa2 = ForceAtlas2(**fa2_kwargs)
 
-    res = fa2.forceatlas2_networkx_layout(
-        G, pos=pos, weight_attr=weight_attr, iterations=iterations
+def force_atlas(
+    G,
+    pos=None,
+    weight_attr=None,
+    iterations=5000,
+    nan_coord_bug_alt_layout=default_force_atlas_nan_coord_bug_alt_layout,
+    seed=None,
+    convergence_tolerance=None,
+    stats=None,
+    init=None,
+    **kwargs,
+):
+    """
+    ForceAtlas2 layout, using alph's built-in, vectorised implementation - see alph.forceatlas.
+    See https://journals.plos.org/plosone/article?id=10.1371/journal.pone.0098679 for detail on params
+
+    :param pos:                     initial positions for some or all nodes; others start at random
+    :param iterations:              iterations to run - a ceiling, if convergence_tolerance is set
+    :param seed:                    seeds random initial positions - if not given, the global numpy
+                                    RNG is used
+    :param convergence_tolerance:   stop early once nodes' net movement per iteration, relative to
+                                    the layout radius, falls below this - e.g. DEFAULT_CONVERGENCE_TOLERANCE
+    :param stats:                   optional dict, filled in with the number of iterations run,
+                                    and whether the layout converged
+    :param init:                    initial placement for nodes not in pos - e.g. "pivot_mds";
+                                    see initial_layout. Random by default
+    """
+
+    fa2_kwargs = force_atlas_args(G.number_of_nodes(), **kwargs)
+    if init is not None:
+        pos = {
+            **initial_layout(G, init, weight_attr=weight_attr, seed=seed),
+            **(pos or {}),
+        }
+
+    nodes, sources, targets, weights, mass = forceatlas.graph_arrays(G, weight_attr)
+    xy = forceatlas.forceatlas2(
+        forceatlas.initial_positions(nodes, pos=pos, seed=seed),
+        mass,
+        sources,
+        targets,
+        weights,
+        iterations=iterations,
+        convergence_tolerance=convergence_tolerance,
+        stats=stats,
+        **fa2_kwargs,
     )
+    res = dict(zip(nodes, map(tuple, xy.tolist())))
 
-    if any([pd.isna(xy[0]) or pd.isna(xy[1]) for xy in res.values()]):
+    if np.isnan(xy).any():
         if nan_coord_bug_alt_layout:
             res = nan_coord_bug_alt_layout(G, weight_attr)
         else:
             print(
-                "Hit fa2 bug - one or more nodes had a np.nan co-ordinate. "
-                "Pass alternate layout to work arouund."
+                "ForceAtlas2 gave one or more nodes a np.nan co-ordinate. "
+                "Pass alternate layout to work around."
             )
 
     return res
 
 
-def default_inter_combo_layout(G, weight_attr=None, **kwargs):
-    return nx.fruchterman_reingold_layout(G, weight=weight_attr, **kwargs)
+def default_inter_combo_layout(G, weight_attr=None, seed=None, **kwargs):
+    return nx.fruchterman_reingold_layout(G, weight=weight_attr, seed=seed, **kwargs)
 
 
-def default_intra_combo_layout(G, weight_attr=None, strongGravityMode=True, **kwargs):
+def default_intra_combo_layout(
+    G,
+    weight_attr=None,
+    strongGravityMode=True,
+    convergence_tolerance=DEFAULT_CONVERGENCE_TOLERANCE,
+    seed=None,
+    stats=None,
+    **kwargs,
+):
+    # seed is a named arg, so seeded_layout passes it rather than seeding global RNGs,
+    # which isn't thread-safe
     return force_atlas(
-        G, weight_attr=weight_attr, strongGravityMode=strongGravityMode, **kwargs
+        G,
+        weight_attr=weight_attr,
+        strongGravityMode=strongGravityMode,
+        convergence_tolerance=convergence_tolerance,
+        seed=seed,
+        stats=stats,
+        **kwargs,
     )
 
 
-def default_network_layout(G, weight_attr=None, strongGravityMode=True, **kwargs):
+def default_network_layout(
+    G,
+    weight_attr=None,
+    strongGravityMode=True,
+    convergence_tolerance=DEFAULT_CONVERGENCE_TOLERANCE,
+    seed=None,
+    stats=None,
+    **kwargs,
+):
+    # seed is a named arg, so seeded_layout passes it rather than seeding global RNGs,
+    # which isn't thread-safe
     return force_atlas(
-        G, weight_attr=weight_attr, strongGravityMode=strongGravityMode, **kwargs
+        G,
+        weight_attr=weight_attr,
+        strongGravityMode=strongGravityMode,
+        convergence_tolerance=convergence_tolerance,
+        seed=seed,
+        stats=stats,
+        **kwargs,
+    )
+
+
+########
+# initial placement
+########
+
+
+def _scale_to_unit_edges(xy, sources, targets):
+    lengths = np.linalg.norm(xy[sources] - xy[targets], axis=1)
+    mean_length = lengths[lengths > 0].mean() if (lengths > 0).any() else 0
+    return xy / mean_length if mean_length else xy
+
+
+def random_initial_layout(G, seed=None):
+    """Uniformly random positions in the unit square, as force layouts start from by default"""
+    nodes = list(G)
+    return dict(zip(nodes, forceatlas.initial_positions(nodes, seed=seed)))
+
+
+def pivot_mds_layout(G, num_pivots=PIVOT_MDS_NUM_PIVOTS, seed=None):
+    """
+    Fast approximate layout by pivot MDS (Brandes & Pich): classical MDS of breadth-first
+    search distances from a few pivot nodes, picked farthest first, to all others - so it
+    takes num_pivots BFS traversals of the graph, plus a num_pivots x num_pivots eigen
+    decomposition. Nodes in different components are treated as one hop further apart than
+    the most distant connected pair. Positions are in units of hops.
+
+    Good as initial positions for force layouts - see initial_layout. G may be a SparseGraph.
+    """
+    from scipy.sparse.csgraph import shortest_path
+
+    rng = np.random.default_rng(seed)
+    # BFS distances ignore weights, so any SparseGraph will do
+    sparse_graph = G if isinstance(G, SparseGraph) else SparseGraph(G)
+    num_nodes = len(sparse_graph)
+    if num_nodes < 3:
+        return random_initial_layout(sparse_graph, seed=seed)
+
+    adjacency = sparse_graph.adjacency
+    num_pivots = min(num_pivots, num_nodes)
+    pivots, dists = [rng.integers(num_nodes)], np.empty((num_pivots, num_nodes))
+    nearest_pivot_dist = np.full(num_nodes, np.inf)
+    for i in range(num_pivots):
+        dists[i] = shortest_path(
+            adjacency, directed=False, unweighted=True, indices=pivots[-1]
+        )
+        nearest_pivot_dist = np.minimum(nearest_pivot_dist, dists[i])
+        nearest_pivot_dist[pivots] = -1
+        pivots.append(int(np.argmax(nearest_pivot_dist)))
+
+    unreachable = ~np.isfinite(dists)
+    if unreachable.any():
+        dists[unreachable] = dists[~unreachable].max() + 1
+
+    # double centred squared distances, then the top eigenvectors of C^T C
+    C = dists.T**2
+    C = -0.5 * (C - C.mean(axis=0) - C.mean(axis=1)[:, None] + C.mean())
+    _, eigenvectors = np.linalg.eigh(C.T @ C)
+    xy = C @ eigenvectors[:, [-1, -2]]
+
+    # scale so distances to pivots best match BFS distances
+    pivot_dists = np.linalg.norm(xy[None, :, :] - xy[pivots[:-1], None, :], axis=2)
+    scale = (pivot_dists * dists).sum() / (pivot_dists**2).sum()
+    return sparse_graph.pos(xy * scale if np.isfinite(scale) and scale else xy)
+
+
+def spectral_initial_layout(G, weight_attr=None):
+    """
+    Positions from the leading non-trivial Laplacian eigenvectors - via NetworkX, which uses
+    sparse eigen-solvers for larger graphs - scaled to a mean edge length of 1
+    """
+    nodes, sources, targets, _, _ = forceatlas.graph_arrays(G)
+    if len(nodes) < 3:
+        return random_initial_layout(G)
+
+    pos = nx.spectral_layout(G, weight=weight_attr)
+    xy = _scale_to_unit_edges(np.array([pos[n] for n in nodes]), sources, targets)
+    return dict(zip(nodes, xy))
+
+
+INITIAL_LAYOUTS = {
+    "random": random_initial_layout,
+    "pivot_mds": pivot_mds_layout,
+    "spectral": spectral_initial_layout,
+}
+
+
+def initial_layout(G, init, weight_attr=None, seed=None):
+    """
+    Resolve initial positions for a force layout.
+
+    :param init:    name of one of INITIAL_LAYOUTS, or a function taking G and returning
+                    positions - called with weight_attr and seed, if it takes them - or a
+                    pos dict, returned as is
+    """
+    if isinstance(init, dict):
+        return init
+
+    init_fn = INITIAL_LAYOUTS[init] if isinstance(init, str) else init
+    params = inspect.signature(init_fn).parameters
+    kwargs = {
+        k: v
+        for k, v in dict(weight_attr=weight_attr, seed=seed).items()
+        if k in params and v is not None
+    }
+    return init_fn(G, **kwargs)
+
+
+def initialised_layout(
+    G, layout_fn, init="pivot_mds", weight_attr=None, seed=None, pos=None, **kwargs
+):
+    """
+    Run a layout function that takes initial positions as `pos` - e.g. force_atlas, or
+    NetworkX's spring_layout - from an initial_layout rather than random positions. Use
+    via partial, e.g. `partial(initialised_layout, layout_fn=nx.spring_layout)`.
+
+    :param weight_attr: used for the initial layout only - pass layout_fn's own weight
+                        arg via kwargs
+    :param pos:         positions that take precedence over the initial layout's
+    :param kwargs:      passed to layout_fn
+    """
+    init_pos = initial_layout(G, init, weight_attr=weight_attr, seed=seed)
+    return layout_fn(G, pos={**init_pos, **(pos or {})}, **kwargs)
+
+
+########
+# incremental layouts
+########
+
+
+def warm_start_pos(G, prev_pos, seed=None):
+    """
+    Initial positions for G, given positions from an earlier version of the graph:
+    - nodes in prev_pos keep their previous positions
+    - new nodes are placed near the centroid of their already placed neighbours,
+      working outwards from the existing nodes
+    - new nodes with no path to a placed node are scattered across the existing layout
+
+    :return: pos dict, or None if no nodes in G have a previous position
+    """
+    rng = np.random.default_rng(seed)
+    pos = {n: np.asarray(prev_pos[n], dtype=float) for n in G.nodes() if n in prev_pos}
+    if not pos:
+        return None
+
+    xy = np.array(list(pos.values()))
+    edge_lengths = [
+        np.linalg.norm(pos[u] - pos[v]) for u, v in G.edges() if u in pos and v in pos
+    ]
+    scale = np.median(edge_lengths) if edge_lengths else np.ptp(xy, axis=0).max()
+    jitter = INCREMENTAL_NEW_NODE_JITTER * (scale or 1.0)
+
+    unplaced = [n for n in G.nodes() if n not in pos]
+    while unplaced:
+        newly_placed = {}
+        for n in unplaced:
+            placed_nbrs = [pos[nbr] for nbr in nx.all_neighbors(G, n) if nbr in pos]
+            if placed_nbrs:
+                newly_placed[n] = np.mean(placed_nbrs, axis=0) + rng.normal(
+                    0, jitter, 2
+                )
+        if not newly_placed:
+            break
+        pos.update(newly_placed)
+        unplaced = [n for n in unplaced if n not in newly_placed]
+
+    lower, upper = xy.min(axis=0), xy.max(axis=0)
+    for n in unplaced:
+        pos[n] = rng.uniform(lower, upper)
+
+    return pos
+
+
+def incremental_layout(
+    G,
+    prev_pos,
+    layout_fn=None,
+    weight_attr=None,
+    iterations=None,
+    full_iterations=INCREMENTAL_FULL_ITERATIONS,
+    min_iterations=INCREMENTAL_MIN_ITERATIONS,
+    seed=None,
+    **kwargs,
+):
+    """
+    Re-lay out a graph that has changed a little since prev_pos was computed - e.g. a daily
+    snapshot - starting from the previous positions (see warm_start_pos) and running only as
+    many iterations as the size of the change calls for. Much quicker than a layout from
+    scratch for small changes, and keeps successive layouts visually stable.
+
+    :param layout_fn:       iterative layout taking pos, iterations and weight_attr args -
+                            default_network_layout by default
+    :param iterations:      iterations to run - if not given, scaled to the fraction of nodes
+                            added or removed, between min_iterations and full_iterations
+    :param seed:            for placing new nodes - and for the full layout, if none of G's
+                            nodes have a previous position - see seeded_layout
+    :param kwargs:          passed to layout_fn
+    """
+    layout_fn = layout_fn or default_network_layout
+
+    init_pos = warm_start_pos(G, prev_pos, seed=seed)
+    if init_pos is None:
+        return seeded_layout(
+            partial(
+                layout_fn, weight_attr=weight_attr, iterations=full_iterations, **kwargs
+            ),
+            G,
+            seed,
+        )
+
+    if iterations is None:
+        num_added = sum(1 for n in G.nodes() if n not in prev_pos)
+        num_removed = sum(1 for n in prev_pos if n not in G)
+        changed = (num_added + num_removed) / max(G.number_of_nodes(), 1)
+        iterations = int(
+            np.clip(
+                np.ceil(full_iterations * INCREMENTAL_ITERATIONS_PER_CHANGE * changed),
+                min_iterations,
+                full_iterations,
+            )
+        )
+
+    return layout_fn(
+        G, pos=init_pos, weight_attr=weight_attr, iterations=iterations, **kwargs
+    )
+
+
+########
+# multilevel layouts
+########
+
+
+def _heaviest_neighbours(sources, targets, score, num_nodes):
+    """Each node's neighbour along its top scoring edge, or -1 if it has no edges"""
+    u, v = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+    score = np.concatenate([score, score])
+    order = np.lexsort((-score, u))
+    first = np.unique(u[order], return_index=True)[1]
+    choice = np.full(num_nodes, -1)
+    choice[u[order][first]] = v[order][first]
+    return choice
+
+
+def coarsen(sources, targets, weights, mass, rng):
+    """
+    Coarsen a graph by one level, in the style of heavy edge matching: nodes pair up with the
+    neighbour they share the heaviest edge with - relative to both nodes' masses, so clusters
+    grow evenly - where that choice is mutual, over a few rounds. Nodes left over join their
+    heaviest neighbour's group, collapsing e.g. the leaves of stars into their hub.
+
+    :param sources, targets, weights, mass: graph as per forceatlas.graph_arrays
+    :return: coarse node index of each node, and coarse sources, targets, weights and mass
+    """
+    num_nodes = len(mass)
+    not_loop = sources != targets
+    sources, targets, weights = sources[not_loop], targets[not_loop], weights[not_loop]
+    # random tie-breaking, so that e.g. unweighted graphs don't match in node order
+    score = (
+        weights
+        / (mass[sources] * mass[targets])
+        * (1 + 1e-6 * rng.random(len(weights)))
+    )
+
+    groups = np.full(num_nodes, -1)
+    num_groups = 0
+    for _ in range(3):
+        free = (groups[sources] == -1) & (groups[targets] == -1)
+        choice = _heaviest_neighbours(
+            sources[free], targets[free], score[free], num_nodes
+        )
+        node = np.arange(num_nodes)
+        mutual = (choice > node) & (choice[np.maximum(choice, 0)] == node)
+        pairs = node[mutual]
+        if not len(pairs):
+            break
+        groups[pairs] = groups[choice[pairs]] = num_groups + np.arange(len(pairs))
+        num_groups += len(pairs)
+
+    choice = _heaviest_neighbours(sources, targets, score, num_nodes)
+    joining = (groups == -1) & (choice >= 0)
+    joining &= groups[np.maximum(choice, 0)] >= 0
+    groups[joining] = groups[choice[joining]]
+    alone = groups == -1
+    groups[alone] = num_groups + np.arange(alone.sum())
+
+    coarse_sources, coarse_targets = groups[sources], groups[targets]
+    between = coarse_sources != coarse_targets
+    num_coarse = groups.max() + 1 if num_nodes else 0
+    pair_ids, inverse = np.unique(
+        np.minimum(coarse_sources, coarse_targets)[between] * num_coarse
+        + np.maximum(coarse_sources, coarse_targets)[between],
+        return_inverse=True,
+    )
+    coarse_weights = np.bincount(inverse.ravel(), weights=weights[between])
+    coarse_sources, coarse_targets = np.divmod(pair_ids, max(num_coarse, 1))
+
+    return (
+        groups,
+        coarse_sources,
+        coarse_targets,
+        coarse_weights,
+        np.bincount(groups, weights=mass, minlength=num_coarse),
     )
+
+
+def multilevel_layout(
+    G,
+    weight_attr=None,
+    seed=None,
+    coarsest_nodes=MULTILEVEL_COARSEST_NODES,
+    coarsest_iterations=MULTILEVEL_COARSEST_ITERATIONS,
+    level_iterations=MULTILEVEL_LEVEL_ITERATIONS,
+    convergence_tolerance=DEFAULT_CONVERGENCE_TOLERANCE,
+    stats=None,
+    **kwargs,
+):
+    """
+    Multilevel ForceAtlas2 layout for large graphs, in the style of sfdp / FM3: the graph is
+    coarsened repeatedly (see coarsen) until it's small, or stops shrinking; the coarsest
+    graph is laid out from scratch, then each finer level starts from its coarse nodes'
+    positions, plus a little jitter, and is refined with a few iterations. Coarse nodes'
+    masses and edge weights are the sums of their members'.
+
+    :param coarsest_iterations:     iterations for the coarsest level - a ceiling, given
+                                    convergence_tolerance
+    :param level_iterations:        iterations for each finer level - likewise
+    :param stats:                   optional dict, filled in with node counts and iterations
+                                    run per level, coarsest first
+    :param kwargs:                  ForceAtlas2 parameters - see force_atlas
+    """
+    rng = np.random.default_rng(seed)
+    nodes, sources, targets, weights, mass = forceatlas.graph_arrays(G, weight_attr)
+
+    levels, groupings = [(sources, targets, weights, mass)], []
+    while len(levels[-1][3]) > coarsest_nodes:
+        groups, *coarse = coarsen(*levels[-1], rng)
+        if len(coarse[3]) > (1 - MULTILEVEL_MIN_REDUCTION) * len(levels[-1][3]):
+            break
+        groupings.append(groups)
+        levels.append(tuple(coarse))
+
+    xy = rng.random((len(levels[-1][3]), 2))
+    level_stats = []
+    for level in reversed(range(len(levels))):
+        sources, targets, weights, mass = levels[level]
+        if level < len(groupings):
+            coarse_sources, coarse_targets = levels[level + 1][:2]
+            edge_length = (
+                np.linalg.norm(xy[coarse_sources] - xy[coarse_targets], axis=1).mean()
+                if len(coarse_sources)
+                else np.ptp(xy, axis=0).max() / np.sqrt(len(xy))
+            )
+            xy = xy[groupings[level]] + rng.normal(
+                0, MULTILEVEL_JITTER * (edge_length or 1.0), (len(mass), 2)
+            )
+
+        run_stats = {}
+        xy = forceatlas.forceatlas2(
+            xy,
+            mass,
+            sources,
+            targets,
+            weights,
+            iterations=(
+                coarsest_iterations if level == len(groupings) else level_iterations
+            ),
+            convergence_tolerance=convergence_tolerance,
+            stats=run_stats,
+            **force_atlas_args(len(mass), **kwargs),
+        )
+        level_stats.append(dict(nodes=len(mass), iterations=run_stats["iterations"]))
+
+    if stats is not None:
+        stats["levels"] = level_stats
+
+    return dict(zip(nodes, map(tuple, xy.tolist())))
+
+
+########
+# running layouts
+########
+
+
+def derive_seed(seed, key):
+    """Stable per-key seed - independent of process, hash randomisation and scheduling order"""
+    key_hash = zlib.crc32(repr(key).encode())
+    return int(np.random.SeedSequence([seed, key_hash]).generate_state(1)[0])
+
+
+def accepts_arg(fn, arg):
+    """Whether fn takes a named argument - not just via **kwargs"""
+    try:
+        return arg in inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _accepts_seed(fn):
+    return accepts_arg(fn, "seed")
+
+
+def seeded_layout(layout_fn, G, seed=None):
+    """
+    Run layout_fn with the given seed - passed as a `seed` arg if layout_fn takes one
+    (as NetworkX layouts do), or else used to seed the global `random` and numpy RNGs
+    for the duration of the call - which isn't thread-safe, so layouts run on a
+    thread pool need to take a `seed` arg to be repeatable.
+    """
+    if seed is None:
+        return layout_fn(G)
+    if _accepts_seed(layout_fn):
+        return layout_fn(G, seed=seed)
+
+    random_state, np_random_state = random.getstate(), np.random.get_state()
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        return layout_fn(G)
+    finally:
+        random.setstate(random_state)
+        np.random.set_state(np_random_state)
+
+
+def layout_graphs(
+    layout_fn,
+    Gs_by_key: dict,
+    seed=None,
+    workers=None,
+    executor="process",
+    min_nodes=PARALLEL_LAYOUT_MIN_NODES,
+    cache=None,
+    weight_attr=None,
+    stats=None,
+):
+    """
+    Lay out a number of independent graphs - e.g. intra-combo graphs - optionally concurrently.
+
+    :param seed:        if given, each graph is laid out with a seed derived from this and its key,
+                        so results are the same regardless of number of workers
+    :param workers:     number of workers; None or 1 lays out serially
+    :param executor:    "process" or "thread", or a concurrent.futures.Executor to submit to
+    :param min_nodes:   graphs with fewer nodes are laid out in-process, avoiding pickling overhead
+    :param cache:       optional alph.cache.LayoutCache; cached graphs aren't laid out at all
+    :param weight_attr: edge weight attribute, whose values form part of cache keys
+    :param stats:       optional dict, filled in with the number of graphs, and how many of
+                        them were laid out rather than found in the cache
+    :return:            dict of pos structures, in Gs_by_key order
+    """
+    assert isinstance(executor, Executor) or executor in LAYOUT_EXECUTORS
+    seeds = {k: None if seed is None else derive_seed(seed, k) for k in Gs_by_key}
+
+    res = dict.fromkeys(Gs_by_key)
+    cache_keys = {}
+    if cache is not None:
+        for k, G in Gs_by_key.items():
+            cache_keys[k] = cache.key(layout_fn, G, weight_attr, seed=seeds[k])
+            res[k] = cache.get(cache_keys[k], G)
+
+    to_layout = [k for k, pos in res.items() if pos is None]
+    to_submit = [k for k in to_layout if Gs_by_key[k].number_of_nodes() >= min_nodes]
+    use_pool = to_submit and (isinstance(executor, Executor) or (workers or 1) > 1)
+
+    if not use_pool:
+        res.update(
+            {k: seeded_layout(layout_fn, Gs_by_key[k], seeds[k]) for k in to_layout}
+        )
+    else:
+        pool = (
+            executor
+            if isinstance(executor, Executor)
+            else LAYOUT_EXECUTORS[executor](max_workers=workers)
+        )
+        try:
+            futures = {
+                k: pool.submit(seeded_layout, layout_fn, Gs_by_key[k], seeds[k])
+                for k in to_submit
+            }
+            # lay out small graphs here while the pool gets on with the rest
+            res.update(
+                {
+                    k: seeded_layout(layout_fn, Gs_by_key[k], seeds[k])
+                    for k in to_layout
+                    if k not in futures
+                }
+            )
+            res.update({k: f.result() for k, f in futures.items()})
+        finally:
+            if pool is not executor:
+                pool.shutdown(cancel_futures=True)
+
+    if cache is not None:
+        for k in to_layout:
+            cache.put(cache_keys[k], Gs_by_key[k], res[k])
+
+    if stats is not None:
+        stats.update(graphs=len(Gs_by_key), laid_out=len(to_layout))
+
+    return res
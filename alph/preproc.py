@@ -1,5 +1,6 @@
 from datetime import date, datetime, timedelta
 
+import numpy as np
 import pandas as pd
 from pandas.api.types import (
     is_datetime64_any_dtype,
@@ -63,3 +64,67 @@ def ensure_non_serializable_datetime_types_absent(df, types=None):
             f"The following column(s) had instances of {types}, potentially causing serialization problems: "
             f"{', '.join(problem_cols)}"
         )
+
+
+def _format_temporal_values(values, format):
+    """
+    Format a column of values containing date / time types as strings. Nulls become None;
+    values without strftime, like timedeltas, are converted with str(). Where all values
+    are dates / datetimes, which tend to repeat, only unique values are formatted.
+    """
+    values = pd.Series(values, dtype=object)
+    not_null = values.notna().to_numpy()
+    present = values[not_null]
+
+    def fmt(x):
+        return x.strftime(format) if hasattr(x, "strftime") else str(x)
+
+    if all(issubclass(t, date) for t in set(map(type, present))):
+        codes, uniques = pd.factorize(present)
+        formatted = np.array([fmt(x) for x in uniques], dtype=object)[codes]
+    else:
+        formatted = present.map(fmt)
+
+    res = [None] * len(values)
+    for i, x in zip(not_null.nonzero()[0], formatted):
+        res[i] = x
+    return res
+
+
+def sanitise_non_serializable_datetime_node_attrs(
+    G, format, types=PYTHON_DT_TYPES + PANDAS_DT_TYPES, attrs=None
+):
+    """
+    Replace, in place, node attributes that have one or more values of date / time types,
+    that trip up altair serialisation, with strings in the given format.
+
+    Problem attributes are found with a single pass collecting the types of attribute
+    values; only their values are then gathered, and converted a column at a time.
+
+    :param format:  strftime format string - if empty, raise if there are any problem attrs
+    :param attrs:   only consider these attributes, if given
+    :return:        names of attributes converted
+    """
+    assert isinstance(types, tuple)
+
+    # single pass over attribute values, just to collect their types
+    attr_types = {
+        (k, type(v))
+        for _, d in G.nodes(data=True)
+        for k, v in d.items()
+        if attrs is None or k in attrs
+    }
+    problem_attrs = sorted(
+        {attr for attr, t in attr_types if issubclass(t, types)}, key=str
+    )
+    if problem_attrs and not format:
+        raise ValueError(
+            f"The following col(s) had non-serializable datetime types: {problem_attrs}"
+        )
+
+    for attr in problem_attrs:
+        nodes, values = zip(*G.nodes(data=attr))
+        for n, value in zip(nodes, _format_temporal_values(values, format)):
+            G.nodes[n][attr] = value
+
+    return problem_attrs
@@ -1,4 +1,6 @@
-from functools import partial
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
 
 import networkx as nx
 import numpy as np
@@ -56,12 +58,102 @@ def nx_graph_from_edges(
     return G
 
 
+def nx_edge_index_arrays(G, node_index=None):
+    """
+    Edge source and target node indices as int arrays, and edge data dicts, in
+    G.edges() order. Gathered in a single pass, without holding on to per-edge tuples -
+    which for large graphs triggers repeated, expensive cyclic garbage collection.
+
+    :param node_index:  {node_id: index} mapping - by default, G.nodes() order
+    """
+    node_index = (
+        node_index
+        if node_index is not None
+        else {n: i for i, n in enumerate(G.nodes())}
+    )
+    sources, targets, data = [], [], []
+    for u, v, d in G.edges(data=True):
+        sources.append(node_index[u])
+        targets.append(node_index[v])
+        data.append(d)
+
+    return np.array(sources, dtype=int), np.array(targets, dtype=int), data
+
+
+class NodePositions(Mapping):
+    """
+    Node positions held as an (n, 2) coordinate array plus a node to row index mapping -
+    so they can be transformed as a whole, and turned into table columns without going
+    via per-node tuples. Behaves as a read-only nx `pos`-style dict.
+    """
+
+    def __init__(self, nodes, xy):
+        self.nodes = list(nodes)
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        assert len(self.nodes) == len(self.xy), "Need one coordinate pair per node"
+
+    @classmethod
+    def from_pos(cls, pos):
+        if isinstance(pos, NodePositions):
+            return pos
+        return cls(pos.keys(), [pos[n] for n in pos])
+
+    @classmethod
+    def concat(cls, positions):
+        positions = list(positions)
+        return cls(
+            [n for p in positions for n in p.nodes],
+            np.concatenate([p.xy for p in positions]) if positions else [],
+        )
+
+    def take(self, nodes):
+        """(len(nodes), 2) coordinate array, in given node order"""
+        return self.xy[np.fromiter((self.index[n] for n in nodes), int, len(nodes))]
+
+    def __getitem__(self, node):
+        return self.xy[self.index[node]]
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+def _normalise_xy(xy, range, aspect_ratio=None, padding=None):
+    if padding:
+        range = (range[0] + padding, range[1] - padding)
+    if not xy.size:
+        return xy.astype(float)
+
+    upper_bound = np.abs(xy).max()
+    lower_bound = -upper_bound if (xy < 0).any() else 0
+
+    # map [lower, upper] bounds to range with a single affine transform
+    if upper_bound == lower_bound:
+        res = np.full(xy.shape, float(range[1]))
+    else:
+        scale = (range[1] - range[0]) / (upper_bound - lower_bound)
+        res = range[0] + (xy - lower_bound) * scale
+
+    if aspect_ratio is not None:
+        res[:, 0] *= aspect_ratio
+
+    return res
+
+
 def normalise_pos(pos, range=None, aspect_ratio=None, padding=None):
     """
-    Given a networkx-style pos structure - a dict like
-    {node_id: (x,y)} - return normalised x, y coord values
+    Given node positions, return normalised x, y coord values
     according to given range
 
+    :param pos:          networkx-style pos structure - a dict like {node_id: (x,y)};
+                         or an (n, 2) array of coords, or NodePositions - in which case
+                         the result is of the same type
     :param range:        range for x and y coords
     :param aspect_ratio: usual width / height ratio - default 1
     :param padding       how much space to leave around the edges
@@ -70,27 +162,24 @@ def normalise_pos(pos, range=None, aspect_ratio=None, padding=None):
 
     range = range or DEFAULT_POS_RANGE
     assert (len(range) == 2) and (range[0] <= range[1])
+
+    if isinstance(pos, NodePositions):
+        return NodePositions(
+            pos.nodes, _normalise_xy(pos.xy, range, aspect_ratio, padding)
+        )
+    if isinstance(pos, np.ndarray):
+        return _normalise_xy(
+            pos.astype(float).reshape(-1, 2), range, aspect_ratio, padding
+        )
+
     if not pos:
         return {}
     if not isinstance(pos, dict):
         raise ValueError(f"Only nx pos-like dict structures supported")
 
-    if padding:
-        range = (range[0] + padding, range[1] - padding)
-
-    xy_vals = [v for xy in pos.values() for v in xy]
-
-    upper_bound = max(map(abs, xy_vals))
-    lower_bound = -upper_bound if any([n < 0 for n in xy_vals]) else 0
-
-    # interpoloate between bounds
-    mapper = partial(np.interp, xp=[lower_bound, upper_bound], fp=range)
-
-    res = {k: tuple(map(mapper, xy)) for k, xy in pos.items()}
-    if aspect_ratio is not None:
-        res = {k: (xy[0] * aspect_ratio, xy[1]) for k, xy in res.items()}
-
-    return res
+    xy = np.array([pos[n] for n in pos], dtype=float).reshape(-1, 2)
+    xy = _normalise_xy(xy, range, aspect_ratio, padding)
+    return dict(zip(pos.keys(), map(tuple, xy.tolist())))
 
 
 def generate_interaction_graph(
@@ -158,6 +247,29 @@ def generate_interaction_graph(
     return nx.relabel_nodes(G, node_mapping)
 
 
+################
+# Instrumentation
+################
+
+
+@contextmanager
+def timed_stage(stats, stage):
+    """
+    Add the wall time spent in the block to stats["stages"][stage] - or do nothing, if
+    stats is None
+    """
+    if stats is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = stats.setdefault("stages", {})
+        stages[stage] = stages.get(stage, 0) + time.perf_counter() - start
+
+
 def is_lab_notebook():
     import re
 
@@ -0,0 +1,70 @@
+"""
+Compare the vectorised edge table builder against the previous per-row df.loc approach.
+
+    PYTHONPATH=. python benchmarks/edge_table.py [num_edges ...]
+"""
+
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from alph.layers import _nx_edges_to_pandas
+
+DEFAULT_SIZES = (1_000, 10_000, 200_000)
+LEGACY_MAX_EDGES = 10_000  # beyond this the legacy builder takes minutes
+
+
+def legacy_nx_edges_to_pandas(G, pos):
+    attributes = list(
+        set(
+            ["source", "target", "x", "y", "edge", "pair"]
+            + [k for e in G.edges() for k in G.edges[e].keys()]
+        )
+    )
+    df = pd.DataFrame(index=range(G.size() * 2), columns=attributes)
+    for i, e in enumerate(G.edges):
+        for j, end in enumerate(e):
+            df.loc[i * 2 + j] = dict(
+                edge=i,
+                source=e[0],
+                target=e[1],
+                pair=e,
+                x=pos[end][0],
+                y=pos[end][1],
+                **G.edges[e],
+            )
+    return df
+
+
+def make_graph(num_edges, seed=42):
+    rng = np.random.default_rng(seed)
+    G = nx.gnm_random_graph(num_edges // 4, num_edges, seed=seed)
+    for u, v in G.edges:
+        G.edges[u, v].update(weight=float(rng.random()), kind="reports_to")
+    pos = dict(zip(G.nodes, rng.uniform(-1, 1, (G.number_of_nodes(), 2))))
+    return G, pos
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'edges':>8} {'legacy (s)':>12} {'vectorised (s)':>16} {'speedup':>9}")
+    for num_edges in sizes:
+        G, pos = make_graph(num_edges)
+        new = timed(_nx_edges_to_pandas, G, pos)
+        if num_edges <= LEGACY_MAX_EDGES:
+            legacy = timed(legacy_nx_edges_to_pandas, G, pos)
+            print(f"{num_edges:>8} {legacy:>12.3f} {new:>16.4f} {legacy / new:>8.0f}x")
+        else:
+            print(f"{num_edges:>8} {'skipped':>12} {new:>16.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
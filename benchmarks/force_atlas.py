@@ -0,0 +1,122 @@
+"""
+Compare the built-in ForceAtlas2 against the fa2 library, if installed, for speed and layout quality.
+
+    PYTHONPATH=. python benchmarks/force_atlas.py [num_nodes ...] [--workers N]
+
+With --workers, the built-in layout is also timed computing forces across N processes.
+
+Quality is summarised as the ratio of mean edge length to mean distance between random node
+pairs - lower means linked nodes are placed closer together, relative to the layout's spread -
+plus the number of nodes with NaN co-ordinates.
+"""
+
+import sys
+import time
+from functools import partial
+
+import networkx as nx
+import numpy as np
+
+from alph.layout import BARNES_HUT_ON_THRESHOLD, force_atlas
+
+DEFAULT_SIZES = (100, 1_000, 5_000)
+ITERATIONS = 200
+FA2_KWARGS = dict(
+    outboundAttractionDistribution=True,
+    edgeWeightInfluence=1.0,
+    jitterTolerance=1.0,
+    barnesHutTheta=1.2,
+    scalingRatio=2.0,
+    strongGravityMode=True,
+    gravity=1.0,
+    verbose=False,
+)
+
+
+def make_graph(num_nodes, seed=42):
+    # clustered graph, so layout quality differences show
+    G = nx.relaxed_caveman_graph(max(num_nodes // 20, 1), 20, 0.1, seed=seed)
+    rng = np.random.default_rng(seed)
+    for u, v in G.edges:
+        G.edges[u, v]["weight"] = float(rng.uniform(0.5, 2))
+    return G
+
+
+def edge_length_ratio(G, pos, num_pairs=10_000, seed=0):
+    xy = np.array([pos[n] for n in G.nodes()], dtype=float)
+    if np.isnan(xy).any():
+        return np.nan
+    index = {n: i for i, n in enumerate(G.nodes())}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()])
+    edge_len = np.linalg.norm(xy[edges[:, 0]] - xy[edges[:, 1]], axis=1).mean()
+    pairs = np.random.default_rng(seed).integers(0, len(xy), (num_pairs, 2))
+    pair_dist = np.linalg.norm(xy[pairs[:, 0]] - xy[pairs[:, 1]], axis=1).mean()
+    return edge_len / pair_dist
+
+
+def builtin_layout(G, workers=None):
+    return force_atlas(
+        G,
+        weight_attr="weight",
+        iterations=ITERATIONS,
+        seed=0,
+        workers=workers,
+        **FA2_KWARGS,
+    )
+
+
+def fa2_layout(G):
+    from fa2 import ForceAtlas2
+
+    fa2 = ForceAtlas2(
+        barnesHutOptimize=G.number_of_nodes() > BARNES_HUT_ON_THRESHOLD, **FA2_KWARGS
+    )
+    pos = {
+        n: tuple(xy)
+        for n, xy in zip(G.nodes(), np.random.default_rng(0).random((len(G), 2)))
+    }
+    return fa2.forceatlas2_networkx_layout(
+        G, pos=pos, weight_attr="weight", iterations=ITERATIONS
+    )
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    res = fn(*args)
+    return time.perf_counter() - start, res
+
+
+def main(sizes, workers=None):
+    layouts = {"built-in": builtin_layout}
+    if workers:
+        layouts[f"built-in x{workers}"] = partial(builtin_layout, workers=workers)
+    try:
+        import fa2  # noqa: F401
+
+        layouts["fa2"] = fa2_layout
+    except ImportError:
+        print("fa2 not installed - timing the built-in layout only")
+
+    print(
+        f"{'nodes':>7} {'edges':>8} {'layout':>13} {'time (s)':>9} "
+        f"{'edge len ratio':>15} {'nan nodes':>10}"
+    )
+    for num_nodes in sizes:
+        G = make_graph(num_nodes)
+        for name, layout_fn in layouts.items():
+            elapsed, pos = timed(layout_fn, G)
+            num_nan = sum(1 for xy in pos.values() if np.isnan(xy).any())
+            print(
+                f"{G.number_of_nodes():>7} {G.number_of_edges():>8} {name:>13} {elapsed:>9.2f} "
+                f"{edge_length_ratio(G, pos):>15.3f} {num_nan:>10}"
+            )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = None
+    if "--workers" in args:
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        del args[i : i + 2]
+    main([int(arg) for arg in args] or DEFAULT_SIZES, workers=workers)
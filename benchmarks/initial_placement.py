@@ -0,0 +1,108 @@
+"""
+Compare initial placements for ForceAtlas2 by the stress reached after a given number of
+iterations, and how many iterations each saves reaching the lowest stress a random start
+reaches.
+
+    PYTHONPATH=. python benchmarks/initial_placement.py [num_nodes ...]
+
+Stress is measured against shortest path lengths from a sample of source nodes, after
+scaling the layout to best fit them - lower is better.
+"""
+
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+from force_atlas import make_graph
+
+from alph.layout import force_atlas, initial_layout
+
+DEFAULT_SIZES = (1_000, 5_000)
+INITS = ("random", "spectral", "pivot_mds")
+CHECKPOINTS = (0, 25, 50, 100, 200, 400, 800)
+NUM_SOURCES = 20
+
+
+def graph_distances(G, num_sources=NUM_SOURCES, seed=0):
+    nodes = list(G.nodes())
+    index = {n: i for i, n in enumerate(nodes)}
+    rng = np.random.default_rng(seed)
+    pairs, dists = [], []
+    for i in rng.choice(len(nodes), min(num_sources, len(nodes)), replace=False):
+        for n, d in nx.single_source_shortest_path_length(G, nodes[i]).items():
+            if d > 0:
+                pairs.append((i, index[n]))
+                dists.append(d)
+    return np.array(pairs), np.array(dists, dtype=float)
+
+
+def stress(G, pos, pairs, dists):
+    xy = np.array([pos[n] for n in G.nodes()], dtype=float)
+    layout_dists = np.linalg.norm(xy[pairs[:, 0]] - xy[pairs[:, 1]], axis=1)
+    # scale minimising sum(((s * layout_dist - dist) / dist) ** 2)
+    scale = np.sum(layout_dists / dists) / np.sum((layout_dists / dists) ** 2)
+    return np.mean(((scale * layout_dists - dists) / dists) ** 2)
+
+
+def iterations_to_reach(curve, target):
+    for iterations, value in curve:
+        if value <= target:
+            return iterations
+    return None
+
+
+def main(sizes):
+    print(
+        f"{'nodes':>7} {'init':>10} {'init (s)':>9} "
+        + " ".join(f"{f'@{it}':>7}" for it in CHECKPOINTS)
+        + f" {'saved':>7}"
+    )
+    for num_nodes in sizes:
+        G = make_graph(num_nodes)
+        pairs, dists = graph_distances(G)
+        curves = {}
+        for init in INITS:
+            start = time.perf_counter()
+            pos = initial_layout(G, init, weight_attr="weight", seed=0)
+            init_time = time.perf_counter() - start
+            curves[init] = [
+                (
+                    iterations,
+                    stress(
+                        G,
+                        (
+                            force_atlas(
+                                G,
+                                pos=pos,
+                                weight_attr="weight",
+                                iterations=iterations,
+                                seed=0,
+                            )
+                            if iterations
+                            else pos
+                        ),
+                        pairs,
+                        dists,
+                    ),
+                )
+                for iterations in CHECKPOINTS
+            ]
+
+            # iterations saved reaching the best stress from a random start
+            target = min(value for _, value in curves["random"])
+            reached = iterations_to_reach(curves[init], target)
+            saved = (
+                iterations_to_reach(curves["random"], target) - reached
+                if reached is not None
+                else "-"
+            )
+            print(
+                f"{len(G):>7} {init:>10} {init_time:>9.2f} "
+                + " ".join(f"{value:>7.3f}" for _, value in curves[init])
+                + f" {saved:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
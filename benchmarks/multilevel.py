@@ -0,0 +1,51 @@
+"""
+Compare the multilevel layout against flat ForceAtlas2 (default_network_layout) for speed and layout quality.
+
+    PYTHONPATH=. python benchmarks/multilevel.py [num_nodes ...]
+
+Quality is the ratio of mean edge length to mean distance between random node pairs - see
+force_atlas.py.
+"""
+
+import sys
+import time
+
+from force_atlas import edge_length_ratio, make_graph
+
+from alph.layout import default_network_layout, multilevel_layout
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+FLAT_MAX_NODES = 10_000  # beyond this the flat layout takes tens of minutes
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    res = fn(*args, **kwargs)
+    return time.perf_counter() - start, res
+
+
+def main(sizes):
+    print(
+        f"{'nodes':>8} {'edges':>9} {'layout':>11} {'time (s)':>9} "
+        f"{'edge len ratio':>15} {'levels':>7}"
+    )
+    for num_nodes in sizes:
+        G = make_graph(num_nodes)
+        stats = {}
+        layouts = {"multilevel": (multilevel_layout, stats)}
+        if num_nodes <= FLAT_MAX_NODES:
+            layouts["flat"] = (default_network_layout, {})
+
+        for name, (layout_fn, stats) in layouts.items():
+            elapsed, pos = timed(
+                layout_fn, G, weight_attr="weight", seed=0, stats=stats
+            )
+            print(
+                f"{G.number_of_nodes():>8} {G.number_of_edges():>9} {name:>11} "
+                f"{elapsed:>9.2f} {edge_length_ratio(G, pos):>15.3f} "
+                f"{len(stats.get('levels', [None])):>7}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,63 @@
+"""
+Compare the columnar node table builder against the previous per-row df.loc approach.
+
+    PYTHONPATH=. python benchmarks/node_table.py [num_nodes ...]
+"""
+
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from alph.layers import _nx_nodes_to_pandas
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+LEGACY_MAX_NODES = 10_000  # beyond this the legacy builder takes minutes
+
+
+def legacy_nx_nodes_to_pandas(G, pos):
+    attributes = list(
+        set(["x", "y"] + [k for n in G.nodes() for k in G.nodes[n].keys()])
+    )
+    df = pd.DataFrame(index=G.nodes(), columns=attributes)
+    for n in G.nodes:
+        df.loc[n] = dict(x=pos[n][0], y=pos[n][1], **G.nodes[n])
+    return df
+
+
+def make_graph(num_nodes, seed=42):
+    rng = np.random.default_rng(seed)
+    G = nx.empty_graph(num_nodes)
+    teams = [f"team_{i}" for i in range(50)]
+    for n in G.nodes:
+        G.nodes[n].update(
+            team=teams[rng.integers(len(teams))],
+            score=float(rng.random()),
+            age=int(rng.integers(20, 65)),
+        )
+    pos = dict(zip(G.nodes, rng.uniform(-1, 1, (num_nodes, 2))))
+    return G, pos
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'nodes':>8} {'legacy (s)':>12} {'columnar (s)':>14} {'speedup':>9}")
+    for num_nodes in sizes:
+        G, pos = make_graph(num_nodes)
+        new = timed(_nx_nodes_to_pandas, G, pos)
+        if num_nodes <= LEGACY_MAX_NODES:
+            legacy = timed(legacy_nx_nodes_to_pandas, G, pos)
+            print(f"{num_nodes:>8} {legacy:>12.3f} {new:>14.4f} {legacy / new:>8.0f}x")
+        else:
+            print(f"{num_nodes:>8} {'skipped':>12} {new:>14.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,67 @@
+"""
+Time restyling a graph: calling alph() again with different node and edge args, vs rendering
+a RenderPlan prepared once.
+
+    PYTHONPATH=. python benchmarks/render_plan.py [num_nodes ...]
+
+Both use the multilevel layout; chart times include spec generation, as that's where
+restyled charts end up.
+"""
+
+import sys
+import time
+from functools import partial
+
+import altair as alt
+from force_atlas import make_graph
+
+from alph import alph, prepare
+from alph.layout import multilevel_layout
+
+DEFAULT_SIZES = (1_000, 20_000)
+STYLES = [
+    dict(node_args=dict(fill="#000"), edge_args=dict(color="#606060")),
+    dict(node_args=dict(fill="#2a6"), edge_args=dict(color="#ccc")),
+    dict(node_args=dict(fill="#a26", tooltip_attrs=["id"]), edge_args={}),
+]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    res = fn(*args, **kwargs)
+    return time.perf_counter() - start, res
+
+
+def main(sizes):
+    print(
+        f"{'nodes':>8} {'edges':>9} {'alph() (s)':>11} {'prepare (s)':>12} "
+        f"{'render (s)':>11} {'to_dict (s)':>12}"
+    )
+    for num_nodes in sizes:
+        G = make_graph(num_nodes)
+        for n in G.nodes:
+            G.nodes[n]["id"] = str(n)
+        layout_fn = partial(multilevel_layout, weight_attr="weight", seed=0)
+
+        with alt.data_transformers.disable_max_rows():
+            alph_time = min(
+                timed(alph, G, weight_attr="weight", layout_fn=layout_fn, **style)[0]
+                for style in STYLES
+            )
+            prepare_time, plan = timed(
+                prepare, G, weight_attr="weight", layout_fn=layout_fn
+            )
+            plan.render()  # first render builds the tables
+            render_time, chart = min(
+                (timed(plan.render, **style) for style in STYLES), key=lambda r: r[0]
+            )
+            to_dict_time, _ = timed(chart.to_dict)
+
+        print(
+            f"{G.number_of_nodes():>8} {G.number_of_edges():>9} {alph_time:>11.2f} "
+            f"{prepare_time:>12.2f} {render_time:>11.3f} {to_dict_time:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
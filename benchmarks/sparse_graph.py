@@ -0,0 +1,49 @@
+"""
+Time building a CSR adjacency matrix for sparse layouts: via nx.to_scipy_sparse_array plus
+csr_matrix, as force_atlas_sknet used to, vs SparseGraph.
+
+    PYTHONPATH=. python benchmarks/sparse_graph.py [num_nodes ...]
+"""
+
+import sys
+import time
+
+import networkx as nx
+from force_atlas import make_graph
+from scipy.sparse import csr_matrix
+
+from alph.layout import SparseGraph
+
+DEFAULT_SIZES = (10_000, 100_000)
+REPEATS = 3
+
+
+def via_networkx(G):
+    return csr_matrix(nx.to_scipy_sparse_array(G, weight="weight"))
+
+
+def via_sparse_graph(G):
+    return SparseGraph(G, "weight").adjacency
+
+
+def best_time(fn, G):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(G)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(sizes):
+    print(f"{'nodes':>8} {'edges':>9} {'networkx (s)':>13} {'SparseGraph (s)':>16}")
+    for num_nodes in sizes:
+        G = make_graph(num_nodes)
+        print(
+            f"{G.number_of_nodes():>8} {G.number_of_edges():>9} "
+            f"{best_time(via_networkx, G):>13.3f} {best_time(via_sparse_graph, G):>16.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,281 @@
+"""
+Time alph() end to end, stage by stage, across graph sizes and combo configurations - and
+compare results between commits.
+
+    PYTHONPATH=. python benchmarks/suite.py [--sizes 100 1000 ...] [--graph interaction|random]
+                                            [--layout auto|default|multilevel|random]
+                                            [--repeat N] [--output results.json]
+    PYTHONPATH=. python benchmarks/suite.py --compare baseline.json results.json
+
+Stages, timed by wrapping the functions alph() calls for them:
+
+- preprocess:   datetime attribute sanitising
+- combo:        combo_graph_mapper
+- layout:       layout functions - for combos, the combo layout plus all intra-combo layouts
+- tables:       node and edge table building
+- other:        the rest of alph() - position normalisation, chart assembly
+- to_dict:      Vega-Lite spec generation, including data serialisation
+
+Graphs are seeded, so results are comparable between runs. Results are a JSON document with
+run metadata, and one record per size, combo configuration and stage, holding the fastest of
+--repeat runs. Comparing prints each stage's time ratio, new / old.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
+
+import altair as alt
+import networkx as nx
+import numpy as np
+
+import alph.combo
+import alph.core
+import alph.layers
+from alph import alph as alph_chart
+from alph import layout
+from alph.util import generate_interaction_graph
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+COMBO_CONFIGS = {
+    "none": {},
+    "combo": dict(combo_group_by="team"),
+    "combo_consolidated": dict(combo_group_by="team", combo_consolidate_layers=True),
+}
+STAGES = ("preprocess", "combo", "layout", "tables", "other", "to_dict")
+# wrapped module attributes, by stage
+STAGE_FUNCTIONS = {
+    "preprocess": [(alph.core, "sanitise_non_serializable_datetime_node_attrs")],
+    "combo": [(alph.combo, "combo_graph_mapper")],
+    "tables": [
+        (alph.layers, "_nx_nodes_to_pandas"),
+        (alph.layers, "_nx_edges_to_pandas"),
+    ],
+}
+AUTO_MULTILEVEL_MIN_NODES = 10_000  # flat ForceAtlas2 takes too long beyond this
+
+
+def make_graph(num_nodes, kind="interaction", seed=42):
+    """Seeded graph, with node attributes to style, group and sanitise"""
+    if kind == "interaction":
+        G = generate_interaction_graph(num_nodes, 1, seed=seed)
+    else:
+        G = nx.gnm_random_graph(num_nodes, 3 * num_nodes, seed=seed)
+
+    rng = np.random.default_rng(seed)
+    for u, v in G.edges:
+        G.edges[u, v].setdefault("weight", float(rng.uniform(0.5, 2)))
+
+    num_teams = max(2, round(num_nodes**0.5 / 2))
+    teams = rng.integers(num_teams, size=len(G))
+    days = rng.integers(3650, size=len(G))
+    start = datetime(2015, 1, 1)
+    for i, n in enumerate(G.nodes):
+        G.nodes[n].update(
+            team=f"team {teams[i]}",
+            name=f"person {n}",
+            score=float(rng.random()),
+            joined=start + timedelta(days=int(days[i])),
+        )
+    return G
+
+
+def layout_fns(layout_name, num_nodes):
+    """(network / intra-combo layout, combo layout) functions"""
+    if layout_name == "auto":
+        layout_name = (
+            "multilevel" if num_nodes >= AUTO_MULTILEVEL_MIN_NODES else "default"
+        )
+    if layout_name == "random":
+        fn = partial(nx.random_layout, seed=0)
+        return fn, fn
+    if layout_name == "multilevel":
+        fn = partial(layout.multilevel_layout, weight_attr="weight", seed=0)
+        return fn, partial(layout.default_inter_combo_layout, weight_attr="weight")
+    return None, None  # alph's defaults
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - start
+
+        return timed
+
+    @contextmanager
+    def patched(self):
+        originals = [
+            (module, name, getattr(module, name))
+            for functions in STAGE_FUNCTIONS.values()
+            for module, name in functions
+        ]
+        try:
+            for stage, functions in STAGE_FUNCTIONS.items():
+                for module, name in functions:
+                    setattr(module, name, self.wrap(stage, getattr(module, name)))
+            yield self
+        finally:
+            for module, name, fn in originals:
+                setattr(module, name, fn)
+
+
+def default_layout(default_fn):
+    # alph's own default layouts, made explicit so they can be timed
+    return partial(default_fn, weight_attr="weight")
+
+
+def run_once(G, combo_args, layout_name):
+    timer = StageTimer()
+    layout_fn, combo_layout_fn = layout_fns(layout_name, len(G))
+    is_combo = bool(combo_args)
+    layout_fn = layout_fn or default_layout(
+        layout.default_intra_combo_layout if is_combo else layout.default_network_layout
+    )
+    combo_layout_fn = combo_layout_fn or default_layout(
+        layout.default_inter_combo_layout
+    )
+
+    with timer.patched():
+        start = time.perf_counter()
+        chart = alph_chart(
+            G,
+            weight_attr="weight",
+            layout_fn=timer.wrap("layout", layout_fn),
+            combo_layout_fn=timer.wrap("layout", combo_layout_fn),
+            node_args=dict(tooltip_attrs=["name", "team", "joined"]),
+            **combo_args,
+        )
+        total = time.perf_counter() - start
+
+    timer.seconds["other"] = total - sum(timer.seconds.values())
+    with alt.data_transformers.disable_max_rows():
+        start = time.perf_counter()
+        spec = chart.to_dict()
+        timer.seconds["to_dict"] = time.perf_counter() - start
+
+    return timer.seconds, len(json.dumps(spec))
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, graph_kind, layout_name, repeat):
+    results = []
+    print(
+        f"{'nodes':>7} {'edges':>8} {'combo':>19} "
+        + " ".join(f"{stage:>10}" for stage in STAGES)
+        + f" {'spec (MB)':>10}",
+        file=sys.stderr,
+    )
+    for num_nodes in sizes:
+        G = make_graph(num_nodes, graph_kind)
+        for config, combo_args in COMBO_CONFIGS.items():
+            runs = [run_once(G, combo_args, layout_name) for _ in range(repeat)]
+            seconds = {stage: min(r[0][stage] for r in runs) for stage in STAGES}
+            spec_bytes = runs[0][1]
+            print(
+                f"{len(G):>7} {G.number_of_edges():>8} {config:>19} "
+                + " ".join(f"{seconds[stage]:>10.3f}" for stage in STAGES)
+                + f" {spec_bytes / 1e6:>10.2f}",
+                file=sys.stderr,
+            )
+            results.extend(
+                dict(
+                    nodes=len(G),
+                    edges=G.number_of_edges(),
+                    combo=config,
+                    stage=stage,
+                    seconds=seconds[stage],
+                    spec_bytes=spec_bytes,
+                )
+                for stage in STAGES
+            )
+
+    return dict(
+        commit=git_commit(),
+        timestamp=datetime.now().isoformat(timespec="seconds"),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        graph=graph_kind,
+        layout=layout_name,
+        repeat=repeat,
+        results=results,
+    )
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(r):
+        return r["nodes"], r["combo"], r["stage"]
+
+    old_results = {key(r): r for r in old["results"]}
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(
+        f"{'nodes':>7} {'combo':>19} {'stage':>10} {'old (s)':>9} {'new (s)':>9} "
+        f"{'new / old':>10}"
+    )
+    for r in new["results"]:
+        if key(r) not in old_results:
+            continue
+        old_seconds = old_results[key(r)]["seconds"]
+        ratio = r["seconds"] / old_seconds if old_seconds > 0 else float("nan")
+        print(
+            f"{r['nodes']:>7} {r['combo']:>19} {r['stage']:>10} {old_seconds:>9.3f} "
+            f"{r['seconds']:>9.3f} {ratio:>10.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--graph", choices=["interaction", "random"], default="interaction"
+    )
+    parser.add_argument(
+        "--layout", choices=["auto", "default", "multilevel", "random"], default="auto"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="write results JSON here, rather than stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    res = run(args.sizes, args.graph, args.layout, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(res, f, indent=1)
+    else:
+        json.dump(res, sys.stdout, indent=1)
+
+
+if __name__ == "__main__":
+    main()
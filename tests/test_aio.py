@@ -0,0 +1,124 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from alph import alph, alph_async, layout
+
+
+def slow_layout(G, delay=1):
+    time.sleep(delay)
+    return nx.circular_layout(G)
+
+
+def seedless_layout(G):
+    return {n: np.random.random(2) for n in G}
+
+
+@pytest.fixture
+def G():
+    G = nx.karate_club_graph()
+    for n, d in G.nodes(data=True):
+        d["team"] = d.pop("club")
+    return G
+
+
+def test_alph_async(G):
+    kwargs = dict(weight_attr="weight", layout_fn=nx.circular_layout)
+    assert asyncio.run(alph_async(G, **kwargs)).to_dict() == alph(G, **kwargs).to_dict()
+
+
+@pytest.mark.parametrize("combo_group_by", [None, "team"])
+def test_layout_executor(G, combo_group_by):
+    kwargs = dict(
+        weight_attr="weight",
+        layout_fn=partial(layout.force_atlas, weight_attr="weight", seed=0),
+        combo_group_by=combo_group_by,
+        combo_layout_fn=nx.circular_layout,
+        intra_combo_layout_workers=2,
+    )
+    stats = {}
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        chart = asyncio.run(
+            alph_async(
+                G, layout_executor=pool, layout_min_nodes=0, stats=stats, **kwargs
+            )
+        )
+
+    assert chart.to_dict() == alph(G, **kwargs).to_dict()
+    if combo_group_by:
+        assert stats["intra_combo_layouts"]["laid_out"] == 2
+    else:
+        # filled in by the worker process
+        assert stats["layout"]["iterations"] > 0
+
+
+@pytest.mark.parametrize("layout_fn", [None, seedless_layout])
+def test_layout_executor_seeded(G, layout_fn):
+    kwargs = dict(
+        weight_attr="weight",
+        layout_fn=layout_fn,
+        combo_group_by="team",
+        combo_layout_fn=nx.circular_layout,
+        intra_combo_layout_seed=3,
+    )
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        charts = [
+            asyncio.run(
+                alph_async(G, layout_executor=pool, layout_min_nodes=0, **kwargs)
+            ).to_dict()
+            for _ in range(2)
+        ]
+
+    assert charts[0] == charts[1] == alph(G, **kwargs).to_dict()
+
+
+@pytest.mark.parametrize("intra_combo_layout_executor", ["process", None])
+def test_layout_executor_intra_combo_executor(G, intra_combo_layout_executor):
+    kwargs = dict(
+        weight_attr="weight",
+        layout_fn=nx.circular_layout,
+        combo_group_by="team",
+        combo_layout_fn=nx.circular_layout,
+        intra_combo_layout_workers=2,
+    )
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        if intra_combo_layout_executor:
+            with pytest.raises(ValueError):
+                asyncio.run(
+                    alph_async(
+                        G,
+                        layout_executor=pool,
+                        intra_combo_layout_executor=intra_combo_layout_executor,
+                        **kwargs,
+                    )
+                )
+        else:
+            # "thread" by default, rather than alph()'s "process"
+            chart = asyncio.run(alph_async(G, layout_executor=pool, **kwargs))
+            assert chart.to_dict() == alph(G, **kwargs).to_dict()
+
+
+def test_timeout_cancels_layouts(G):
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(
+                alph_async(
+                    G,
+                    layout_fn=slow_layout,
+                    combo_group_by="team",
+                    combo_layout_fn=nx.circular_layout,
+                    layout_executor=pool,
+                    layout_min_nodes=0,
+                    timeout=0.2,
+                )
+            )
+        assert time.perf_counter() - start < 1
+
+    # the first intra-combo layout was running, and ran to completion; the second was cancelled
+    assert time.perf_counter() - start < 2
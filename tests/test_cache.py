@@ -0,0 +1,192 @@
+import os
+import subprocess
+import sys
+from functools import partial
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from alph import alph, layout
+from alph.cache import LayoutCache
+
+
+class CountingLayout:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, G, scale=1):
+        self.calls += 1
+        return nx.circular_layout(G, scale=scale)
+
+
+SCALE = 1
+scaled_layout = lambda G: nx.circular_layout(G, scale=SCALE)  # noqa: E731
+
+
+@pytest.fixture
+def G():
+    G = nx.Graph()
+    G.add_edges_from([("a", "b", {"weight": 1}), ("b", "c", {"weight": 2})])
+    return G
+
+
+class Test_LayoutCache:
+    def test_hit_skips_layout(self, G):
+        cache, layout_fn = LayoutCache(), CountingLayout()
+
+        first = cache.layout(layout_fn, G, weight_attr="weight")
+        second = cache.layout(layout_fn, G.copy(), weight_attr="weight")
+
+        assert layout_fn.calls == 1
+        assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+        for n in G.nodes():
+            assert np.allclose(first[n], second[n])
+
+    def test_weight_change_misses(self, G):
+        cache, layout_fn = LayoutCache(), CountingLayout()
+        cache.layout(layout_fn, G, weight_attr="weight")
+
+        G.edges["a", "b"]["weight"] = 5
+        cache.layout(layout_fn, G, weight_attr="weight")
+        assert layout_fn.calls == 2
+
+        # other edge attrs don't matter
+        G.edges["a", "b"]["colour"] = "red"
+        cache.layout(layout_fn, G, weight_attr="weight")
+        assert layout_fn.calls == 2
+
+    def test_structure_change_misses(self, G):
+        cache, layout_fn = LayoutCache(), CountingLayout()
+        cache.layout(layout_fn, G)
+
+        G.add_edge("c", "d")
+        cache.layout(layout_fn, G)
+        assert layout_fn.calls == 2
+
+    def test_layout_fn_and_params_in_key(self, G):
+        cache = LayoutCache()
+
+        keys = {
+            cache.key(lambda G: nx.circular_layout(G), G),
+            cache.key(lambda G: nx.spring_layout(G), G),
+            cache.key(partial(nx.spring_layout, k=1), G),
+            cache.key(partial(nx.spring_layout, k=2), G),
+            cache.key(nx.spring_layout, G, seed=1),
+            cache.key(nx.spring_layout, G, seed=2),
+        }
+        assert len(keys) == 6
+        assert cache.key(partial(nx.spring_layout, k=1), G) == cache.key(
+            partial(nx.spring_layout, k=1), G.copy()
+        )
+
+    def test_partial_args_in_key(self, G):
+        cache = LayoutCache()
+        init = np.zeros((1000, 2))
+        other_init = init.copy()
+        other_init[500] = 1
+
+        # repr abbreviates large arrays, to the same string for these two
+        assert repr(init) == repr(other_init)
+        assert cache.key(partial(nx.spring_layout, pos=init), G) != cache.key(
+            partial(nx.spring_layout, pos=other_init), G
+        )
+        assert cache.key(nx.spring_layout, G, pos=init) != cache.key(
+            nx.spring_layout, G, pos=other_init
+        )
+
+    def test_key_stable_across_processes(self, G):
+        # functions bound or passed as params have different addresses in each process
+        layout_fn = partial(layout.initialised_layout, layout_fn=nx.spring_layout)
+        key = LayoutCache().key(layout_fn, G, "weight", init=nx.spring_layout)
+
+        code = (
+            "import networkx as nx\n"
+            "from functools import partial\n"
+            "from alph import layout\n"
+            "from alph.cache import LayoutCache\n"
+            f"G = nx.Graph({list(G.edges(data=True))!r})\n"
+            "layout_fn = partial(layout.initialised_layout, layout_fn=nx.spring_layout)\n"
+            "print(LayoutCache().key(layout_fn, G, 'weight', init=nx.spring_layout))"
+        )
+        res = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        )
+
+        assert res.stdout.strip() == key
+
+    def test_global_values_in_key(self, G, monkeypatch):
+        cache = LayoutCache()
+        small = cache.layout(scaled_layout, G)
+
+        monkeypatch.setitem(globals(), "SCALE", 100)
+        large = cache.layout(scaled_layout, G)
+
+        assert cache.misses == 2
+        assert np.allclose(large["a"], 100 * small["a"])
+
+    def test_size_based_eviction(self, G):
+        entry_bytes = G.number_of_nodes() * 2 * 8
+        cache, layout_fn = LayoutCache(max_bytes=2 * entry_bytes), CountingLayout()
+
+        for scale in [1, 2, 3]:
+            cache.layout(layout_fn, G, scale=scale)
+        assert cache.stats["entries"] == 2
+        assert cache.stats["nbytes"] == 2 * entry_bytes
+
+        cache.layout(layout_fn, G, scale=1)  # evicted
+        assert layout_fn.calls == 4
+        cache.layout(layout_fn, G, scale=3)
+        assert layout_fn.calls == 4
+
+    def test_disk_tier(self, G, tmp_path):
+        layout_fn = CountingLayout()
+        first = LayoutCache(cache_dir=tmp_path).layout(layout_fn, G)
+
+        cache = LayoutCache(cache_dir=tmp_path)
+        second = cache.layout(layout_fn, G)
+
+        assert layout_fn.calls == 1
+        assert cache.stats["disk_hits"] == 1
+        for n in G.nodes():
+            assert np.allclose(first[n], second[n])
+
+    def test_alph(self, G):
+        nx.set_node_attributes(G, {"a": "x", "b": "x", "c": "y"}, "team")
+        cache, layout_fn = LayoutCache(), CountingLayout()
+
+        for fill in ["red", "blue"]:
+            alph(
+                G,
+                weight_attr="weight",
+                layout_fn=layout_fn,
+                node_args=dict(fill=fill),
+            )
+            alph(
+                G,
+                weight_attr="weight",
+                layout_fn=layout_fn,
+                combo_group_by="team",
+                combo_layout_fn=nx.circular_layout,
+                node_args=dict(fill=fill),
+                layout_cache=cache,
+            )
+
+        # uncached non-combo layout twice; each intra-combo layout once
+        assert layout_fn.calls == 2 + 2
+        # inter-combo and both intra-combo layouts on second combo render
+        assert cache.stats["hits"] == 3
+
+    def test_alph_stats(self, G):
+        cache, stats = LayoutCache(), [{}, {}]
+
+        for s in stats:
+            alph(G, weight_attr="weight", layout_cache=cache, stats=s)
+
+        assert stats[0]["layout"]["cached"] is False
+        assert stats[0]["layout"]["iterations"] > 0
+        assert stats[1]["layout"] == dict(cached=True)
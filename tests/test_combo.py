@@ -210,6 +210,84 @@ class Test_combo_graphs:
 
         assert [w for _, _, w in inter_combo_G.edges(data="weighted_age")] == [1, 3.9]
 
+    def test_intra_combo_graphs_are_induced_subgraphs(self):
+        G = nx.gnm_random_graph(200, 600, seed=1)
+        nx.set_node_attributes(G, {n: {"team": n % 7, "n": n} for n in G.nodes})
+        G.graph["name"] = "random"
+
+        _, intra_combo_Gs = combo.combo_graph_mapper(G, combo_group_by="team")
+
+        assert list(intra_combo_Gs.keys()) == list(range(7))
+        for team, G_intra in intra_combo_Gs.items():
+            expected = G.subgraph([n for n in G.nodes if n % 7 == team])
+            assert list(G_intra.nodes) == [n for n in G.nodes if n % 7 == team]
+            assert sorted_edges(G_intra, data=True) == sorted_edges(expected, data=True)
+            assert G_intra.graph == {"name": "random"}
+            assert G_intra.nodes[team]["n"] == team
+
+        # node attrs aren't shared with the original graph
+        intra_combo_Gs[0].nodes[0]["n"] = "changed"
+        assert G.nodes[0]["n"] == 0
+
+    def test_intra_combo_multigraph(self):
+        G = nx.MultiGraph()
+        G.add_nodes_from([("a", {"team": 1}), ("b", {"team": 1}), ("c", {"team": 2})])
+        G.add_edges_from([("a", "b", "k1", {}), ("a", "b", "k2", {}), ("a", "c")])
+
+        _, intra_combo_Gs = combo.combo_graph_mapper(G, combo_group_by="team")
+
+        assert isinstance(intra_combo_Gs[1], nx.MultiGraph)
+        assert list(intra_combo_Gs[1].edges(keys=True)) == [
+            ("a", "b", "k1"),
+            ("a", "b", "k2"),
+        ]
+        assert intra_combo_Gs[2].number_of_edges() == 0
+
+    @pytest.mark.parametrize("directed", [False, True])
+    def test_sparse_edge_aggregation_matches_pandas(self, directed):
+        G = nx.gnm_random_graph(300, 2000, seed=1, directed=directed)
+        nx.set_node_attributes(G, {n: f"team_{n % 13}" for n in G.nodes}, "team")
+        for i, (u, v) in enumerate(G.edges):
+            G.edges[u, v].update(weight=(i % 7) / 10, n=i % 3)
+            if i % 5:
+                G.edges[u, v]["sometimes"] = i
+        combo_values_by_node = dict(G.nodes(data="team"))
+        aggs = dict(
+            weight=("weight", "sum"),
+            n=("n", "sum"),
+            num=("target", "count"),
+            size=("weight", "size"),
+            sometimes_count=("sometimes", "count"),
+            sometimes_sum=("sometimes", "sum"),
+            sometimes_mean=("sometimes", "mean"),
+        )
+
+        sparse_res = combo._aggregate_combo_edges_sparse(G, combo_values_by_node, aggs)
+        pandas_res = combo._aggregate_combo_edges_pandas(G, combo_values_by_node, aggs)
+
+        pd.testing.assert_frame_equal(sparse_res, pandas_res, check_dtype=False)
+        assert sparse_res["n"].dtype == int
+
+    def test_sparse_edge_aggregation_falls_back(self, G_with_empties):
+        custom = {"weight": ("weight", lambda w: w.max() - w.min())}
+        assert (
+            combo._aggregate_combo_edges_sparse(
+                G_with_empties, {n: n for n in G_with_empties}, custom
+            )
+            is None
+        )
+
+        inter_combo_G, _ = combo.combo_graph_mapper(
+            G_with_empties,
+            combo_group_by="team",
+            empty_combo_attr_action="group",
+            combo_edge_weight_agg_attr="weight",
+            combo_edge_agg_attrs=custom,
+        )
+        assert [w for _, _, w in inter_combo_G.edges(data="weight")] == [
+            pytest.approx(0.2)
+        ]
+
     # TODO:
     # - test use of name field as group label
     # - return non-combo'd nodes if they don't hae a combo category
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import pytest
+
+from alph import alph, layers, prepare
+
+
+@pytest.fixture
+def G():
+    G = nx.karate_club_graph()
+    for n, d in G.nodes(data=True):
+        d["team"] = d.pop("club")
+    return G
+
+
+@pytest.fixture
+def count_table_builds(monkeypatch):
+    counts = dict(nodes=0, edges=0)
+
+    def counted(name, fn):
+        def inner(*args, **kwargs):
+            counts[name] += 1
+            return fn(*args, **kwargs)
+
+        return inner
+
+    monkeypatch.setattr(
+        layers, "_nx_nodes_to_pandas", counted("nodes", layers._nx_nodes_to_pandas)
+    )
+    monkeypatch.setattr(
+        layers, "_nx_edges_to_pandas", counted("edges", layers._nx_edges_to_pandas)
+    )
+    return counts
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        dict(combo_group_by="team"),
+        dict(combo_group_by="team", combo_consolidate_layers=True),
+    ],
+)
+def test_plan_renders_as_alph(G, kwargs):
+    kwargs = dict(weight_attr="weight", layout_fn=nx.circular_layout, **kwargs)
+    if "combo_group_by" in kwargs:
+        kwargs["combo_layout_fn"] = nx.circular_layout
+    node_args = dict(fill="team", tooltip_attrs=["team"])
+
+    assert (
+        prepare(G, **kwargs).render(node_args=node_args).to_dict()
+        == alph(G, node_args=node_args, **kwargs).to_dict()
+    )
+
+
+def test_restyle_reuses_tables(G, count_table_builds):
+    plan = prepare(G, weight_attr="weight", layout_fn=nx.circular_layout)
+    first = plan.render()
+    assert count_table_builds == dict(nodes=1, edges=1)
+
+    restyled = plan.render(
+        node_args=dict(fill="team", keep_attrs=True), edge_args=dict(color="#ccc")
+    )
+    assert count_table_builds == dict(nodes=1, edges=1)
+    assert "team" in restyled.layer[1].data
+    # columns added for one render don't leak into others
+    assert "team" not in first.layer[1].data
+    assert "team" not in plan.render().layer[1].data
+
+
+def test_combo_restyle_reuses_tables(G, count_table_builds):
+    plan = prepare(
+        G,
+        weight_attr="weight",
+        layout_fn=nx.circular_layout,
+        combo_group_by="team",
+        combo_layout_fn=nx.circular_layout,
+    )
+    plan.render()
+    counts = dict(count_table_builds)
+
+    plan.render(node_args=dict(fill="team"))
+    assert count_table_builds == counts
+
+
+def test_shared_layers_across_threads(G):
+    nodes_layer = layers.nodes_layer(fill="team", tooltip_attrs=["team"])
+    edges_layer = layers.edges_layer(weight_attr="weight")
+    graphs = [nx.relabel_nodes(G, lambda n: n + i) for i in range(8)]
+
+    def render(G):
+        return alph(
+            G,
+            weight_attr="weight",
+            layout_fn=nx.circular_layout,
+            node_args=nodes_layer,
+            edge_args=edges_layer,
+        ).to_dict()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        concurrent = list(pool.map(render, graphs))
+    assert concurrent == [render(G) for G in graphs]
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import pytest
+
+from alph.export import export_chart, export_charts
+
+pytest.importorskip("vl_convert")
+
+
+def graphs(num_graphs):
+    for i in range(num_graphs):
+        yield f"g{i}", nx.path_graph(i + 3)
+
+
+def test_export_chart(tmp_path):
+    path = export_chart(
+        nx.path_graph(3), str(tmp_path / "g.svg"), layout_fn=nx.circular_layout
+    )
+    with open(path) as f:
+        assert f.read().startswith("<svg")
+    assert [p.name for p in tmp_path.iterdir()] == ["g.svg"]
+
+
+def test_export_chart_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_chart(nx.path_graph(3), str(tmp_path / "g.gif"))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        dict(workers=2, executor="thread"),
+        dict(executor=ThreadPoolExecutor(max_workers=2), max_pending=1),
+        dict(executor=ThreadPoolExecutor(max_workers=2), workers=2),
+    ],
+)
+def test_export_charts(tmp_path, kwargs):
+    res = export_charts(
+        graphs(4), tmp_path, format="svg", layout_fn=nx.circular_layout, **kwargs
+    )
+
+    assert sorted(res) == ["g0", "g1", "g2", "g3"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"g{i}.svg" for i in range(4)]
+
+
+def test_export_charts_executor_needs_bound(tmp_path):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with pytest.raises(ValueError):
+            export_charts(graphs(4), tmp_path, executor=pool)
+
+
+def test_export_charts_per_graph_kwargs(tmp_path):
+    res = export_charts(
+        [("g", nx.path_graph(3), dict(prop_kwargs=dict(title="per-graph title")))],
+        tmp_path,
+        format="svg",
+        layout_fn=nx.circular_layout,
+    )
+    with open(res["g"]) as f:
+        assert "per-graph title" in f.read()
+
+
+def test_export_charts_bounded(tmp_path):
+    written_when_consumed = []
+
+    def tracked_graphs():
+        for name, G in graphs(6):
+            written_when_consumed.append(len(list(tmp_path.glob("*.svg"))))
+            yield name, G
+
+    export_charts(
+        tracked_graphs(),
+        tmp_path,
+        format="svg",
+        executor=ThreadPoolExecutor(max_workers=1),
+        max_pending=2,
+        layout_fn=nx.circular_layout,
+    )
+    # graph i is only taken once fewer than max_pending are in flight
+    assert all(written >= i - 1 for i, written in enumerate(written_when_consumed))
+    assert written_when_consumed[-1] >= 4
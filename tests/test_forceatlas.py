@@ -0,0 +1,132 @@
+from multiprocessing import shared_memory
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from alph import forceatlas
+from alph.layout import force_atlas
+
+
+@pytest.fixture
+def G_clustered():
+    return nx.relaxed_caveman_graph(6, 12, 0.05, seed=1)
+
+
+def test_graph_arrays():
+    G = nx.MultiGraph()
+    G.add_edge("a", "b", weight=2)
+    G.add_edge("b", "a", weight=3)
+    G.add_edge("b", "c", weight=0)
+    G.add_edge("c", "c")
+    G.add_node("d")
+
+    nodes, sources, targets, weights, mass = forceatlas.graph_arrays(G, "weight")
+
+    assert nodes == ["a", "b", "c", "d"]
+    assert list(zip(sources, targets, weights)) == [(0, 1, 5), (2, 2, 1)]
+    assert mass.tolist() == [2, 2, 2, 1]
+
+
+@pytest.mark.parametrize("num_nodes", [1, 2, 300])
+def test_barnes_hut_repulsion_approximates_exact(num_nodes):
+    rng = np.random.default_rng(0)
+    xy, mass = rng.random((num_nodes, 2)), rng.integers(1, 5, num_nodes) * 1.0
+
+    exact = forceatlas.exact_repulsion(xy, mass, 2.0)
+
+    assert forceatlas.barnes_hut_repulsion(xy, mass, 2.0, 0) == pytest.approx(exact)
+    approx = forceatlas.barnes_hut_repulsion(xy, mass, 2.0, 1.2)
+    error = np.linalg.norm(approx - exact, axis=1)
+    assert error.mean() <= 0.05 * np.linalg.norm(exact, axis=1).mean()
+
+
+def test_barnes_hut_repulsion_coincident_nodes():
+    xy = np.array([[0.5, 0.5], [0.5, 0.5], [0, 0], [1, 1]])
+
+    forces = forceatlas.barnes_hut_repulsion(xy, np.ones(4), 2.0, 1.2)
+
+    assert np.isfinite(forces).all()
+    assert forces[:2] == pytest.approx(np.zeros((2, 2)))
+
+
+@pytest.mark.parametrize("barnes_hut", [False, True])
+def test_force_atlas_clusters(G_clustered, barnes_hut):
+    pos = force_atlas(G_clustered, iterations=300, seed=0, barnesHutOptimize=barnes_hut)
+
+    assert list(pos.keys()) == list(G_clustered.nodes())
+    xy = np.array(list(pos.values()))
+    assert np.isfinite(xy).all()
+
+    edge_len = np.mean([np.linalg.norm(xy[u] - xy[v]) for u, v in G_clustered.edges])
+    spread = np.linalg.norm(xy - xy.mean(axis=0), axis=1).mean()
+    assert edge_len < spread / 2
+
+
+def test_force_atlas_seeded(G_clustered):
+    a = force_atlas(G_clustered, iterations=50, seed=0)
+    b = force_atlas(G_clustered, iterations=50, seed=0)
+    c = force_atlas(G_clustered, iterations=50, seed=1)
+
+    assert a == b
+    assert a != c
+
+
+def test_force_atlas_unsupported():
+    with pytest.raises(NotImplementedError):
+        force_atlas(nx.path_graph(3), adjustSizes=True)
+
+
+def test_force_atlas_converges(G_clustered):
+    stats = {}
+    pos = force_atlas(
+        G_clustered, seed=0, convergence_tolerance=1e-3, stats=stats, iterations=5000
+    )
+
+    assert stats["converged"]
+    assert forceatlas.CONVERGENCE_MIN_ITERATIONS <= stats["iterations"] < 5000
+    assert stats["displacement"] < 1e-3
+    assert np.isfinite(np.array(list(pos.values()))).all()
+
+
+def test_force_atlas_iterations_ceiling(G_clustered):
+    stats = {}
+    force_atlas(G_clustered, seed=0, iterations=30, stats=stats)
+    assert stats["iterations"] == 30 and not stats["converged"]
+
+    force_atlas(
+        G_clustered, seed=0, iterations=30, convergence_tolerance=1e-3, stats=stats
+    )
+    assert stats["iterations"] == 30 and not stats["converged"]
+
+
+@pytest.mark.parametrize("barnes_hut", [False, True])
+def test_force_atlas_parallel(G_clustered, barnes_hut):
+    kwargs = dict(
+        iterations=3, seed=0, barnesHutOptimize=barnes_hut, parallel_min_nodes=0
+    )
+
+    serial = np.array(list(force_atlas(G_clustered, **kwargs).values()))
+    parallel = [
+        np.array(list(force_atlas(G_clustered, workers=3, **kwargs).values()))
+        for _ in range(2)
+    ]
+
+    assert np.array_equal(parallel[0], parallel[1])
+    assert parallel[0] == pytest.approx(serial)
+
+
+def test_shared_force_pool_releases_memory():
+    xy = np.random.default_rng(0).random((10, 2))
+    edges = np.array([0, 1]), np.array([1, 2]), np.ones(2)
+    args = dict(scaling_ratio=2.0), dict(coefficient=1.0)
+
+    with forceatlas.SharedForcePool(xy, np.ones(10), *edges, 2, *args) as pool:
+        names = [handle.name for handle in pool._handles]
+        expected = forceatlas.exact_repulsion(xy, np.ones(10), 2.0)
+        expected += forceatlas.attraction_forces(xy, np.ones(10), *edges, 1.0)
+        assert pool.forces() == pytest.approx(expected)
+
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
@@ -0,0 +1,326 @@
+import altair as alt
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from alph import alph, combo, layers
+
+
+@pytest.fixture
+def G_attrs():
+    G = nx.Graph()
+    G.add_nodes_from(
+        [
+            ("a", {"team": "uno", "score": 1}),
+            ("b", {"team": "dos"}),
+            ("c", {"score": 3}),
+        ]
+    )
+    G.add_edges_from([("a", "b", {"weight": 0.5}), ("b", "c", {"weight": 2})])
+    return G
+
+
+@pytest.fixture
+def pos():
+    return {"a": (0, 1), "b": np.array([2.0, 3.0]), "c": [4, 5]}
+
+
+class Test_nx_nodes_to_pandas:
+    def test_columns_and_values(self, G_attrs, pos):
+        df = layers._nx_nodes_to_pandas(G_attrs, pos)
+
+        assert set(df.columns) == {"x", "y", "team", "score"}
+        assert list(df.index) == ["a", "b", "c"]
+        assert df["x"].tolist() == [0, 2, 4]
+        assert df["y"].tolist() == [1, 3, 5]
+        assert df.loc["a", "team"] == "uno"
+        assert pd.isnull(df.loc["c", "team"])
+        assert pd.isnull(df.loc["b", "score"])
+
+    def test_numeric_dtypes(self, G_attrs, pos):
+        df = layers._nx_nodes_to_pandas(G_attrs, pos)
+
+        assert df["x"].dtype == float
+        assert df["y"].dtype == float
+        assert df["score"].dtype == float
+
+    def test_empty(self):
+        df = layers._nx_nodes_to_pandas(nx.Graph(), {})
+
+        assert len(df) == 0
+        assert {"x", "y"} <= set(df.columns)
+
+
+class Test_nx_edges_to_pandas:
+    def test_two_rows_per_edge(self, G_attrs, pos):
+        df = layers._nx_edges_to_pandas(G_attrs, pos)
+
+        assert set(df.columns) == {"edge", "source", "target", "x", "y", "weight"}
+        assert df["edge"].tolist() == [0, 0, 1, 1]
+        assert df["source"].tolist() == ["a", "a", "b", "b"]
+        assert df["target"].tolist() == ["b", "b", "c", "c"]
+        assert df["x"].tolist() == [0, 2, 2, 4]
+        assert df["y"].tolist() == [1, 3, 3, 5]
+        assert df["weight"].tolist() == [0.5, 0.5, 2, 2]
+
+    def test_numeric_dtypes(self, G_attrs, pos):
+        df = layers._nx_edges_to_pandas(G_attrs, pos)
+
+        assert df["x"].dtype == float
+        assert df["y"].dtype == float
+        assert df["weight"].dtype == float
+
+    def test_tuple_node_ids(self):
+        G = nx.Graph([((0, 0), (0, 1))])
+        df = layers._nx_edges_to_pandas(G, {(0, 0): (0, 0), (0, 1): (0, 1)})
+
+        assert df["source"].tolist() == [(0, 0), (0, 0)]
+        assert df["y"].tolist() == [0, 1]
+
+    def test_one_row_per_edge(self, G_attrs, pos):
+        df = layers._nx_edges_to_pandas(G_attrs, pos, one_row_per_edge=True)
+
+        assert set(df.columns) == {"source", "target", "x", "y", "x2", "y2", "weight"}
+        assert df["source"].tolist() == ["a", "b"]
+        assert df["target"].tolist() == ["b", "c"]
+        assert df[["x", "y", "x2", "y2"]].values.tolist() == [
+            [0, 1, 2, 3],
+            [2, 3, 4, 5],
+        ]
+        assert df["weight"].tolist() == [0.5, 2]
+        assert df["weight"].dtype == float
+
+    @pytest.mark.parametrize("one_row_per_edge", [False, True])
+    def test_empty(self, one_row_per_edge):
+        df = layers._nx_edges_to_pandas(
+            nx.empty_graph(2), {0: (0, 0), 1: (1, 1)}, one_row_per_edge=one_row_per_edge
+        )
+
+        assert len(df) == 0
+
+
+def test_encoding_fields():
+    selection = alt.selection_point(fields=["team"])
+
+    fields = layers._encoding_fields(
+        alt.Size("score:Q", scale=alt.Scale(range=[1, 2])),
+        ["name", "meta.email"],
+        "label",
+        alt.condition(selection, alt.Color("colour:N"), alt.value("grey")),
+        alt.condition(
+            "datum.a[0] == 'N' || datum['b c'] > 1", alt.value(1), alt.value(0)
+        ),
+        alt.condition(alt.datum.source == 3, alt.value("red"), alt.value("#999")),
+        alt.value("#000"),
+        None,
+        selection,
+    )
+
+    assert fields == {"score", "name", "meta.email", "meta", "label", "colour"} | {
+        "a",
+        "b c",
+        "source",
+        "team",
+    }
+
+
+class Test_compact_data:
+    @pytest.fixture
+    def data(self):
+        return pd.DataFrame(
+            {
+                "x": [1.23456, 2.0, 3.98765],
+                "score": [1 / 3, 2.0, np.nan],
+                "count": [1.0, 2.0, 3.0],
+                "team": ["a long team name", None, "a long team name"] * 1,
+                "name": ["x", "y", "z"],
+            }
+        )
+
+    def test_rounds_numbers(self, data):
+        res, _ = layers._compact_data(data, 2)
+
+        assert res["x"].tolist() == [1.23, 2, 3.99]
+        assert res["score"].tolist()[:2] == [0.3333333, 2]
+        assert np.isnan(res["score"].iloc[2])
+        assert res["count"].dtype == np.int64
+
+    def test_keeps_floats_not_exact_as_ints(self):
+        data = pd.DataFrame({"big": [1e20, -2e20], "gaps": [1.0, np.nan]})
+        res, _ = layers._compact_data(data, True)
+
+        assert res["big"].tolist() == [1e20, -2e20]
+        assert res["gaps"].tolist()[0] == 1 and np.isnan(res["gaps"].iloc[1])
+        assert res.dtypes.tolist() == [float, float]
+
+    def test_codes_repeated_strings(self, data):
+        data = pd.concat([data] * 10, ignore_index=True)
+        res, lookups = layers._compact_data(data, True)
+
+        assert list(lookups) == ["team"]
+        assert res["team"].map(lookups["team"]).tolist() == data["team"].tolist()
+        assert res["name"].tolist() == data["name"].tolist()
+
+    @pytest.mark.parametrize("compact_data", [None, False])
+    def test_off(self, data, compact_data):
+        res, lookups = layers._compact_data(data, compact_data)
+
+        assert res is data and lookups == {}
+
+    def test_layers_look_up_coded_values(self):
+        G = nx.relabel_nodes(nx.complete_graph(10), lambda n: f"node {n} of many")
+        pos = {n: (i, i) for i, n in enumerate(G)}
+
+        chart = layers.edges_layer(weight_attr=None, compact_data=True)(G, pos)
+        spec = chart.to_dict()
+
+        assert [t["lookup"] for t in spec["transform"]] == ["source", "target"]
+        assert spec["encoding"]["x"]["type"] == "quantitative"
+        assert set(chart.data["source"]) < set("0123456789")
+
+    @pytest.fixture
+    def G(self, G_attrs):
+        nx.set_node_attributes(G_attrs, "lorem ipsum", "description")
+        return G_attrs
+
+    def test_prunes_unencoded_attrs(self, G, pos):
+        chart = layers.nodes_layer(
+            fill=alt.Color("team:N"), tooltip_attrs=["score"], halo_offset=2
+        )(G, pos)
+
+        assert set(chart.data.columns) == {
+            "x",
+            "y",
+            "team",
+            "score",
+            "__node_halo_size",
+        }
+
+    def test_keep_attrs(self, G, pos):
+        layer = layers.nodes_layer(keep_attrs="description")
+
+        assert set(layer(G, pos).data.columns) == {"x", "y", "description"}
+        assert layer.data_attrs == {"description"}
+
+    def test_keep_all_attrs(self, G, pos):
+        layer = layers.nodes_layer(keep_attrs=True)
+
+        assert {"team", "score", "description"} <= set(layer(G, pos).data.columns)
+        assert layer.data_attrs is None
+
+
+class Test_edges_layer:
+    @pytest.mark.parametrize("mark, num_rows", [("rule", 2), ("line", 4)])
+    def test_marks(self, G_attrs, pos, mark, num_rows):
+        chart = layers.edges_layer(mark=mark)(G_attrs, pos)
+        spec = chart.to_dict()
+
+        assert spec["mark"]["type"] == mark
+        assert len(chart.data) == num_rows
+        assert spec["encoding"]["opacity"]["field"] == "weight"
+        assert spec["encoding"]["strokeWidth"]["field"] == "weight"
+        assert {"source", "target", "weight"} <= set(chart.data.columns)
+        if mark == "rule":
+            assert spec["encoding"]["x2"]["field"] == "x2"
+            assert spec["encoding"]["y2"]["field"] == "y2"
+        else:
+            assert spec["encoding"]["detail"]["field"] == "edge"
+
+    def test_prunes_unencoded_attrs(self, G_attrs, pos):
+        nx.set_edge_attributes(G_attrs, "lorem ipsum", "description")
+
+        assert "description" not in layers.edges_layer()(G_attrs, pos).data
+        assert "weight" not in layers.edges_layer(weight_attr=None)(G_attrs, pos).data
+        assert "description" in layers.edges_layer(keep_attrs=True)(G_attrs, pos).data
+
+    def test_reusable(self, G_attrs, pos):
+        layer = layers.edges_layer()
+        first = layer(G_attrs, pos).to_dict()
+        G_other = nx.Graph([("a", "c", {"weight": 1})])
+
+        assert layer(G_other, pos).to_dict() != first
+        assert layer(G_attrs, pos).to_dict() == first
+
+
+class Test_generate_combo_layers:
+    @staticmethod
+    def combo_layers(num_combos, **kwargs):
+        G = nx.Graph()
+        for i in range(num_combos):
+            G.add_nodes_from([(f"{i}a", {"team": i}), (f"{i}b", {"team": i})])
+            G.add_edge(f"{i}a", f"{i}b", weight=1)
+            if i:
+                G.add_edge(f"{i}a", "0a", weight=1)
+        inter_combo_G, intra_combo_Gs = combo.combo_graph_mapper(
+            G, combo_group_by="team", weight_attr="weight"
+        )
+        return layers.generate_combo_layers(
+            inter_combo_G,
+            intra_combo_Gs,
+            combo_pos=nx.circular_layout(inter_combo_G, scale=300),
+            combo_nodes_layer=layers.default_combo_nodes_layer(),
+            combo_edges_layer=layers.default_combo_edges_layer("weight"),
+            intra_combo_layout_fn=nx.circular_layout,
+            nodes_layer=layers.nodes_layer(),
+            edges_layer=layers.default_intra_combo_edges_layer("weight"),
+            size_scale_domain=(0, 25),
+            size_scale_range=(36, 180**2),
+            inner_graph_scale_factor=0.6,
+            **kwargs,
+        )
+
+    def test_layers_per_combo(self):
+        assert len(self.combo_layers(3)) == 1 + 3 * 3
+        assert len(self.combo_layers(6)) == 1 + 6 * 3
+
+    def test_consolidated_layer_count_independent_of_num_combos(self):
+        res = self.combo_layers(3, consolidate_layers=True)
+        assert len(res) == 4
+        assert len(self.combo_layers(30, consolidate_layers=True)) == len(res)
+
+    def test_consolidated_data_tagged_with_combo(self):
+        combo_edges, combo_nodes, edges, nodes = self.combo_layers(
+            3, consolidate_layers=True
+        )
+
+        assert len(combo_nodes.data) == 3
+        assert len(nodes.data) == 6
+        assert len(edges.data) == 3
+        assert set(nodes.data[combo.COMBO_GROUP_VALUE_ATTR]) == {0, 1, 2}
+        assert set(edges.data[combo.COMBO_GROUP_VALUE_ATTR]) == {0, 1, 2}
+
+    def test_stats(self):
+        stats = {}
+        res = self.combo_layers(3, consolidate_layers=True, stats=stats)
+
+        assert stats["intra_combo_layouts"] == dict(graphs=3, laid_out=3)
+        assert set(stats["stages"]) == {"layout", "layers"}
+        assert len(stats["layers"]) == len(res)
+        assert [s["rows"] for s in stats["layers"]] == [2, 3, 3, 6]
+
+
+class Test_alph_stats:
+    def test_stats(self, G_attrs):
+        stats = {}
+        alph(G_attrs, weight_attr="weight", stats=stats)
+
+        assert (stats["nodes"], stats["edges"]) == (3, 2)
+        assert set(stats["stages"]) == {"preprocess", "layout", "layers"}
+        assert stats["layout"]["iterations"] > 0
+        edges, nodes = stats["layers"]
+        assert (edges["marks"], edges["rows"]) == (["rule"], 2)
+        assert (nodes["nodes"], nodes["rows"]) == (3, 3)
+        assert nodes["bytes"] > 0
+
+    def test_combo_stats(self, G_attrs):
+        stats = {}
+        alph(G_attrs, combo_group_by="team", stats=stats)
+
+        assert set(stats["stages"]) == {"preprocess", "combo", "layout", "layers"}
+        assert stats["intra_combo_layouts"]["graphs"] == 2
+
+    def test_layout_fn_without_stats(self, G_attrs):
+        stats = {}
+        alph(G_attrs, layout_fn=nx.circular_layout, stats=stats)
+        assert stats["layout"] == {}
@@ -0,0 +1,327 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from alph import layout
+
+
+def unseeded_random_layout(G):
+    """Draws from the global numpy RNG"""
+    return nx.random_layout(G)
+
+
+@pytest.fixture
+def Gs():
+    return {
+        f"g{i}": nx.gnm_random_graph(n, 2 * n, seed=i)
+        for i, n in enumerate([5, 60, 80, 10])
+    }
+
+
+def assert_same_layouts(a, b):
+    assert list(a.keys()) == list(b.keys())
+    for k in a:
+        assert list(a[k].keys()) == list(b[k].keys())
+        for n in a[k]:
+            assert np.allclose(a[k][n], b[k][n])
+
+
+class Test_SparseGraph:
+    @pytest.mark.parametrize("graph_type", [nx.Graph, nx.DiGraph, nx.MultiGraph])
+    def test_matches_networkx(self, graph_type):
+        G = graph_type()
+        G.add_edge("a", "b", weight=2)
+        G.add_edge("b", "c", weight=3)
+        G.add_edge("b", "c", weight=4)
+        G.add_edge("c", "c", weight=5)
+        G.add_node("d")
+
+        for weight_attr in [None, "weight"]:
+            sparse_graph = layout.SparseGraph(G, weight_attr)
+            expected = nx.to_scipy_sparse_array(G, weight=weight_attr)
+
+            assert sparse_graph.nodes == list(G.nodes())
+            assert sparse_graph.index == {"a": 0, "b": 1, "c": 2, "d": 3}
+            assert np.array_equal(sparse_graph.adjacency.toarray(), expected.toarray())
+
+    def test_from_graph(self):
+        sparse_graph = layout.SparseGraph(nx.path_graph(3), "weight")
+
+        assert layout.SparseGraph.from_graph(sparse_graph, "weight") is sparse_graph
+        with pytest.raises(ValueError):
+            layout.SparseGraph.from_graph(sparse_graph)
+
+
+def test_force_atlas_sknet():
+    G = nx.karate_club_graph()
+    kwargs = dict(init_seed=0, n_iter=20)
+
+    weighted = layout.force_atlas_sknet(G, **kwargs)
+    pos = layout.force_atlas_sknet(G, weight_attr=None, **kwargs)
+
+    assert list(pos.keys()) == list(G.nodes())
+    assert not np.allclose(list(pos.values()), list(weighted.values()))
+    # weighted by "weight" by default, as with nx.to_scipy_sparse_array
+    assert np.allclose(
+        list(weighted.values()),
+        list(layout.force_atlas_sknet(G, weight_attr="weight", **kwargs).values()),
+    )
+    sparse_graph = layout.SparseGraph(G, "weight")
+    assert np.allclose(
+        list(weighted.values()),
+        list(layout.force_atlas_sknet(sparse_graph, **kwargs).values()),
+    )
+
+
+class Test_layout_graphs:
+    def test_order_preserved(self, Gs):
+        res = layout.layout_graphs(nx.circular_layout, Gs)
+
+        assert list(res.keys()) == list(Gs.keys())
+        for k, G in Gs.items():
+            assert set(res[k].keys()) == set(G.nodes())
+
+    @pytest.mark.parametrize(
+        "layout_fn",
+        [
+            nx.spring_layout,
+            unseeded_random_layout,
+            layout.default_intra_combo_layout,
+            layout.default_network_layout,
+            layout.default_inter_combo_layout,
+        ],
+    )
+    @pytest.mark.parametrize("executor", ["process", "thread"])
+    def test_seeded_independent_of_workers(self, Gs, layout_fn, executor):
+        if executor == "thread" and layout_fn is unseeded_random_layout:
+            pytest.skip("global RNG seeding isn't thread-safe")
+
+        serial = layout.layout_graphs(layout_fn, Gs, seed=42)
+        parallel = layout.layout_graphs(
+            layout_fn, Gs, seed=42, workers=2, executor=executor, min_nodes=50
+        )
+
+        assert_same_layouts(serial, parallel)
+
+    @pytest.mark.parametrize(
+        "layout_fn",
+        [
+            layout.default_intra_combo_layout,
+            layout.default_network_layout,
+            layout.default_inter_combo_layout,
+        ],
+    )
+    def test_default_layouts_seeded_thread_safely(self, Gs, layout_fn, monkeypatch):
+        def global_seed(seed):
+            raise AssertionError("global RNGs seeded")
+
+        monkeypatch.setattr(np.random, "seed", global_seed)
+        layout.layout_graphs(
+            layout_fn, Gs, seed=42, workers=2, executor="thread", min_nodes=0
+        )
+
+    def test_seeded_independent_of_other_graphs(self, Gs):
+        res = layout.layout_graphs(unseeded_random_layout, Gs, seed=42)
+        res_subset = layout.layout_graphs(
+            unseeded_random_layout, {"g2": Gs["g2"]}, seed=42
+        )
+
+        assert_same_layouts({"g2": res["g2"]}, res_subset)
+
+    def test_seeding_restores_global_rng(self, Gs):
+        np.random.seed(0)
+        expected = np.random.random()
+
+        np.random.seed(0)
+        layout.layout_graphs(unseeded_random_layout, Gs, seed=42)
+        assert np.random.random() == expected
+
+    def test_invalid_executor(self, Gs):
+        with pytest.raises(AssertionError):
+            layout.layout_graphs(nx.circular_layout, Gs, executor="gpu")
+
+
+class RecordingLayout:
+    """Iterative layout stand-in, recording what it's asked to do"""
+
+    def __call__(self, G, pos=None, weight_attr=None, iterations=50):
+        self.pos, self.iterations = pos, iterations
+        return nx.spring_layout(G, pos=pos, weight=weight_attr, iterations=iterations)
+
+
+class Test_incremental_layout:
+    @pytest.fixture
+    def G_prev(self):
+        return nx.gnm_random_graph(100, 300, seed=1)
+
+    @pytest.fixture
+    def prev_pos(self, G_prev):
+        return nx.spring_layout(G_prev, seed=1)
+
+    def test_warm_start_keeps_existing_and_places_new_near_neighbours(
+        self, G_prev, prev_pos
+    ):
+        G = G_prev.copy()
+        G.remove_node(0)
+        G.add_edge(1, "new")
+        G.add_edge("new", "newer")
+        G.add_edge("island", "other island")
+
+        pos = layout.warm_start_pos(G, prev_pos, seed=1)
+
+        assert set(pos.keys()) == set(G.nodes())
+        for n in G_prev.nodes():
+            if n in G:
+                assert np.allclose(pos[n], prev_pos[n])
+        assert np.linalg.norm(pos["new"] - prev_pos[1]) < 0.2
+        assert np.linalg.norm(pos["newer"] - pos["new"]) < 0.2
+
+    def test_no_overlap_falls_back_to_full_layout(self, prev_pos):
+        layout_fn = RecordingLayout()
+        layout.incremental_layout(nx.path_graph(["x", "y"]), prev_pos, layout_fn)
+
+        assert layout_fn.pos is None
+        assert layout_fn.iterations == layout.INCREMENTAL_FULL_ITERATIONS
+
+        # seeded fallbacks repeat - whether or not the layout takes a seed
+        G = nx.path_graph(["x", "y", "z"])
+        for layout_fn in [None, RecordingLayout()]:
+            a, b = [
+                layout.incremental_layout(G, prev_pos, layout_fn, seed=1)
+                for _ in range(2)
+            ]
+            assert np.allclose(list(a.values()), list(b.values()))
+
+    def test_iterations_scale_with_change(self, G_prev, prev_pos):
+        layout_fn = RecordingLayout()
+
+        layout.incremental_layout(G_prev, prev_pos, layout_fn)
+        assert layout_fn.iterations == layout.INCREMENTAL_MIN_ITERATIONS
+
+        G = G_prev.copy()
+        G.add_edges_from([(i, f"new_{i}") for i in range(2)])
+        layout.incremental_layout(G, prev_pos, layout_fn, full_iterations=5000)
+        assert layout_fn.iterations == np.ceil(5000 * 10 * 2 / 102)
+
+        pos = layout.incremental_layout(G, prev_pos, layout_fn, iterations=7)
+        assert layout_fn.iterations == 7
+        assert set(pos.keys()) == set(G.nodes())
+
+
+@pytest.mark.parametrize(
+    "layout_fn", [layout.default_network_layout, layout.default_intra_combo_layout]
+)
+def test_default_layouts_stop_early(layout_fn):
+    stats = {}
+    layout_fn(nx.karate_club_graph(), weight_attr="weight", seed=0, stats=stats)
+
+    assert stats["converged"] and stats["iterations"] < 5000
+
+
+class Test_multilevel_layout:
+    @pytest.fixture
+    def G(self):
+        return nx.relaxed_caveman_graph(30, 10, 0.1, seed=0)
+
+    def test_coarsen(self, G):
+        from alph.forceatlas import graph_arrays
+
+        _, sources, targets, weights, mass = graph_arrays(G)
+        groups, c_sources, c_targets, c_weights, c_mass = layout.coarsen(
+            sources, targets, weights, mass, np.random.default_rng(0)
+        )
+
+        assert len(c_mass) <= len(mass) / 2
+        assert sorted(set(groups)) == list(range(len(c_mass)))
+        assert c_mass.sum() == mass.sum()
+        assert np.all(c_sources < c_targets)
+        between = groups[sources] != groups[targets]
+        assert c_weights.sum() == weights[between].sum()
+
+    def test_layout(self, G):
+        stats = {}
+        pos = layout.multilevel_layout(G, seed=0, coarsest_nodes=20, stats=stats)
+
+        assert list(pos.keys()) == list(G.nodes())
+        assert np.isfinite(np.array(list(pos.values()))).all()
+        level_sizes = [level["nodes"] for level in stats["levels"]]
+        assert len(level_sizes) > 2
+        assert level_sizes == sorted(level_sizes) and level_sizes[-1] == len(G)
+
+        assert pos == layout.multilevel_layout(G, seed=0, coarsest_nodes=20)
+
+    def test_small_graphs(self):
+        assert layout.multilevel_layout(nx.Graph()) == {}
+        assert len(layout.multilevel_layout(nx.empty_graph(3), seed=0)) == 3
+
+
+class Test_initial_layout:
+    def test_pivot_mds_recovers_graph_distances(self):
+        pos = layout.pivot_mds_layout(nx.path_graph(20), num_pivots=5, seed=0)
+        xy = np.array(list(pos.values()))
+        assert np.linalg.norm(xy[0] - xy[19]) == pytest.approx(19, rel=0.05)
+
+        pos = layout.pivot_mds_layout(nx.grid_2d_graph(10, 10), seed=0)
+        assert np.linalg.norm(np.subtract(pos[0, 0], pos[9, 9])) > 9
+
+    def test_pivot_mds_disconnected(self):
+        G = nx.disjoint_union(nx.path_graph(5), nx.complete_graph(4))
+        G.add_node("isolated")
+
+        pos = layout.pivot_mds_layout(G, seed=0)
+
+        assert list(pos.keys()) == list(G.nodes())
+        assert np.isfinite(np.array(list(pos.values()))).all()
+
+    @pytest.mark.parametrize("init", ["random", "pivot_mds", "spectral"])
+    def test_named_layouts(self, init):
+        G = nx.karate_club_graph()
+        pos = layout.initial_layout(G, init, weight_attr="weight", seed=0)
+
+        assert list(pos.keys()) == list(G.nodes())
+        again = layout.initial_layout(G, init, weight_attr="weight", seed=0)
+        assert np.array_equal(list(pos.values()), list(again.values()))
+
+    def test_custom_layouts(self):
+        G = nx.path_graph(4)
+        fixed = {n: (n, 0) for n in G}
+
+        assert layout.initial_layout(G, fixed) is fixed
+        assert (
+            layout.initial_layout(G, nx.circular_layout, seed=0).keys() == fixed.keys()
+        )
+
+    def test_force_atlas_init(self):
+        G = nx.karate_club_graph()
+        kwargs = dict(weight_attr="weight", seed=0, iterations=10)
+
+        a = layout.force_atlas(G, init="pivot_mds", **kwargs)
+        assert a == layout.force_atlas(G, init="pivot_mds", **kwargs)
+        assert a != layout.force_atlas(G, **kwargs)
+        pinned = layout.force_atlas(G, init="pivot_mds", pos={0: (0, 0)}, **kwargs)
+        assert pinned != a
+
+    def test_unseeded(self):
+        G = nx.karate_club_graph()
+
+        for init in layout.INITIAL_LAYOUTS:
+            assert list(layout.initial_layout(G, init).keys()) == list(G.nodes())
+        assert len(layout.force_atlas(G, init="pivot_mds", iterations=10)) == len(G)
+        assert len(layout.force_atlas_sknet(G, init="pivot_mds", n_iter=10)) == len(G)
+        pos = layout.initialised_layout(G, nx.spring_layout, init="pivot_mds")
+        assert list(pos.keys()) == list(G.nodes())
+        assert len(layout.multilevel_layout(G)) == len(G)
+
+    def test_initialised_layout(self):
+        G = nx.karate_club_graph()
+        pos = layout.initialised_layout(
+            G, nx.spring_layout, init="spectral", iterations=0, seed=0
+        )
+
+        expected = layout.spectral_initial_layout(G)
+        assert list(pos.keys()) == list(G.nodes())
+        xy, expected_xy = np.array(list(pos.values())), np.array(
+            list(expected.values())
+        )
+        # spring_layout rescales its output, but keeps the shape of its input
+        assert np.corrcoef(xy[:, 0], expected_xy[:, 0])[0, 1] ** 2 > 0.99
@@ -1,8 +1,12 @@
 from datetime import date, datetime, timedelta
 
+import networkx as nx
 import pandas as pd
-from alph.preproc import ensure_non_serializable_datetime_types_absent
-from pytest import mark, raises
+from alph.preproc import (
+    ensure_non_serializable_datetime_types_absent,
+    sanitise_non_serializable_datetime_node_attrs,
+)
+from pytest import fixture, mark, raises
 
 
 @mark.parametrize(
@@ -45,3 +49,68 @@ def test_ensure_non_serializable_datetime_types_absent(df, problem_cols):
             ensure_non_serializable_datetime_types_absent(df)
     else:
         ensure_non_serializable_datetime_types_absent(df)
+
+
+@fixture
+def G_temporal():
+    G = nx.Graph()
+    G.add_nodes_from(
+        [
+            (
+                "a",
+                {
+                    "joined": datetime(2021, 3, 4, 5, 6),
+                    "born": date(1990, 1, 2),
+                    "tenure": timedelta(days=1),
+                    "mixed": "text",
+                    "name": "A",
+                },
+            ),
+            (
+                "b",
+                {
+                    "joined": pd.Timestamp("2022-01-31"),
+                    "born": None,
+                    "tenure": pd.Timedelta(hours=1),
+                    "mixed": datetime(2020, 2, 2),
+                    "name": "B",
+                },
+            ),
+            ("c", {"joined": pd.NaT, "mixed": 3}),
+        ]
+    )
+    return G
+
+
+def test_sanitise_non_serializable_datetime_node_attrs(G_temporal):
+    res = sanitise_non_serializable_datetime_node_attrs(G_temporal, "%d %b %Y")
+
+    assert sorted(res) == ["born", "joined", "mixed", "tenure"]
+    assert [G_temporal.nodes[n]["joined"] for n in "abc"] == [
+        "04 Mar 2021",
+        "31 Jan 2022",
+        None,
+    ]
+    assert [G_temporal.nodes[n]["born"] for n in "abc"] == ["02 Jan 1990", None, None]
+    assert [G_temporal.nodes[n]["tenure"] for n in "abc"] == [
+        str(timedelta(days=1)),
+        str(pd.Timedelta(hours=1)),
+        None,
+    ]
+    assert [G_temporal.nodes[n]["mixed"] for n in "abc"] == ["text", "02 Feb 2020", "3"]
+    assert [G_temporal.nodes[n].get("name") for n in "abc"] == ["A", "B", None]
+
+
+def test_sanitise_non_serializable_datetime_node_attrs_subset(G_temporal):
+    res = sanitise_non_serializable_datetime_node_attrs(
+        G_temporal, "%Y", attrs={"joined", "name"}
+    )
+
+    assert res == ["joined"]
+    assert G_temporal.nodes["a"]["joined"] == "2021"
+    assert G_temporal.nodes["a"]["born"] == date(1990, 1, 2)
+
+
+def test_sanitise_non_serializable_datetime_node_attrs_no_format(G_temporal):
+    with raises(ValueError, match="non-serializable datetime types"):
+        sanitise_non_serializable_datetime_node_attrs(G_temporal, None)
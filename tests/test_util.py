@@ -1,7 +1,12 @@
 import numpy as np
 import pandas as pd
 import pytest
-from alph.util import generate_interaction_graph, normalise_pos, nx_graph_from_edges
+from alph.util import (
+    NodePositions,
+    generate_interaction_graph,
+    normalise_pos,
+    nx_graph_from_edges,
+)
 
 
 class Test_nx_graph_from_edges:
@@ -174,6 +179,60 @@ def test_normalise_pos(pos, range, aspect_ratio, padding, expected):
         assert xy == pytest.approx(expected[k])
 
 
+def test_normalise_pos_array_and_node_positions():
+    pos = {"a": [0, -0.9], "b": [0.2, 1.0], "c": [0, 0]}
+    expected = normalise_pos(pos, range=[0, 10], aspect_ratio=2, padding=1)
+
+    xy = normalise_pos(
+        np.array(list(pos.values())), range=[0, 10], aspect_ratio=2, padding=1
+    )
+    assert xy.shape == (3, 2)
+    assert xy == pytest.approx(np.array(list(expected.values())))
+
+    res = normalise_pos(
+        NodePositions.from_pos(pos), range=[0, 10], aspect_ratio=2, padding=1
+    )
+    assert isinstance(res, NodePositions)
+    assert list(res.keys()) == ["a", "b", "c"]
+    assert res.xy == pytest.approx(xy)
+
+
+def test_normalise_pos_degenerate():
+    assert normalise_pos({"a": [0, 0]}, range=[0, 10]) == {"a": (10, 10)}
+    assert normalise_pos(np.empty((0, 2))).shape == (0, 2)
+
+
+class Test_NodePositions:
+    def test_mapping(self):
+        pos = NodePositions(["a", (1, 2)], [[0, 1], [2, 3]])
+
+        assert len(pos) == 2
+        assert list(pos) == ["a", (1, 2)]
+        assert (1, 2) in pos and "b" not in pos
+        assert list(pos[(1, 2)]) == [2, 3]
+        assert dict(pos)["a"].tolist() == [0, 1]
+        with pytest.raises(KeyError):
+            pos["b"]
+
+    def test_take(self):
+        pos = NodePositions.from_pos({"a": (0, 1), "b": (2, 3), "c": (4, 5)})
+
+        assert pos.take(["c", "a"]).tolist() == [[4, 5], [0, 1]]
+        assert pos.take([]).shape == (0, 2)
+
+    def test_concat(self):
+        pos = NodePositions.concat(
+            [
+                NodePositions(["a"], [[0, 1]]),
+                NodePositions(["b", "c"], [[2, 3], [4, 5]]),
+            ]
+        )
+
+        assert list(pos) == ["a", "b", "c"]
+        assert pos.xy.tolist() == [[0, 1], [2, 3], [4, 5]]
+        assert len(NodePositions.concat([])) == 0
+
+
 class Test_generate_interaction_graph:
     def test_empty(_):
         G = generate_interaction_graph([], 1)